@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+智能健身指导系统 - 独立姿态分析服务
+Standalone Pose Analysis Service for AI Fitness Guidance System
+
+只加载姿态分析引擎（无页面模板、数据库模型和AI对话），提供与主应用相同的
+/api/analyze_pose、/api/analyze_pose_batch、/api/analyze_frame 接口。
+主应用设置ANALYSIS_SERVICE_URL后把这些请求转发到这里，分析层可以单独扩容。
+
+启动方式：
+    python analysis_service.py
+    gunicorn -w 1 --threads 8 analysis_service:app
+
+分析会话状态（计数器、滤波历史）保存在进程内的PoseSessionRegistry中，每个进程还会
+启动自己的FrameWorkerPool，因此只能运行一个Web进程，用线程处理并发请求，
+推理并行度由FrameWorkerPool的工作进程数决定。需要多个实例时，在前面按会话ID
+（X-Session-Id）做粘性路由，保证同一会话的请求总是到达同一个实例。
+"""
+
+import hmac
+import os
+import sys
+import atexit
+
+# 加载环境变量（需在导入配置之前）
+if os.path.exists('.env'):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify, request
+
+from config import get_config
+from models.analysis_api import ANALYSIS_TOKEN_HEADER, ANALYSIS_USER_HEADER, create_analysis_blueprint
+from models.exercise_engine import ExerciseEngine
+from models.frame_workers import FrameWorkerPool
+from models.landmark_filter import compile_filter_specs
+from models.session_registry import PoseSessionRegistry
+
+
+def create_app():
+    """创建分析服务应用"""
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+
+    exercise_config = app.config.get('EXERCISE_CONFIG', {})
+    service_config = app.config.get('ANALYSIS_SERVICE', {})
+    token = service_config.get('token', '')
+    if not token:
+        print("⚠️  未设置ANALYSIS_SERVICE_TOKEN，分析服务将拒绝所有请求")
+
+    # 与主应用相同的运动规格、滤波参数和会话管理
+    exercise_engine = ExerciseEngine.from_config(app.config)
+    analysis_sessions = PoseSessionRegistry(
+        idle_timeout=exercise_config.get('session_idle_timeout', 600),
+        rep_specs=exercise_engine.rep_specs,
+        history_size=exercise_config.get('history_frames', 90),
+        filter_specs=compile_filter_specs(
+            app.config.get('LANDMARK_FILTERS'),
+            frame_rate=exercise_config.get('frame_rate', 30)
+        )
+    )
+    frame_pool = FrameWorkerPool(
+        workers=exercise_config.get('frame_workers', 0),
+        queue_size=exercise_config.get('frame_queue_size', 4),
+        timeout=exercise_config.get('frame_timeout', 5),
+        exercise_config=app.config.get('EXERCISE_CONFIG'),
+        pose_profiles=app.config.get('POSE_PROFILES')
+    )
+    atexit.register(frame_pool.shutdown)
+
+    def authorize():
+        """校验主应用附带的共享令牌，返回其转发的用户标识"""
+        supplied = request.headers.get(ANALYSIS_TOKEN_HEADER, '')
+        if not token or not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+            return None
+        return request.headers.get(ANALYSIS_USER_HEADER) or 'service'
+
+    app.register_blueprint(create_analysis_blueprint(
+        exercise_engine, analysis_sessions, frame_pool, authorize=authorize
+    ))
+
+    @app.route('/health')
+    def health():
+        return jsonify({
+            'success': True,
+            'active_sessions': len(analysis_sessions),
+            'frame_workers': frame_pool.workers if frame_pool.started else 0
+        })
+
+    return app
+
+
+app = create_app()
+
+if __name__ == '__main__':
+    service_config = app.config.get('ANALYSIS_SERVICE', {})
+    print(f"🧠 姿态分析服务: http://{service_config.get('host', '0.0.0.0')}:{service_config.get('port', 5001)}")
+    app.run(
+        host=service_config.get('host', '0.0.0.0'),
+        port=service_config.get('port', 5001),
+        debug=False,
+        threaded=True
+    )
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+智能健身指导系统 - 离线视频批量分析
+Offline Video Batch Analysis for AI Fitness Guidance System
+
+用法：
+    python analyze_video.py 俯卧撑 session1.mp4 session2.mp4
+    python analyze_video.py squat clip.mp4 --stride 2 --output result.json
+    python analyze_video.py pushup clip.mp4 --user-id 3        # 同时写入该用户的训练记录
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# 加载环境变量（需在导入配置之前）
+if os.path.exists('.env'):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Config
+
+from config import get_config
+from models.exercise_engine import ExerciseEngine
+from models.landmark_filter import compile_filter_specs
+from models.video_pipeline import VideoAnalysisPipeline, VideoPipelineError
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线批量分析训练视频')
+    parser.add_argument('exercise', help='运动类型（英文名、中文名或编号）')
+    parser.add_argument('videos', nargs='+', help='视频文件')
+    parser.add_argument('--profile', help='推理档位（lite/full/heavy）')
+    parser.add_argument('--workers', type=int, help='推理进程数（0为CPU核数-1）')
+    parser.add_argument('--batch-size', type=int, help='每批提交的帧数')
+    parser.add_argument('--stride', type=int, help='抽帧间隔（1为逐帧）')
+    parser.add_argument('--user-id', type=int, help='写入该用户的训练记录')
+    parser.add_argument('--frames', action='store_true', help='输出逐帧结果')
+    parser.add_argument('--output', help='结果写入JSON文件（默认打印）')
+    args = parser.parse_args()
+
+    config = Config(os.path.dirname(os.path.abspath(__file__)))
+    config.from_object(get_config())
+    exercise_config = config.get('EXERCISE_CONFIG', {})
+    engine = ExerciseEngine.from_config(config)
+    if engine.resolve(args.exercise) is None:
+        print(f"❌ 不支持的运动类型: {args.exercise}")
+        return 1
+
+    pipeline = VideoAnalysisPipeline(
+        engine,
+        exercise_config=exercise_config,
+        pose_profiles=config.get('POSE_PROFILES'),
+        filter_specs=compile_filter_specs(config.get('LANDMARK_FILTERS'), exercise_config.get('frame_rate', 30)),
+        workers=args.workers if args.workers is not None else exercise_config.get('video_workers', 0),
+        batch_size=args.batch_size or exercise_config.get('video_batch_size', 32),
+        stride=args.stride or exercise_config.get('video_frame_stride', 1),
+        max_side=exercise_config.get('video_max_side', 640)
+    )
+
+    recorder = None
+    if args.user_id is not None:
+        from models.data_recorder import WorkoutDataRecorder
+        recorder = WorkoutDataRecorder(
+            keep_details=exercise_config.get('recorder_keep_details', True),
+            pool_size=exercise_config.get('recorder_pool_size', 4),
+            busy_timeout=exercise_config.get('recorder_busy_timeout', 5),
+            synchronous=exercise_config.get('recorder_synchronous', 'NORMAL'),
+            spill_path=exercise_config.get('recorder_spill_path'),
+            write_queue_size=exercise_config.get('recorder_write_queue_size', 1024),
+            write_batch=exercise_config.get('recorder_write_batch', 64),
+            write_retries=exercise_config.get('recorder_write_retries', 3)
+        )
+
+    summaries = []
+    failed = 0
+    try:
+        for path in args.videos:
+            print(f"🎬 分析视频: {path}")
+            try:
+                summary = pipeline.summarize(
+                    path, args.exercise, profile=args.profile,
+                    recorder=recorder, user_id=args.user_id, keep_frames=args.frames
+                )
+            except VideoPipelineError as e:
+                print(f"❌ {e}")
+                failed += 1
+                continue
+
+            summary['video'] = path
+            summaries.append(summary)
+            print(f"   ✅ 次数 {summary['rep_count']}，平均评分 {summary['avg_form_score']}，"
+                  f"检测到人体 {summary['frames_detected']}/{summary['frames_analyzed']} 帧，"
+                  f"处理速度 {summary['processing_fps']} 帧/秒")
+    finally:
+        pipeline.shutdown()
+
+    output = json.dumps(summaries, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+        print(f"📄 结果已写入: {args.output}")
+    elif args.frames:
+        print(output)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,23 +1,29 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 from functools import wraps
 import pytz
 import os
-import cv2
-import mediapipe as mp
-import numpy as np
+import atexit
 import json
 import requests
 import base64
 from io import BytesIO
 import sys
+import tempfile
 
 # 导入配置
 from config import get_config
 
+# WebSocket支持（可选）
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
 # 加载环境变量
 if os.path.exists('.env'):
     from dotenv import load_dotenv
@@ -27,6 +33,16 @@ if os.path.exists('.env'):
 sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
 
 # 导入自定义模块
+from models.session_registry import PoseSessionRegistry
+from models.landmark_filter import compile_filter_specs
+from models.exercise_engine import ExerciseEngine
+from models.frame_workers import FrameWorkerPool
+from models.video_pipeline import VideoAnalysisPipeline, VideoPipelineError
+from models.analysis_api import (
+    ANALYSIS_PATHS, ANALYSIS_TOKEN_HEADER, ANALYSIS_USER_HEADER, PROXIED_HEADERS,
+    analyze_landmarks, create_analysis_blueprint
+)
+
 try:
     from models.pose_analyzer import AdvancedPoseAnalyzer
     from models.data_recorder import WorkoutDataRecorder
@@ -47,6 +63,9 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# 实时姿态分析通道
+sock = Sock(app) if Sock else None
+
 # 中国时区设置
 CHINA_TZ = pytz.timezone('Asia/Shanghai')
 
@@ -86,6 +105,7 @@ class WorkoutSession(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     exercise_type = db.Column(db.String(50), nullable=False)
+    exercise_id = db.Column(db.Integer, index=True)  # 规范化后的运动编号（EXERCISE_IDS），统计按编号分组
     duration = db.Column(db.Integer)  # 秒
     reps_completed = db.Column(db.Integer)
     calories_burned = db.Column(db.Float)
@@ -169,11 +189,141 @@ def load_user(user_id):
 pose_analyzer = None
 data_recorder = None
 
+# 运动规格（名称、编号、计数阈值、评分和错误规则）启动时编译为 编号 -> 评估器 的分派表，
+# 关键点上传和图像帧分析共用；请求中的运动名称只做一次查表
+exercise_engine = ExerciseEngine.from_config(app.config)
+rep_specs = exercise_engine.rep_specs
+
+# 每个用户会话独立的姿态分析状态（计数、阶段），空闲后自动淘汰
+filter_specs = compile_filter_specs(
+    app.config.get('LANDMARK_FILTERS'),
+    frame_rate=app.config.get('EXERCISE_CONFIG', {}).get('frame_rate', 30)
+)
+analysis_sessions = PoseSessionRegistry(
+    idle_timeout=app.config.get('EXERCISE_CONFIG', {}).get('session_idle_timeout', 600),
+    rep_specs=rep_specs,
+    history_size=app.config.get('EXERCISE_CONFIG', {}).get('history_frames', 90),
+    filter_specs=filter_specs
+)
+
+def migrate_workout_exercise_ids():
+    """为旧数据库补充workout_session.exercise_id列和索引，并按运动名称回填编号（可重复执行）"""
+    table = WorkoutSession.__tablename__
+    columns = {column['name'] for column in inspect(db.engine).get_columns(table)}
+    with db.engine.begin() as connection:
+        if 'exercise_id' not in columns:
+            connection.execute(text(f'ALTER TABLE {table} ADD COLUMN exercise_id INTEGER'))
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_exercise_id ON {table} (exercise_id)'))
+
+        # 每种写法只规范化一次，按名称整体更新
+        names = connection.execute(
+            text(f'SELECT DISTINCT exercise_type FROM {table} WHERE exercise_id IS NULL')
+        ).scalars().all()
+        for name in names:
+            exercise_id = exercise_engine.exercise_id(name)
+            if exercise_id is not None:
+                connection.execute(
+                    text(f'UPDATE {table} SET exercise_id = :exercise_id '
+                         f'WHERE exercise_type = :name AND exercise_id IS NULL'),
+                    {'exercise_id': exercise_id, 'name': name}
+                )
+
+def get_analysis_session(session_id, exercise_type):
+    """获取当前用户的分析会话状态（会话ID带用户前缀，避免跨用户串扰）"""
+    session_key = f"{current_user.id}:{session_id or 'default'}"
+    return analysis_sessions.get_or_create(session_key, exercise_type)
+
+# 服务端图像帧推理进程池（第一次收到图像帧时启动）
+frame_pool = FrameWorkerPool(
+    workers=app.config.get('EXERCISE_CONFIG', {}).get('frame_workers', 0),
+    queue_size=app.config.get('EXERCISE_CONFIG', {}).get('frame_queue_size', 4),
+    timeout=app.config.get('EXERCISE_CONFIG', {}).get('frame_timeout', 5),
+    exercise_config=app.config.get('EXERCISE_CONFIG'),
+    pose_profiles=app.config.get('POSE_PROFILES')
+)
+atexit.register(frame_pool.shutdown)
+
+# 离线视频批量分析（第一次提交视频时启动推理进程池）
+video_pipeline = VideoAnalysisPipeline(
+    exercise_engine,
+    exercise_config=app.config.get('EXERCISE_CONFIG'),
+    pose_profiles=app.config.get('POSE_PROFILES'),
+    filter_specs=filter_specs,
+    workers=app.config.get('EXERCISE_CONFIG', {}).get('video_workers', 0),
+    batch_size=app.config.get('EXERCISE_CONFIG', {}).get('video_batch_size', 32),
+    stride=app.config.get('EXERCISE_CONFIG', {}).get('video_frame_stride', 1),
+    max_side=app.config.get('EXERCISE_CONFIG', {}).get('video_max_side', 640)
+)
+atexit.register(video_pipeline.shutdown)
+
+# 姿态分析接口：配置了独立分析服务（analysis_service.py）时只做转发，推理和评分在分析服务中完成，
+# 可以与账户/页面服务分别扩容；否则在本进程内处理
+analysis_service = app.config.get('ANALYSIS_SERVICE', {})
+if analysis_service.get('url'):
+    analysis_proxy = requests.Session()
+
+    @login_required
+    def proxy_analysis_request():
+        """把姿态分析请求原样转发到分析服务，附带共享令牌和当前用户标识"""
+        headers = {name: value for name, value in request.headers.items() if name.lower() in PROXIED_HEADERS}
+        headers[ANALYSIS_TOKEN_HEADER] = analysis_service.get('token', '')
+        headers[ANALYSIS_USER_HEADER] = str(current_user.id)
+        try:
+            upstream = analysis_proxy.post(
+                analysis_service['url'].rstrip('/') + request.path,
+                data=request.get_data(cache=False),
+                headers=headers,
+                timeout=analysis_service.get('timeout', 10)
+            )
+        except requests.RequestException as e:
+            return jsonify({
+                'success': False,
+                'message': f'分析服务不可用: {str(e)}'
+            }), 502
+        return upstream.content, upstream.status_code, {
+            'Content-Type': upstream.headers.get('Content-Type', 'application/json')
+        }
+
+    for analysis_path in ANALYSIS_PATHS:
+        app.add_url_rule(analysis_path, f"proxy{analysis_path.replace('/', '_')}",
+                         proxy_analysis_request, methods=['POST'])
+else:
+    app.register_blueprint(create_analysis_blueprint(
+        exercise_engine, analysis_sessions, frame_pool,
+        authorize=lambda: str(current_user.id) if current_user.is_authenticated else None,
+        unauthorized=login_manager.unauthorized
+    ))
+
+def init_app_data():
+    """创建数据表、执行数据迁移并初始化分析器（需在应用上下文中调用）"""
+    db.create_all()
+    migrate_workout_exercise_ids()
+    initialize_analyzers()
+    if data_recorder:
+        data_recorder.migrate_exercise_ids(exercise_engine.exercise_id)
+
 def initialize_analyzers():
     global pose_analyzer, data_recorder
     try:
-        pose_analyzer = AdvancedPoseAnalyzer()
-        data_recorder = WorkoutDataRecorder()
+        pose_analyzer = AdvancedPoseAnalyzer(
+            rep_specs=rep_specs,
+            exercise_config=app.config.get('EXERCISE_CONFIG'),
+            pose_profiles=app.config.get('POSE_PROFILES'),
+            filter_specs=filter_specs,
+            engine=exercise_engine
+        )
+        recorder_config = app.config.get('EXERCISE_CONFIG', {})
+        data_recorder = WorkoutDataRecorder(
+            idle_timeout=recorder_config.get('recorder_idle_timeout', 1800),
+            keep_details=recorder_config.get('recorder_keep_details', True),
+            pool_size=recorder_config.get('recorder_pool_size', 4),
+            busy_timeout=recorder_config.get('recorder_busy_timeout', 5),
+            synchronous=recorder_config.get('recorder_synchronous', 'NORMAL'),
+            spill_path=recorder_config.get('recorder_spill_path'),
+            write_queue_size=recorder_config.get('recorder_write_queue_size', 1024),
+            write_batch=recorder_config.get('recorder_write_batch', 64),
+            write_retries=recorder_config.get('recorder_write_retries', 3)
+        )
         print("深度学习分析器初始化成功")
     except Exception as e:
         print(f"分析器初始化失败: {e}")
@@ -352,7 +502,12 @@ def dashboard():
 @app.route('/workout')
 @login_required
 def workout():
-    return render_template('workout.html')
+    # 前端分析配置：使用独立分析服务时不开放本进程的实时通道，前端直接使用批量HTTP（经转发）
+    analysis_client = {
+        'analysisStream': sock is not None and not analysis_service.get('url'),
+        'exerciseIds': exercise_engine.exercise_ids
+    }
+    return render_template('workout.html', analysis_client=analysis_client)
 
 @app.route('/profile', methods=['GET', 'POST'])
 @login_required
@@ -638,6 +793,7 @@ def save_workout():
         workout = WorkoutSession(
             user_id=current_user.id,
             exercise_type=exercise_type,
+            exercise_id=exercise_engine.exercise_id(exercise_type),
             duration=int(data.get('duration', 0)),
             calories_burned=float(data.get('calories_burned', 0)),
             reps_completed=int(data.get('reps_completed', 0)),
@@ -659,454 +815,192 @@ def save_workout():
         print(f"保存训练数据错误: {e}")
         return jsonify({'success': False, 'message': f'保存失败: {str(e)}'})
 
-@app.route('/api/analyze_pose', methods=['POST'])
-@login_required
-def api_analyze_pose():
-    """分析姿态并返回准确率和反馈"""
+def pose_stream(ws):
+    """实时姿态分析通道：浏览器持续推送关键点帧，服务端返回阶段、评分、错误和次数
+
+    消息格式（JSON）：
+        {"type": "start", "exercise_type": "pushup", "session_id": "<客户端生成的分析会话ID，可选>"}
+        {"type": "frames", "frames": [{"timestamp": ..., "landmarks": [x, y, z, visibility, ...] 或 {...}}]}
+        {"type": "end"}
+    """
+    if not current_user.is_authenticated:
+        ws.send(json.dumps({'type': 'error', 'message': '请先登录'}))
+        return
+
+    max_frames = app.config.get('EXERCISE_CONFIG', {}).get('batch_max_frames', 120)
+    exercise = None
+    session_id = None
+    pose_session = None
+    ended = False
+    shared_session = False
+
     try:
-        data = request.get_json()
-        landmarks = data.get('landmarks')
-        exercise_type = data.get('exercise_type')
+        while True:
+            raw_message = ws.receive()
+            if raw_message is None:
+                break
 
-        if not landmarks or not exercise_type:
-            return jsonify({
-                'success': False,
-                'message': '缺少必要参数'
-            })
+            try:
+                message = json.loads(raw_message)
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                ws.send(json.dumps({'type': 'error', 'message': '消息格式错误'}))
+                continue
+
+            message_type = message.get('type')
+
+            if message_type == 'start':
+                if not message.get('exercise_type'):
+                    ws.send(json.dumps({'type': 'error', 'message': '缺少运动类型'}))
+                    continue
+                exercise = exercise_engine.resolve(message.get('exercise_type'))
+                if exercise is None:
+                    ws.send(json.dumps({'type': 'error', 'message': '不支持的运动类型'}, ensure_ascii=False))
+                    continue
+
+                if data_recorder:
+                    if session_id:
+                        data_recorder.end_session(session_id)
+                    session_id = data_recorder.start_session(current_user.id, exercise.key, exercise.id)
+
+                # 使用客户端的分析会话ID，实时通道断开后回退到HTTP时计数连续；未提供时每条连接独立
+                client_session_id = message.get('session_id')
+                shared_session = isinstance(client_session_id, str) and bool(client_session_id)
+                if not shared_session:
+                    client_session_id = f'ws_{id(ws)}'
+                pose_session = get_analysis_session(client_session_id, exercise.key)
+                pose_session.reset(exercise.key)
+
+                ws.send(json.dumps({'type': 'started', 'session_id': session_id, 'exercise_type': exercise.key}))
+
+            elif message_type == 'frames':
+                if not pose_session:
+                    ws.send(json.dumps({'type': 'error', 'message': '请先发送start消息'}))
+                    continue
+
+                frames = message.get('frames') or []
+                if not isinstance(frames, list):
+                    ws.send(json.dumps({'type': 'error', 'message': 'frames必须是帧对象数组'}))
+                    continue
+                if len(frames) > max_frames:
+                    ws.send(json.dumps({'type': 'error', 'message': f'单次最多提交{max_frames}帧'}))
+                    continue
+
+                results = []
+                for frame in frames:
+                    landmarks = frame.get('landmarks') if isinstance(frame, dict) else None
+                    if not landmarks:
+                        continue
+
+                    try:
+                        analysis_result = analyze_landmarks(landmarks, exercise, pose_session, timestamp=frame.get('timestamp'))
+                    except (ValueError, TypeError, KeyError) as e:
+                        ws.send(json.dumps({'type': 'error', 'message': f'关键点数据格式错误: {e}'}, ensure_ascii=False))
+                        continue
+                    analysis_result['timestamp'] = frame.get('timestamp')
+
+                    if analysis_result['rep_completed'] and data_recorder and session_id:
+                        data_recorder.record_rep(session_id, {
+                            'form_score': analysis_result['form_score'],
+                            'errors': analysis_result['errors']
+                        })
+
+                    results.append(analysis_result)
+
+                ws.send(json.dumps({'type': 'analysis', 'results': results, 'rep_count': pose_session.rep_count}, ensure_ascii=False))
+
+            elif message_type == 'end':
+                session_data = None
+                if data_recorder and session_id:
+                    session_data = data_recorder.end_session(session_id)
+                    session_id = None
+
+                rep_count = pose_session.rep_count if pose_session else 0
+                ws.send(json.dumps({'type': 'ended', 'rep_count': rep_count, 'session_data': session_data}, ensure_ascii=False))
+                ended = True
+                break
 
-        # 姿态分析器检查（可选，如果未初始化则使用内置分析）
-        global pose_analyzer
-        if pose_analyzer is None:
-            print("姿态分析器未初始化，使用内置分析")
-        else:
-            # 转换中文运动名称为英文
-            exercise_english_map = app.config.get('EXERCISE_ENGLISH_MAP', {})
-            english_exercise = exercise_english_map.get(exercise_type, exercise_type)
-
-            # 设置运动类型（如果分析器支持）
-            if hasattr(pose_analyzer, 'set_exercise'):
-                pose_analyzer.set_exercise(english_exercise)
-
-        # 模拟分析结果（实际应该调用pose_analyzer的分析方法）
-        analysis_result = {
-            'form_score': calculate_form_score(landmarks, exercise_type),
-            'errors': detect_form_errors(landmarks, exercise_type),
-            'phase': detect_exercise_phase(landmarks, exercise_type),
-            'feedback': get_exercise_feedback(landmarks, exercise_type)
-        }
+            else:
+                ws.send(json.dumps({'type': 'error', 'message': f'未知消息类型: {message_type}'}))
+
+    finally:
+        # 客户端会话在连接意外断开时保留（回退到HTTP后继续计数，空闲超时后清理）
+        if pose_session and (ended or not shared_session):
+            analysis_sessions.remove(pose_session.session_id)
+        # 连接中断时保存已记录的数据
+        if data_recorder and session_id:
+            data_recorder.end_session(session_id)
+
+# 配置了独立分析服务时，分析会话状态都在分析服务中；实时通道若在本进程处理，
+# 与回退后经转发的HTTP请求分属两个进程，同一会话的计数会被拆开，因此不开放
+if sock and not analysis_service.get('url'):
+    sock.route('/ws/pose')(pose_stream)
+
+@app.route('/api/analyze_video', methods=['POST'])
+@login_required
+def api_analyze_video():
+    """离线视频分析：上传一段训练视频（multipart字段video），服务端解码、推理并汇总次数、评分和错误
+
+    可选字段：exercise_type（必填）、profile（推理档位）、record（为true时写入训练记录）、
+    frames（为true时返回逐帧结果）。
+    """
+    # 使用独立分析服务时本进程不做推理
+    if analysis_service.get('url'):
+        return jsonify({
+            'success': False,
+            'message': '当前部署使用独立分析服务，暂不支持服务端视频分析'
+        }), 503
 
+    upload = request.files.get('video')
+    exercise_type = request.form.get('exercise_type')
+    if not upload or not exercise_type:
         return jsonify({
-            'success': True,
-            'analysis': analysis_result
+            'success': False,
+            'message': '缺少必要参数'
         })
 
-    except Exception as e:
+    exercise = exercise_engine.resolve(exercise_type)
+    if exercise is None:
         return jsonify({
             'success': False,
-            'message': f'姿态分析失败: {str(e)}'
+            'message': f'不支持的运动类型: {exercise_type}'
         })
 
-def calculate_form_score(landmarks, exercise_type):
-    """计算动作准确率"""
-    try:
-        # 转换中文运动名称为英文
-        exercise_english_map = app.config.get('EXERCISE_ENGLISH_MAP', {})
-        english_exercise = exercise_english_map.get(exercise_type, exercise_type)
-
-        # 根据运动类型计算准确率
-        if english_exercise == 'pushup' or exercise_type == '俯卧撑':
-            return calculate_pushup_accuracy(landmarks)
-        elif english_exercise == 'squat' or exercise_type == '深蹲':
-            return calculate_squat_accuracy(landmarks)
-        elif english_exercise == 'situp' or exercise_type == '仰卧起坐':
-            return calculate_situp_accuracy(landmarks)
-        elif english_exercise == 'plank' or exercise_type == '平板支撑':
-            return calculate_plank_accuracy(landmarks)
-        elif english_exercise == 'jumping_jacks' or exercise_type == '开合跳':
-            return calculate_jumping_jacks_accuracy(landmarks)
-        elif english_exercise == 'lunges' or exercise_type == '弓步蹲':
-            return calculate_lunges_accuracy(landmarks)
-        elif english_exercise == 'burpees' or exercise_type == '波比跳':
-            return calculate_burpees_accuracy(landmarks)
-        elif english_exercise == 'pull_ups' or exercise_type == '引体向上':
-            return calculate_pull_ups_accuracy(landmarks)
-        else:
-            return 75.0  # 默认分数
-    except:
-        return 50.0
-
-def calculate_pushup_accuracy(landmarks):
-    """计算俯卧撑准确率"""
+    record = request.form.get('record', 'false').lower() == 'true'
+    # OpenCV只能从文件读取视频，先写入临时文件
+    suffix = os.path.splitext(upload.filename or '')[1] or '.mp4'
+    video_file = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
     try:
-        # 获取关键点
-        left_shoulder = landmarks.get('left_shoulder', {})
-        left_elbow = landmarks.get('left_elbow', {})
-        left_wrist = landmarks.get('left_wrist', {})
-
-        if not all([left_shoulder, left_elbow, left_wrist]):
-            return 60.0
-
-        # 计算手臂角度
-        arm_angle = calculate_angle_from_points(left_shoulder, left_elbow, left_wrist)
-
-        # 根据角度计算准确率
-        if 60 <= arm_angle <= 120:  # 下降阶段
-            accuracy = 90 - abs(arm_angle - 90) * 2
-        elif 150 <= arm_angle <= 180:  # 上升阶段
-            accuracy = 95 - abs(arm_angle - 165) * 3
-        else:
-            accuracy = 70 - abs(arm_angle - 120) * 1.5
-
-        return max(30, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_squat_accuracy(landmarks):
-    """计算深蹲准确率"""
-    try:
-        # 获取关键点
-        left_hip = landmarks.get('left_hip', {})
-        left_knee = landmarks.get('left_knee', {})
-        left_ankle = landmarks.get('left_ankle', {})
-
-        if not all([left_hip, left_knee, left_ankle]):
-            return 60.0
-
-        # 计算膝盖角度
-        knee_angle = calculate_angle_from_points(left_hip, left_knee, left_ankle)
-
-        # 根据角度计算准确率
-        if 70 <= knee_angle <= 120:  # 下蹲阶段
-            accuracy = 95 - abs(knee_angle - 95) * 2
-        elif 150 <= knee_angle <= 180:  # 站立阶段
-            accuracy = 90 - abs(knee_angle - 165) * 2
-        else:
-            accuracy = 65 - abs(knee_angle - 120) * 1.5
-
-        return max(30, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_situp_accuracy(landmarks):
-    """计算仰卧起坐准确率"""
-    try:
-        # 获取关键点
-        left_shoulder = landmarks.get('left_shoulder', {})
-        left_hip = landmarks.get('left_hip', {})
-        left_knee = landmarks.get('left_knee', {})
-
-        if not all([left_shoulder, left_hip, left_knee]):
-            return 60.0
-
-        # 计算躯干角度
-        torso_angle = calculate_angle_from_points(left_shoulder, left_hip, left_knee)
-
-        # 根据角度计算准确率
-        if 30 <= torso_angle <= 80:  # 起身阶段
-            accuracy = 95 - abs(torso_angle - 55) * 2
-        elif 0 <= torso_angle <= 30:  # 躺下阶段
-            accuracy = 85 - abs(torso_angle - 15) * 2
-        else:
-            accuracy = 70 - abs(torso_angle - 55) * 1.5
-
-        return max(30, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_plank_accuracy(landmarks):
-    """计算平板支撑准确率"""
-    try:
-        # 获取关键点
-        left_shoulder = landmarks.get('left_shoulder', {})
-        left_hip = landmarks.get('left_hip', {})
-        left_ankle = landmarks.get('left_ankle', {})
-
-        if not all([left_shoulder, left_hip, left_ankle]):
-            return 60.0
-
-        # 计算身体直线度
-        body_angle = calculate_angle_from_points(left_shoulder, left_hip, left_ankle)
-
-        # 理想的平板支撑角度接近180度
-        angle_deviation = abs(body_angle - 180)
-
-        if angle_deviation <= 10:
-            accuracy = 95 - angle_deviation * 2
-        elif angle_deviation <= 20:
-            accuracy = 85 - (angle_deviation - 10) * 3
-        else:
-            accuracy = 70 - (angle_deviation - 20) * 2
-
-        return max(30, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_jumping_jacks_accuracy(landmarks):
-    """计算开合跳准确率"""
-    try:
-        # 获取关键点
-        left_shoulder = landmarks.get('left_shoulder', {})
-        left_wrist = landmarks.get('left_wrist', {})
-        left_hip = landmarks.get('left_hip', {})
-        left_ankle = landmarks.get('left_ankle', {})
-
-        if not all([left_shoulder, left_wrist, left_hip, left_ankle]):
-            return 60.0
-
-        # 计算手臂张开角度
-        arm_spread = abs(left_wrist.get('x', 0) - left_shoulder.get('x', 0))
-        # 计算腿部张开角度
-        leg_spread = abs(left_ankle.get('x', 0) - left_hip.get('x', 0))
-
-        # 根据张开程度计算准确率
-        if arm_spread > 50 and leg_spread > 30:  # 张开状态
-            accuracy = 90
-        elif arm_spread < 20 and leg_spread < 15:  # 合拢状态
-            accuracy = 85
-        else:  # 过渡状态
-            accuracy = 75
-
-        return max(50, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_lunges_accuracy(landmarks):
-    """计算弓步蹲准确率"""
-    try:
-        # 获取关键点
-        left_hip = landmarks.get('left_hip', {})
-        left_knee = landmarks.get('left_knee', {})
-        left_ankle = landmarks.get('left_ankle', {})
-        right_hip = landmarks.get('right_hip', {})
-        right_knee = landmarks.get('right_knee', {})
-        right_ankle = landmarks.get('right_ankle', {})
-
-        if not all([left_hip, left_knee, left_ankle, right_hip, right_knee, right_ankle]):
-            return 60.0
-
-        # 计算左右腿角度
-        left_leg_angle = calculate_angle_from_points(left_hip, left_knee, left_ankle)
-        right_leg_angle = calculate_angle_from_points(right_hip, right_knee, right_ankle)
-
-        # 弓步蹲的理想角度：前腿约90度，后腿伸展
-        front_leg_angle = min(left_leg_angle, right_leg_angle)
-        back_leg_angle = max(left_leg_angle, right_leg_angle)
-
-        # 根据角度计算准确率
-        if 80 <= front_leg_angle <= 100:  # 前腿角度理想
-            accuracy = 90 - abs(front_leg_angle - 90) * 2
-        else:
-            accuracy = 70 - abs(front_leg_angle - 90) * 1.5
-
-        return max(40, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_burpees_accuracy(landmarks):
-    """计算波比跳准确率"""
-    try:
-        # 获取关键点
-        left_shoulder = landmarks.get('left_shoulder', {})
-        left_hip = landmarks.get('left_hip', {})
-        left_knee = landmarks.get('left_knee', {})
-        left_ankle = landmarks.get('left_ankle', {})
-
-        if not all([left_shoulder, left_hip, left_knee, left_ankle]):
-            return 60.0
-
-        # 计算躯干角度
-        torso_angle = calculate_angle_from_points(left_shoulder, left_hip, left_knee)
-
-        # 波比跳包含多个阶段，根据躯干角度判断
-        if 160 <= torso_angle <= 180:  # 站立/跳跃阶段
-            accuracy = 90
-        elif 90 <= torso_angle <= 120:  # 蹲下阶段
-            accuracy = 85
-        elif 30 <= torso_angle <= 60:   # 平板支撑阶段
-            accuracy = 95
-        else:
-            accuracy = 70
-
-        return max(50, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_pull_ups_accuracy(landmarks):
-    """计算引体向上准确率"""
-    try:
-        # 获取关键点
-        left_shoulder = landmarks.get('left_shoulder', {})
-        left_elbow = landmarks.get('left_elbow', {})
-        left_wrist = landmarks.get('left_wrist', {})
-
-        if not all([left_shoulder, left_elbow, left_wrist]):
-            return 60.0
-
-        # 计算手臂角度
-        arm_angle = calculate_angle_from_points(left_shoulder, left_elbow, left_wrist)
-
-        # 引体向上的理想角度范围
-        if 60 <= arm_angle <= 90:  # 拉起阶段
-            accuracy = 95 - abs(arm_angle - 75) * 2
-        elif 150 <= arm_angle <= 180:  # 悬挂阶段
-            accuracy = 85 - abs(arm_angle - 165) * 2
-        else:
-            accuracy = 70 - abs(arm_angle - 120) * 1.5
-
-        return max(40, min(100, accuracy))
-    except:
-        return 65.0
-
-def calculate_angle_from_points(point1, point2, point3):
-    """根据三个点计算角度"""
-    try:
-        import math
-
-        # 获取坐标
-        x1, y1 = point1.get('x', 0), point1.get('y', 0)
-        x2, y2 = point2.get('x', 0), point2.get('y', 0)
-        x3, y3 = point3.get('x', 0), point3.get('y', 0)
+        upload.save(video_file)
+        video_file.close()
 
-        # 计算向量
-        v1 = (x1 - x2, y1 - y2)
-        v2 = (x3 - x2, y3 - y2)
-
-        # 计算角度
-        dot_product = v1[0] * v2[0] + v1[1] * v2[1]
-        magnitude1 = math.sqrt(v1[0]**2 + v1[1]**2)
-        magnitude2 = math.sqrt(v2[0]**2 + v2[1]**2)
-
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 90.0
-
-        cos_angle = dot_product / (magnitude1 * magnitude2)
-        cos_angle = max(-1, min(1, cos_angle))  # 限制在[-1, 1]范围内
-
-        angle_rad = math.acos(cos_angle)
-        angle_deg = math.degrees(angle_rad)
-
-        return angle_deg
-    except:
-        return 90.0
-
-def detect_form_errors(landmarks, exercise_type):
-    """检测动作错误"""
-    errors = []
-
-    try:
-        if exercise_type == 'pushup':
-            # 检测俯卧撑常见错误
-            arm_angle = calculate_angle_from_points(
-                landmarks.get('left_shoulder', {}),
-                landmarks.get('left_elbow', {}),
-                landmarks.get('left_wrist', {})
-            )
-
-            if arm_angle < 50:
-                errors.append({
-                    'type': 'form_error',
-                    'message': '下压过深，注意保护肩膀',
-                    'severity': 'medium'
-                })
-            elif arm_angle > 170:
-                errors.append({
-                    'type': 'form_error',
-                    'message': '手臂伸展过度，稍微弯曲',
-                    'severity': 'low'
-                })
-
-        elif exercise_type == 'squat':
-            # 检测深蹲常见错误
-            knee_angle = calculate_angle_from_points(
-                landmarks.get('left_hip', {}),
-                landmarks.get('left_knee', {}),
-                landmarks.get('left_ankle', {})
-            )
-
-            if knee_angle < 60:
-                errors.append({
-                    'type': 'form_error',
-                    'message': '蹲得太深，注意膝盖保护',
-                    'severity': 'medium'
-                })
-            elif knee_angle > 175:
-                errors.append({
-                    'type': 'form_error',
-                    'message': '站立过直，保持微弯',
-                    'severity': 'low'
-                })
-
-    except:
-        pass
-
-    return errors
-
-def detect_exercise_phase(landmarks, exercise_type):
-    """检测运动阶段"""
-    try:
-        if exercise_type == 'pushup':
-            arm_angle = calculate_angle_from_points(
-                landmarks.get('left_shoulder', {}),
-                landmarks.get('left_elbow', {}),
-                landmarks.get('left_wrist', {})
-            )
-
-            if arm_angle <= 90:
-                return 'down'
-            elif arm_angle >= 150:
-                return 'up'
-            else:
-                return 'transition'
-
-        elif exercise_type == 'squat':
-            knee_angle = calculate_angle_from_points(
-                landmarks.get('left_hip', {}),
-                landmarks.get('left_knee', {}),
-                landmarks.get('left_ankle', {})
-            )
-
-            if knee_angle <= 100:
-                return 'down'
-            elif knee_angle >= 150:
-                return 'up'
-            else:
-                return 'transition'
-
-    except:
-        pass
-
-    return 'unknown'
-
-def get_exercise_feedback(landmarks, exercise_type):
-    """获取运动反馈"""
-    phase = detect_exercise_phase(landmarks, exercise_type)
-
-    feedback_map = {
-        'pushup': {
-            'down': '很好！保持下压姿势',
-            'up': '完成一次！准备下一个',
-            'transition': '继续保持动作',
-            'unknown': '调整姿势，保持标准动作'
-        },
-        'squat': {
-            'down': '很好！保持蹲下姿势',
-            'up': '完成一次！准备下一个',
-            'transition': '继续保持动作',
-            'unknown': '调整姿势，保持标准动作'
-        },
-        'situp': {
-            'down': '很好！保持起身姿势',
-            'up': '完成一次！准备下一个',
-            'transition': '继续保持动作',
-            'unknown': '调整姿势，保持标准动作'
-        },
-        'plank': {
-            'hold': '保持住！身体保持直线',
-            'unknown': '调整姿势，保持身体直线'
-        }
-    }
+        summary = video_pipeline.summarize(
+            video_file.name, exercise.id,
+            profile=request.form.get('profile'),
+            recorder=data_recorder if record else None,
+            user_id=current_user.id,
+            keep_frames=request.form.get('frames', 'false').lower() == 'true'
+        )
+        return jsonify({
+            'success': True,
+            'summary': summary
+        })
 
-    return feedback_map.get(exercise_type, {}).get(phase, '继续保持动作')
+    except VideoPipelineError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+    except Exception as e:
+        print(f"视频分析错误: {e}")
+        return jsonify({
+            'success': False,
+            'message': f'视频分析失败: {str(e)}'
+        })
+    finally:
+        video_file.close()
+        os.remove(video_file.name)
 
 @app.route('/api/save_workout', methods=['POST'])
 @login_required
@@ -1137,6 +1031,7 @@ def api_save_workout():
         workout = WorkoutSession(
             user_id=current_user.id,
             exercise_type=exercise_type,
+            exercise_id=exercise_engine.exercise_id(exercise_type),
             duration=duration,
             calories_burned=calories_burned,
             reps_completed=reps_completed,
@@ -1704,39 +1599,6 @@ def admin_logs():
         })
 
 # 深度学习分析API端点
-@app.route('/api/analyze_pose', methods=['POST'])
-@login_required
-def analyze_pose():
-    """分析用户姿态数据"""
-    try:
-        data = request.get_json()
-        landmarks = data.get('landmarks')
-        exercise_type = data.get('exercise_type')
-        
-        if not pose_analyzer:
-            return jsonify({
-                'success': False,
-                'message': '姿态分析器未初始化'
-            })
-        
-        # 设置当前运动类型
-        pose_analyzer.set_exercise(exercise_type)
-        
-        # 分析姿态
-        analysis_result = pose_analyzer.analyze_frame(landmarks)
-        
-        return jsonify({
-            'success': True,
-            'analysis': analysis_result
-        })
-        
-    except Exception as e:
-        print(f"姿态分析错误: {e}")
-        return jsonify({
-            'success': False,
-            'message': '姿态分析失败'
-        })
-
 @app.route('/api/start_session', methods=['POST'])
 @login_required
 def start_workout_session():
@@ -1750,9 +1612,16 @@ def start_workout_session():
                 'success': False,
                 'message': '数据记录器未初始化'
             })
+
+        exercise = exercise_engine.resolve(exercise_type)
+        if exercise is None:
+            return jsonify({
+                'success': False,
+                'message': f'不支持的运动类型: {exercise_type}'
+            })
         
-        # 开始新会话
-        session_id = data_recorder.start_session(current_user.id, exercise_type)
+        # 开始新会话（记录规范名称和编号）
+        session_id = data_recorder.start_session(current_user.id, exercise.key, exercise.id)
         
         return jsonify({
             'success': True,
@@ -1780,6 +1649,12 @@ def end_workout_session():
                 'message': '数据记录器未初始化'
             })
         
+        if data_recorder.session_user(session_id) != current_user.id:
+            return jsonify({
+                'success': False,
+                'message': '会话不存在或已结束'
+            })
+        
         # 结束会话并保存数据
         session_data = data_recorder.end_session(session_id)
         
@@ -1811,8 +1686,17 @@ def record_repetition():
                 'message': '数据记录器未初始化'
             })
         
+        if data_recorder.session_user(session_id) != current_user.id:
+            return jsonify({
+                'success': False,
+                'message': '会话不存在或已结束'
+            })
+        
         # 记录重复次数
-        data_recorder.record_rep(session_id, form_score, errors)
+        data_recorder.record_rep(session_id, {
+            'form_score': form_score,
+            'errors': errors
+        })
         
         return jsonify({
             'success': True,
@@ -1828,8 +1712,7 @@ def record_repetition():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
-        initialize_analyzers()
+        init_app_data()
 
         # 创建超级管理员账户（如果不存在）
         admin_config = app.config.get('SUPER_ADMIN', {})
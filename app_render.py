@@ -19,50 +19,59 @@ os.environ.setdefault('FLASK_DEBUG', 'False')
 os.environ.setdefault('FLASK_HOST', '0.0.0.0')
 os.environ.setdefault('FLASK_PORT', '10000')
 
-# 确保必要目录存在
-instance_dir = project_root / 'instance'
-instance_dir.mkdir(exist_ok=True)
 
-upload_dir = project_root / 'static' / 'uploads'
-upload_dir.mkdir(parents=True, exist_ok=True)
+def main():
+    """创建必要目录、初始化数据并启动Flask应用"""
+    # 确保必要目录存在
+    instance_dir = project_root / 'instance'
+    instance_dir.mkdir(exist_ok=True)
 
-avatar_dir = upload_dir / 'avatars'
-avatar_dir.mkdir(exist_ok=True)
+    upload_dir = project_root / 'static' / 'uploads'
+    upload_dir.mkdir(parents=True, exist_ok=True)
 
-logs_dir = project_root / 'logs'
-logs_dir.mkdir(exist_ok=True)
+    avatar_dir = upload_dir / 'avatars'
+    avatar_dir.mkdir(exist_ok=True)
 
-print("🚀 启动AI智能健身指导系统 (Render部署)")
-print(f"📁 项目目录: {project_root}")
-print(f"🗄️ 数据库目录: {instance_dir}")
-print(f"📤 上传目录: {upload_dir}")
-print(f"📝 日志目录: {logs_dir}")
+    logs_dir = project_root / 'logs'
+    logs_dir.mkdir(exist_ok=True)
 
-# 导入并启动Flask应用
-try:
-    from app import app, init_app_data
+    print("🚀 启动AI智能健身指导系统 (Render部署)")
+    print(f"📁 项目目录: {project_root}")
+    print(f"🗄️ 数据库目录: {instance_dir}")
+    print(f"📤 上传目录: {upload_dir}")
+    print(f"📝 日志目录: {logs_dir}")
+
+    # 导入并启动Flask应用
+    try:
+        from app import app, init_app_data
     
-    # 初始化应用数据
-    with app.app_context():
-        init_app_data()
+        # 初始化应用数据
+        with app.app_context():
+            init_app_data()
     
-    # 获取端口
-    port = int(os.environ.get('PORT', 10000))
-    host = os.environ.get('FLASK_HOST', '0.0.0.0')
+        # 获取端口
+        port = int(os.environ.get('PORT', 10000))
+        host = os.environ.get('FLASK_HOST', '0.0.0.0')
     
-    print(f"🌐 服务地址: http://{host}:{port}")
-    print("✅ 应用启动成功！")
+        print(f"🌐 服务地址: http://{host}:{port}")
+        print("✅ 应用启动成功！")
     
-    # 启动应用
-    app.run(
-        host=host,
-        port=port,
-        debug=False,
-        threaded=True
-    )
+        # 启动应用
+        app.run(
+            host=host,
+            port=port,
+            debug=False,
+            threaded=True
+        )
     
-except Exception as e:
-    print(f"❌ 应用启动失败: {e}")
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
\ No newline at end of file
+    except Exception as e:
+        print(f"❌ 应用启动失败: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+# 图像帧推理和视频分析使用spawn子进程，子进程会重新导入本脚本（作为__mp_main__），
+# 启动逻辑必须放在 __main__ 保护内，否则每个子进程都会重新初始化应用并尝试监听同一端口
+if __name__ == '__main__':
+    main()
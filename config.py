@@ -71,7 +71,66 @@ class Config:
         'min_detection_confidence': float(os.environ.get('MIN_DETECTION_CONFIDENCE', 0.3)),
         'frame_rate': int(os.environ.get('FRAME_RATE', 30)),
         'video_width': int(os.environ.get('VIDEO_WIDTH', 640)),
-        'video_height': int(os.environ.get('VIDEO_HEIGHT', 480))
+        'video_height': int(os.environ.get('VIDEO_HEIGHT', 480)),
+        'batch_max_frames': int(os.environ.get('ANALYSIS_BATCH_MAX_FRAMES', 120)),
+        'session_idle_timeout': int(os.environ.get('ANALYSIS_SESSION_IDLE_TIMEOUT', 600)),
+        'recorder_idle_timeout': int(os.environ.get('RECORDER_SESSION_IDLE_TIMEOUT', 1800)),
+        'recorder_keep_details': os.environ.get('RECORDER_KEEP_DETAILS', 'True').lower() == 'true',
+        'recorder_pool_size': int(os.environ.get('RECORDER_DB_POOL_SIZE', 4)),
+        'recorder_busy_timeout': float(os.environ.get('RECORDER_DB_TIMEOUT', 5)),
+        'recorder_synchronous': os.environ.get('RECORDER_DB_SYNCHRONOUS', 'NORMAL'),
+        'recorder_write_queue_size': int(os.environ.get('RECORDER_WRITE_QUEUE_SIZE', 1024)),
+        'recorder_write_batch': int(os.environ.get('RECORDER_WRITE_BATCH', 64)),
+        'recorder_write_retries': int(os.environ.get('RECORDER_WRITE_RETRIES', 3)),
+        'recorder_spill_path': os.environ.get('RECORDER_SPILL_PATH') or None,
+        'history_frames': int(os.environ.get('ANALYSIS_HISTORY_FRAMES', 90)),
+        'rep_smoothing_window': int(os.environ.get('REP_SMOOTHING_WINDOW', 3)),
+        'rep_min_dwell_frames': int(os.environ.get('REP_MIN_DWELL_FRAMES', 2)),
+        'pose_profile': os.environ.get('POSE_PROFILE', 'full'),
+        'pose_latency_budget_ms': float(os.environ.get('POSE_LATENCY_BUDGET_MS', 80)),
+        'adaptive_aggressiveness': float(os.environ.get('POSE_ADAPTIVE_AGGRESSIVENESS', 0.5)),
+        'frame_workers': int(os.environ.get('FRAME_WORKERS', 0)),
+        'frame_queue_size': int(os.environ.get('FRAME_QUEUE_SIZE', 4)),
+        'frame_timeout': float(os.environ.get('FRAME_TIMEOUT', 5)),
+        'video_workers': int(os.environ.get('VIDEO_WORKERS', 0)),
+        'video_batch_size': int(os.environ.get('VIDEO_BATCH_SIZE', 32)),
+        'video_frame_stride': int(os.environ.get('VIDEO_FRAME_STRIDE', 1)),
+        'video_max_side': int(os.environ.get('VIDEO_MAX_SIDE', 640))
+    }
+    
+    # 服务端姿态推理档位（MediaPipe模型复杂度、是否分割、推理前缩放的最长边）
+    POSE_PROFILES = {
+        'lite': {
+            'model_complexity': 0,
+            'enable_segmentation': False,
+            'input_size': int(os.environ.get('POSE_LITE_INPUT_SIZE', 256))
+        },
+        'full': {
+            'model_complexity': 1,
+            'enable_segmentation': False,
+            'input_size': int(os.environ.get('POSE_FULL_INPUT_SIZE', 480))
+        },
+        'heavy': {
+            'model_complexity': 2,
+            'enable_segmentation': os.environ.get('POSE_HEAVY_SEGMENTATION', 'True').lower() == 'true',
+            'input_size': None
+        }
+    }
+    
+    # 关键点时域滤波（one_euro/ema/none），按运动类型覆盖默认参数
+    LANDMARK_FILTERS = {
+        'default': {
+            'type': os.environ.get('LANDMARK_FILTER', 'one_euro'),
+            'min_cutoff': float(os.environ.get('LANDMARK_FILTER_MIN_CUTOFF', 1.0)),
+            'beta': float(os.environ.get('LANDMARK_FILTER_BETA', 5.0)),
+            'd_cutoff': 1.0,
+            'alpha': float(os.environ.get('LANDMARK_FILTER_ALPHA', 0.5))
+        },
+        # 静态保持动作：更强的平滑
+        'plank': {'min_cutoff': 0.3, 'beta': 1.0},
+        # 快速动作：运动时更快跟随，减少峰值被削平
+        'jumping_jacks': {'beta': 10.0},
+        'burpees': {'beta': 10.0}
     }
     
     # 运动类型配置
@@ -158,6 +217,18 @@ class Config:
         '引体向上': 'pull_ups'
     }
 
+    # 运动类型编号（二进制关键点上传格式的头部使用，0保留为未指定）
+    EXERCISE_IDS = {
+        'pushup': 1,
+        'squat': 2,
+        'situp': 3,
+        'plank': 4,
+        'jumping_jacks': 5,
+        'lunges': 6,
+        'burpees': 7,
+        'pull_ups': 8
+    }
+
     # 运动阈值配置
     EXERCISE_THRESHOLDS = {
         'pushup': {
@@ -182,6 +253,7 @@ class Config:
         },
         'jumping_jacks': {
             'arm_threshold': int(os.environ.get('JUMPING_JACKS_ARM_THRESHOLD', 120)),
+            'arm_down_threshold': int(os.environ.get('JUMPING_JACKS_ARM_DOWN_THRESHOLD', 40)),
             'leg_threshold': int(os.environ.get('JUMPING_JACKS_LEG_THRESHOLD', 60)),
             'sensitivity': os.environ.get('JUMPING_JACKS_SENSITIVITY', 'high')
         },
@@ -203,6 +275,29 @@ class Config:
         }
     }
     
+    # 运动评分/错误规则（覆盖models/exercise_engine.py中DEFAULT_EXERCISE_SPECS的同名项）
+    # 新增运动只需在EXERCISE_TYPES、EXERCISE_IDS、EXERCISE_THRESHOLDS和这里各加一项，例如：
+    # 'side_plank': {
+    #     'angles': [('body_angle', ('left_shoulder', 'left_hip', 'left_ankle'))],
+    #     'derived': {'body_line': ('deviation', ('body_angle',))},
+    #     'score': {'feature': 'body_line', 'bands': [{'range': (0, 15), 'score': 95, 'slope': 2}],
+    #               'fallback': {'score': 65, 'center': 15, 'slope': 2}, 'clip': (30, 100)},
+    #     'rep': {'feature': 'body_angle', 'mode': 'hold', 'low_key': 'min_angle', 'high_key': 'max_angle',
+    #             'low': 160, 'high': 180},
+    # }
+    EXERCISE_SPECS = {}
+
+    # ==================== 分析服务配置 ====================
+    # 独立姿态分析服务（analysis_service.py）。主应用配置了url时把分析请求转发过去，
+    # 两端用同一个token校验；url为空时主应用自己处理分析请求
+    ANALYSIS_SERVICE = {
+        'url': os.environ.get('ANALYSIS_SERVICE_URL', ''),
+        'token': os.environ.get('ANALYSIS_SERVICE_TOKEN', ''),
+        'timeout': float(os.environ.get('ANALYSIS_SERVICE_TIMEOUT', 10)),
+        'host': os.environ.get('ANALYSIS_SERVICE_HOST', '0.0.0.0'),
+        'port': int(os.environ.get('ANALYSIS_SERVICE_PORT', 5001))
+    }
+    
     # ==================== 安全配置 ====================
     # 会话配置
     PERMANENT_SESSION_LIFETIME = timedelta(
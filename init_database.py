@@ -48,12 +48,13 @@ def init_database(create_sample=True):
     
     try:
         # 直接导入app和数据库实例
-        from app import app, db, User, WorkoutSession, FitnessGoal, FitnessPlan
+        from app import app, db, User, WorkoutSession, FitnessGoal, FitnessPlan, migrate_workout_exercise_ids
         
         with app.app_context():
             # 创建所有表
             print("📊 创建数据库表...")
             db.create_all()
+            migrate_workout_exercise_ids()
             print("✅ 数据库表创建完成")
             
             # 创建必要的目录
@@ -6,7 +6,7 @@
 Initialize Test Data
 """
 
-from app import app, db, User, WorkoutSession
+from app import app, db, User, WorkoutSession, exercise_engine
 from datetime import datetime, timedelta
 import random
 
@@ -63,6 +63,7 @@ def init_test_data():
                     workout = WorkoutSession(
                         user_id=user.id,
                         exercise_type=exercise,
+                        exercise_id=exercise_engine.exercise_id(exercise),
                         duration=duration,
                         calories_burned=calories,
                         reps_completed=reps,
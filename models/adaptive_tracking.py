@@ -0,0 +1,109 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .landmark_frame import LandmarkFrame
+
+# 运动检测缩略图尺寸（宽, 高），只用于判断画面是否变化
+THUMBNAIL_SIZE = (48, 36)
+
+# 计算人体包围框时只使用可见度高于该值的关键点
+ROI_MIN_VISIBILITY = 0.5
+
+
+class AdaptiveTracker:
+    """单个会话的自适应推理状态：跳帧 + 感兴趣区域（ROI）裁剪
+
+    aggressiveness取0~1：
+      0   每帧全图推理（关闭自适应）
+      0.5 画面变化小时最多连续跳过2帧，推理时裁剪到上一帧人体区域
+      1   最多连续跳过4帧（约5倍减少推理次数），裁剪边距更小
+    跳过的帧沿用最近一次推理的关键点；画面变化以缩略图平均灰度差衡量，
+    超过阈值或达到最大连续跳帧数时必须重新推理，因此计数所需的动作峰谷不会被跳过。
+    """
+
+    __slots__ = (
+        'aggressiveness', 'max_skip', 'diff_threshold', 'roi_margin',
+        'last_landmarks', 'last_thumbnail', 'roi', 'skipped', 'frames', 'inferences'
+    )
+
+    def __init__(self, aggressiveness: float = 0.5):
+        self.aggressiveness = min(max(aggressiveness, 0.0), 1.0)
+        self.max_skip = int(round(self.aggressiveness * 4))
+        self.diff_threshold = 2.0 + self.aggressiveness * 6.0
+        self.roi_margin = 0.35 - self.aggressiveness * 0.15
+        self.frames = 0
+        self.inferences = 0
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return self.aggressiveness > 0
+
+    @property
+    def inference_ratio(self) -> float:
+        """实际推理帧数占总帧数的比例"""
+        return self.inferences / self.frames if self.frames else 1.0
+
+    def reset(self):
+        """丢失目标时清空跟踪状态，下一帧做全图推理"""
+        self.last_landmarks: Optional[LandmarkFrame] = None
+        self.last_thumbnail: Optional[np.ndarray] = None
+        self.roi: Optional[Tuple[float, float, float, float]] = None
+        self.skipped = 0
+
+    def should_skip(self, thumbnail: np.ndarray) -> bool:
+        """画面相对上次推理变化很小时跳过推理"""
+        self.frames += 1
+        if (not self.enabled or self.last_landmarks is None
+                or self.last_thumbnail is None or self.skipped >= self.max_skip):
+            return False
+
+        difference = np.abs(thumbnail - self.last_thumbnail).mean()
+        if difference >= self.diff_threshold:
+            return False
+
+        self.skipped += 1
+        return True
+
+    def crop_box(self, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """返回当前ROI的像素坐标 (x0, y0, x1, y1)，没有ROI时返回None"""
+        if not self.enabled or self.roi is None:
+            return None
+        x0, y0, x1, y1 = self.roi
+        box = (int(x0 * width), int(y0 * height), int(np.ceil(x1 * width)), int(np.ceil(y1 * height)))
+        if box[2] - box[0] < 32 or box[3] - box[1] < 32:
+            return None
+        return box
+
+    def update(self, landmarks: LandmarkFrame, thumbnail: np.ndarray):
+        """记录一次推理结果；人体移出当前ROI时才重新计算ROI，保持裁剪区域稳定"""
+        self.inferences += 1
+        self.last_landmarks = landmarks
+        self.last_thumbnail = thumbnail
+        self.skipped = 0
+
+        if not self.enabled:
+            return
+
+        points = landmarks.data
+        visible = points[points[:, 3] >= ROI_MIN_VISIBILITY, :2]
+        if len(visible) < 4:
+            self.roi = None
+            return
+
+        x0, y0 = visible.min(axis=0)
+        x1, y1 = visible.max(axis=0)
+        if self.roi is not None:
+            rx0, ry0, rx1, ry1 = self.roi
+            if rx0 <= x0 and ry0 <= y0 and x1 <= rx1 and y1 <= ry1:
+                return
+
+        margin_x = (x1 - x0) * self.roi_margin
+        margin_y = (y1 - y0) * self.roi_margin
+        self.roi = (
+            max(0.0, float(x0 - margin_x)),
+            max(0.0, float(y0 - margin_y)),
+            min(1.0, float(x1 + margin_x)),
+            min(1.0, float(y1 + margin_y))
+        )
@@ -0,0 +1,338 @@
+from typing import Callable, Optional
+
+from flask import Blueprint, current_app, g, jsonify, request
+
+from .exercise_engine import ExerciseEngine
+from .frame_workers import FramePoolBusy, FramePoolError, FrameWorkerPool
+from .landmark_frame import LandmarkFrame, stack_landmark_payloads
+from .pose_kernel import split_feature_rows
+from .session_registry import PoseSessionRegistry
+from .wire_format import PACKET_CONTENT_TYPE, LandmarkPacketError, decode_landmark_packet
+
+# 姿态分析接口路径（主应用转发到独立分析服务时使用同样的路径）
+ANALYSIS_PATHS = ('/api/analyze_pose', '/api/analyze_pose_batch', '/api/analyze_frame')
+
+# 主应用与分析服务之间的共享令牌和用户标识请求头
+ANALYSIS_TOKEN_HEADER = 'X-Analysis-Token'
+ANALYSIS_USER_HEADER = 'X-Analysis-User'
+
+# 转发时保留的客户端请求头（小写）
+PROXIED_HEADERS = frozenset(('content-type', 'x-session-id', 'x-exercise-type', 'x-pose-profile'))
+
+
+def client_seconds(timestamp):
+    """客户端帧时间戳（毫秒）转换为秒，缺失时返回None"""
+    return timestamp / 1000.0 if isinstance(timestamp, (int, float)) else None
+
+
+def analyze_landmarks(landmarks, exercise, pose_session=None, features=None, timestamp=None):
+    """对单帧关键点做完整分析（评分、错误、阶段、反馈），并推进会话计数
+
+    exercise为ExerciseEngine.resolve()得到的运动评估器。
+    timestamp为客户端帧时间戳（毫秒），用于平板支撑等按时间累计的运动。
+    有会话且未传入features时先做时域滤波；传入features表示调用方已处理过该帧（见批量分析）。
+    """
+    # 统一转换为紧凑的数组表示，兼容扁平数组和旧的字典格式
+    landmarks = LandmarkFrame.from_payload(landmarks)
+    frame_time = client_seconds(timestamp)
+
+    if pose_session is None:
+        evaluation = exercise.evaluate(landmarks.data, features)
+        analysis_result = {
+            'form_score': evaluation['form_score'],
+            'errors': evaluation['errors'],
+            'phase': exercise.phase(evaluation['values'])
+        }
+    else:
+        with pose_session.lock:
+            if features is None:
+                landmarks = pose_session.smooth(landmarks, frame_time)
+            pose_session.record_frame(landmarks.data, frame_time)
+
+            # 关节角每帧只计算一次，评分、错误规则和计数器共用
+            evaluation = exercise.evaluate(landmarks.data, features, pose_session.landmark_stats)
+            analysis_result = {
+                'form_score': evaluation['form_score'],
+                'errors': evaluation['errors'],
+                # 服务端计数器按配置阈值判断阶段并计数（带平滑和去抖）
+                'rep_completed': pose_session.update(evaluation['values'], frame_time),
+                'rep_count': pose_session.rep_count,
+                'phase': pose_session.phase
+            }
+            pose_session.record_errors(evaluation['errors'])
+            if exercise.rep_spec is not None and exercise.rep_spec.mode == 'hold':
+                analysis_result['hold_time'] = round(pose_session.counter.hold_time, 2)
+
+    analysis_result['feedback'] = exercise.feedback_for(analysis_result['phase'])
+
+    return analysis_result
+
+
+def analyze_landmark_batch(frames_array, exercise, pose_session, timestamps):
+    """对 (帧数, 33, 4) 关键点数组批量分析，关节角整批一次向量化计算
+
+    整批在会话锁内处理，同一会话的并发请求不会在滤波和逐帧计数之间交错。
+    """
+    with pose_session.lock:
+        # 先按时间顺序逐帧滤波，再整批计算关节角
+        frames_array = pose_session.landmark_filter.apply_batch(
+            frames_array, [client_seconds(timestamp) for timestamp in timestamps]
+        )
+
+        feature_rows = split_feature_rows(
+            exercise.batch_features(frames_array), len(frames_array)
+        )
+
+        results = []
+        for frame_data, features, timestamp in zip(frames_array, feature_rows, timestamps):
+            analysis_result = analyze_landmarks(LandmarkFrame(frame_data), exercise, pose_session, features, timestamp)
+            analysis_result['timestamp'] = timestamp
+            results.append(analysis_result)
+    return results
+
+
+def create_analysis_blueprint(engine: ExerciseEngine, sessions: PoseSessionRegistry, frame_pool: FrameWorkerPool,
+                              authorize: Callable[[], Optional[str]],
+                              unauthorized: Optional[Callable] = None) -> Blueprint:
+    """姿态分析接口（/api/analyze_pose、/api/analyze_pose_batch、/api/analyze_frame）
+
+    主应用和独立分析服务共用同一组路由，只是鉴权方式不同：
+    authorize()返回当前调用方的标识（分析会话按它加前缀隔离），未授权时返回None，
+    此时调用unauthorized()生成响应（缺省返回401）。
+    """
+    blueprint = Blueprint('analysis', __name__)
+
+    @blueprint.before_request
+    def require_caller():
+        owner = authorize()
+        if owner is None:
+            if unauthorized is not None:
+                return unauthorized()
+            return jsonify({'success': False, 'message': '未授权的请求'}), 401
+        g.analysis_owner = owner
+
+    def read_json_body():
+        """读取JSON请求体，不是JSON对象时返回None（不抛出异常）"""
+        data = request.get_json(silent=True)
+        return data if isinstance(data, dict) else None
+
+    def bad_request(message):
+        return jsonify({'success': False, 'message': message}), 400
+
+    def get_session(session_id, exercise_type):
+        """获取调用方的分析会话状态（会话ID带调用方前缀，避免跨用户串扰）"""
+        session_key = f"{g.analysis_owner}:{session_id or 'default'}"
+        return sessions.get_or_create(session_key, exercise_type)
+
+    def read_landmark_packet():
+        """解析二进制关键点上传（application/octet-stream），返回 (运动评估器, 时间戳列表, 关键点数组)"""
+        packet = decode_landmark_packet(request.get_data(cache=False))
+
+        exercise = engine.resolve(packet.exercise_id)
+        if exercise is None:
+            raise LandmarkPacketError(f'未知的运动类型编号: {packet.exercise_id}')
+
+        return exercise, packet.timestamps, packet.frames
+
+    @blueprint.route('/api/analyze_pose', methods=['POST'])
+    def api_analyze_pose():
+        """分析姿态并返回准确率和反馈（支持JSON和二进制关键点上传）"""
+        try:
+            if request.mimetype == PACKET_CONTENT_TYPE:
+                exercise, timestamps, frames_array = read_landmark_packet()
+                if len(frames_array) != 1:
+                    return bad_request('单帧接口只接受1帧数据，多帧请使用批量接口')
+
+                pose_session = get_session(request.headers.get('X-Session-Id'), exercise.key)
+                analysis_result = analyze_landmark_batch(frames_array, exercise, pose_session, timestamps)[0]
+
+                return jsonify({
+                    'success': True,
+                    'analysis': analysis_result
+                })
+
+            data = read_json_body()
+            if data is None:
+                return bad_request('请求体必须是JSON对象')
+            landmarks = data.get('landmarks')
+            exercise_type = data.get('exercise_type')
+
+            if not landmarks or not exercise_type:
+                return bad_request('缺少必要参数')
+
+            # 中英文名称和编号都直接查表
+            exercise = engine.resolve(exercise_type)
+            if exercise is None:
+                return bad_request(f'不支持的运动类型: {exercise_type}')
+
+            try:
+                landmarks = LandmarkFrame.from_payload(landmarks)
+            except (ValueError, TypeError, KeyError) as e:
+                return bad_request(f'关键点数据格式错误: {str(e)}')
+
+            # 每个会话独立计数，不再重置全局分析器状态
+            pose_session = get_session(data.get('session_id'), exercise.key)
+
+            analysis_result = analyze_landmarks(landmarks, exercise, pose_session, timestamp=data.get('timestamp'))
+
+            return jsonify({
+                'success': True,
+                'analysis': analysis_result
+            })
+
+        except LandmarkPacketError as e:
+            return bad_request(f'关键点数据格式错误: {str(e)}')
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': f'姿态分析失败: {str(e)}'
+            })
+
+    @blueprint.route('/api/analyze_pose_batch', methods=['POST'])
+    def api_analyze_pose_batch():
+        """批量分析多帧姿态数据（客户端按时间窗口合并后一次提交，支持JSON和二进制关键点上传）"""
+        try:
+            max_frames = current_app.config.get('EXERCISE_CONFIG', {}).get('batch_max_frames', 120)
+
+            if request.mimetype == PACKET_CONTENT_TYPE:
+                exercise, timestamps, frames_array = read_landmark_packet()
+                if len(frames_array) > max_frames:
+                    return bad_request(f'单次最多提交{max_frames}帧')
+
+                pose_session = get_session(request.headers.get('X-Session-Id'), exercise.key)
+                results = analyze_landmark_batch(frames_array, exercise, pose_session, timestamps)
+
+                return jsonify({
+                    'success': True,
+                    'exercise_type': exercise.key,
+                    'results': results,
+                    'rep_count': pose_session.rep_count
+                })
+
+            data = read_json_body()
+            if data is None:
+                return bad_request('请求体必须是JSON对象')
+            frames = data.get('frames')
+            exercise_type = data.get('exercise_type')
+
+            if not frames or not exercise_type:
+                return bad_request('缺少必要参数')
+
+            if not isinstance(frames, list):
+                return bad_request('frames必须是帧对象数组')
+
+            if len(frames) > max_frames:
+                return bad_request(f'单次最多提交{max_frames}帧')
+
+            # 整批只查一次运动评估器
+            exercise = engine.resolve(exercise_type)
+            if exercise is None:
+                return bad_request(f'不支持的运动类型: {exercise_type}')
+            pose_session = get_session(data.get('session_id'), exercise.key)
+
+            # 整批关键点一次向量化计算关节角
+            valid_frames = [frame for frame in frames if isinstance(frame, dict) and frame.get('landmarks')]
+            valid_results = iter([])
+            if valid_frames:
+                # 关键点可以是扁平数组（33 × [x, y, z, visibility]）或按名称的字典
+                try:
+                    frames_array = stack_landmark_payloads([frame['landmarks'] for frame in valid_frames])
+                except (ValueError, TypeError, KeyError) as e:
+                    return bad_request(f'关键点数据格式错误: {str(e)}')
+                valid_results = iter(analyze_landmark_batch(
+                    frames_array, exercise, pose_session,
+                    [frame.get('timestamp') for frame in valid_frames]
+                ))
+
+            results = []
+            for frame in frames:
+                if not isinstance(frame, dict):
+                    results.append({'error': '帧数据格式错误'})
+                    continue
+                if not frame.get('landmarks'):
+                    results.append({
+                        'timestamp': frame.get('timestamp'),
+                        'error': '缺少关键点数据'
+                    })
+                    continue
+
+                results.append(next(valid_results))
+
+            return jsonify({
+                'success': True,
+                'exercise_type': exercise.key,
+                'results': results,
+                'rep_count': pose_session.rep_count
+            })
+
+        except LandmarkPacketError as e:
+            return bad_request(f'关键点数据格式错误: {str(e)}')
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': f'批量姿态分析失败: {str(e)}'
+            })
+
+    @blueprint.route('/api/analyze_frame', methods=['POST'])
+    def api_analyze_frame():
+        """服务端图像帧分析：上传一帧JPEG/PNG图像，由推理进程池检测关键点后完成评分和计数
+
+        图像可以作为multipart字段frame上传，也可以直接作为image/*请求体上传；
+        运动类型、会话ID、推理档位通过表单字段或X-Exercise-Type/X-Session-Id/X-Pose-Profile请求头传递。
+        """
+        try:
+            upload = request.files.get('frame')
+            if upload:
+                payload = upload.read()
+            elif request.mimetype.startswith('image/'):
+                payload = request.get_data(cache=False)
+            else:
+                payload = None
+
+            exercise_type = request.form.get('exercise_type') or request.headers.get('X-Exercise-Type')
+            session_id = request.form.get('session_id') or request.headers.get('X-Session-Id')
+            profile = request.form.get('profile') or request.headers.get('X-Pose-Profile')
+
+            if not payload or not exercise_type:
+                return bad_request('缺少必要参数')
+
+            exercise = engine.resolve(exercise_type)
+            if exercise is None:
+                return bad_request(f'不支持的运动类型: {exercise_type}')
+            pose_session = get_session(session_id, exercise.key)
+
+            # 同一会话固定分配到同一个推理进程
+            landmarks, used_profile = frame_pool.analyze(pose_session.session_id, payload, profile)
+            if landmarks is None:
+                return jsonify({
+                    'success': False,
+                    'message': '未检测到人体姿态',
+                    'profile': used_profile
+                })
+
+            analysis_result = analyze_landmarks(landmarks, exercise, pose_session)
+            analysis_result['landmarks'] = landmarks.to_list()
+            analysis_result['profile'] = used_profile
+
+            return jsonify({
+                'success': True,
+                'analysis': analysis_result
+            })
+
+        except FramePoolBusy:
+            return jsonify({
+                'success': False,
+                'message': '服务器繁忙，请降低发送帧率后重试'
+            }), 503
+        except FramePoolError as e:
+            return jsonify({
+                'success': False,
+                'message': f'图像帧分析失败: {str(e)}'
+            })
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'message': f'图像帧分析失败: {str(e)}'
+            })
+
+    return blueprint
@@ -1,136 +1,414 @@
+import atexit
 import json
-import sqlite3
-from datetime import datetime
-from typing import Dict, List, Optional
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 import os
 
+import numpy as np
+
+from .landmark_frame import LandmarkFrame
+from .sqlite_pool import SQLiteConnectionPool
+from .write_behind import WriteBehindQueue
+
+
+def _encode_analysis_value(value):
+    """分析数据的JSON编码：关键点帧保存为扁平数组，NumPy数值转换为Python数值"""
+    if isinstance(value, LandmarkFrame):
+        return value.to_list()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f'无法序列化的分析数据类型: {type(value).__name__}')
+
+
+def encode_analysis_payload(analysis: Dict) -> Optional[str]:
+    """分析数据中除评分和错误以外的字段编码为紧凑JSON，没有其他字段时返回None
+
+    评分单独存入form_score列，错误已逐条写入workout_errors，不再重复序列化。
+    """
+    extra = {key: value for key, value in analysis.items() if key not in ANALYSIS_COLUMNS}
+    if not extra:
+        return None
+    return json.dumps(extra, ensure_ascii=False, separators=(',', ':'), default=_encode_analysis_value)
+
+
+# 数据表（启动时创建一次，见WorkoutDataRecorder._ensure_schema）
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS workout_sessions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT UNIQUE,
+        user_id INTEGER,
+        exercise_type TEXT,
+        exercise_id INTEGER,
+        start_time TEXT,
+        end_time TEXT,
+        duration REAL,
+        reps INTEGER,
+        avg_form_score REAL,
+        total_errors INTEGER,
+        error_stats TEXT,
+        calories_burned REAL,
+        performance_grade TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS workout_errors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        rep_number INTEGER,
+        error_type TEXT,
+        message TEXT,
+        severity TEXT,
+        timestamp TEXT,
+        FOREIGN KEY (session_id) REFERENCES workout_sessions (session_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS workout_analysis (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        rep_number INTEGER,
+        timestamp TEXT,
+        form_score REAL,
+        analysis_data TEXT,
+        FOREIGN KEY (session_id) REFERENCES workout_sessions (session_id)
+    )
+    ''',
+)
+
+# 旧版本数据库缺少的列 (表, 列, 类型)
+ADDED_COLUMNS = (
+    ('workout_sessions', 'exercise_id', 'INTEGER'),
+    ('workout_analysis', 'form_score', 'REAL'),
+)
+
+# 索引（在旧表补充新增列之后创建）
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_workout_sessions_user_exercise ON workout_sessions (user_id, exercise_id)',
+    'CREATE INDEX IF NOT EXISTS idx_workout_sessions_user_start ON workout_sessions (user_id, start_time)',
+    'CREATE INDEX IF NOT EXISTS idx_workout_errors_session ON workout_errors (session_id)',
+    'CREATE INDEX IF NOT EXISTS idx_workout_analysis_session ON workout_analysis (session_id)',
+)
+
+# 写入语句（文本固定，连接的语句缓存按文本复用预编译结果）
+INSERT_SESSION = '''
+    INSERT OR REPLACE INTO workout_sessions 
+    (session_id, user_id, exercise_type, exercise_id, start_time, end_time, duration, 
+     reps, avg_form_score, total_errors, error_stats, calories_burned, performance_grade)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_ERROR = '''
+    INSERT INTO workout_errors 
+    (session_id, rep_number, error_type, message, severity, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+INSERT_ANALYSIS = '''
+    INSERT INTO workout_analysis 
+    (session_id, rep_number, timestamp, form_score, analysis_data)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# 分析数据中单独存储的字段（其余字段由encode_analysis_payload编码）
+ANALYSIS_COLUMNS = ('form_score', 'errors')
+
+
+# 每个会话在内存中暂存的明细行数，超过后交给写入队列
+# （明细按行编码后只占几十字节，常见长度的会话在结束时一次写入）
+DETAIL_SPILL_ROWS = 2048
+
+
+class RecordingSession:
+    """单个进行中的运动会话的累计数据
+
+    评分和错误只保存流式统计量（次数、和、平方和、最值、按类型计数），每次动作O(1)更新，
+    内存占用与动作次数无关。逐次明细（错误、分析数据）可选，记录时即编码为可直接插入的行，
+    暂存有上限，满后交给写入队列批量写入。
+    """
+
+    __slots__ = ('session_id', 'user_id', 'exercise_type', 'exercise_id', 'start_time', 'started',
+                 'last_active', 'reps', 'score_count', 'score_sum', 'score_sum_sq', 'score_min', 'score_max',
+                 'error_total', 'error_types', 'severity_counts', 'calories_burned',
+                 'keep_details', 'pending_errors', 'pending_analysis', 'closed', 'lock')
+
+    def __init__(self, session_id: str, user_id: int, exercise_type: str, exercise_id: Optional[int] = None,
+                 keep_details: bool = True):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.exercise_type = exercise_type
+        self.exercise_id = exercise_id
+        self.start_time = datetime.now()
+        self.started = time.monotonic()
+        self.last_active = self.started
+        self.reps = 0
+        self.score_count = 0
+        self.score_sum = 0.0
+        self.score_sum_sq = 0.0
+        self.score_min = None
+        self.score_max = None
+        self.error_total = 0
+        self.error_types: Dict[str, int] = {}
+        self.severity_counts = {'high': 0, 'medium': 0, 'low': 0}
+        self.calories_burned = 0.0
+        self.keep_details = keep_details
+        self.pending_errors: List[Tuple] = []
+        self.pending_analysis: List[Tuple] = []
+        # 会话已汇总保存（在lock内设置），之后的记录被拒绝
+        self.closed = False
+        self.lock = threading.Lock()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def add_score(self, score: float):
+        self.score_count += 1
+        self.score_sum += score
+        self.score_sum_sq += score * score
+        self.score_min = score if self.score_min is None else min(self.score_min, score)
+        self.score_max = score if self.score_max is None else max(self.score_max, score)
+
+    def add_error(self, error: Dict, timestamp: str):
+        error_type = error.get('type') or 'unknown'
+        severity = error.get('severity') or 'low'
+        self.error_total += 1
+        self.error_types[error_type] = self.error_types.get(error_type, 0) + 1
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+        if self.keep_details:
+            self.pending_errors.append((
+                self.session_id, self.reps, error.get('type') or '', error.get('message') or '',
+                error.get('severity') or '', timestamp
+            ))
+
+    @property
+    def avg_score(self) -> float:
+        return self.score_sum / self.score_count if self.score_count else 0
+
+    @property
+    def score_std(self) -> float:
+        if self.score_count < 2:
+            return 0.0
+        variance = self.score_sum_sq / self.score_count - self.avg_score ** 2
+        return math.sqrt(max(variance, 0.0))
+
+    @property
+    def pending_rows(self) -> int:
+        return len(self.pending_errors) + len(self.pending_analysis)
+
+    def elapsed(self, now: Optional[float] = None) -> float:
+        """会话开始到now（默认最后一次活动）经过的秒数"""
+        return (now if now is not None else self.last_active) - self.started
+
+
 class WorkoutDataRecorder:
-    """运动数据记录器 - 准确统计和保存运动数据"""
+    """运动数据记录器 - 准确统计和保存运动数据
+
+    按会话ID同时管理多个进行中的会话，每个会话独立累计。
+    空闲超时的会话按最后一次活动时间结束并保存（在下一次访问时顺带清理），
+    进程退出时所有未结束的会话也会保存，不会因为用户未调用结束接口而丢失数据。
+    数据库连接来自连接池（WAL模式，synchronous可配置），表结构只在创建记录器时检查一次。
+    会话汇总和明细由后台写入队列批量保存，读取统计前会先等待队列写完。
+    """
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, idle_timeout: float = 1800, sweep_interval: float = 60,
+                 keep_details: bool = True, pool_size: int = 4, busy_timeout: float = 5.0,
+                 synchronous: str = 'NORMAL', spill_path: Optional[str] = None, write_queue_size: int = 1024,
+                 write_batch: int = 64, write_retries: int = 3):
         if db_path is None:
             db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'instance', 'fitness_app.db')
         self.db_path = db_path
-        self.current_session = None
-        self.session_data = {
-            'reps': 0,
-            'errors': [],
-            'form_scores': [],
-            'duration': 0,
-            'calories_burned': 0,
-            'start_time': None,
-            'end_time': None
-        }
-        
-    def start_session(self, user_id: int, exercise_type: str) -> str:
-        """开始运动会话"""
-        session_id = f"{user_id}_{exercise_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        # 连接复用（WAL模式），表结构只在启动时检查一次
+        self._pool = SQLiteConnectionPool(db_path, pool_size, busy_timeout, synchronous)
+        self._ensure_schema()
+        # 会话数据由后台线程批量写入，结束会话不等待磁盘；写入失败的记录暂存到溢出文件，下次启动时重放
+        self._writer = WriteBehindQueue(
+            self._write_records, spill_path or f'{db_path}.spill', capacity=write_queue_size,
+            batch_size=write_batch, max_retries=write_retries, name='recorder-writer'
+        )
+        self._writer.start()
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        # 是否保存逐次明细（workout_errors/workout_analysis），关闭后只保存会话汇总
+        self.keep_details = keep_details
+        self._sessions: Dict[str, RecordingSession] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        atexit.register(self.close)
+
+    @property
+    def active_sessions(self) -> int:
+        """进行中的会话数"""
+        return len(self._sessions)
         
-        self.current_session = {
-            'session_id': session_id,
-            'user_id': user_id,
-            'exercise_type': exercise_type,
-            'start_time': datetime.now(),
-            'reps': 0,
-            'errors': [],
-            'form_scores': [],
-            'total_score': 0,
-            'calories_burned': 0,
-            'analysis_data': []
-        }
+    def start_session(self, user_id: int, exercise_type: str, exercise_id: Optional[int] = None) -> str:
+        """开始运动会话（exercise_type为规范英文名，exercise_id为对应的运动编号），返回会话ID"""
+        session_id = f"{user_id}_{exercise_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        session = RecordingSession(session_id, user_id, exercise_type, exercise_id, self.keep_details)
+
+        with self._lock:
+            self._sessions[session_id] = session
+        self._sweep()
         
         return session_id
+
+    def session_user(self, session_id: str) -> Optional[int]:
+        """进行中会话所属的用户，会话不存在时返回None"""
+        session = self._sessions.get(session_id)
+        return session.user_id if session else None
+
+    def _get(self, session_id: str) -> Optional[RecordingSession]:
+        self._sweep()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.touch()
+        return session
         
-    def record_rep(self, analysis_data: Dict):
-        """记录一次动作"""
-        if not self.current_session:
-            return
-            
-        self.current_session['reps'] += 1
-        
-        # 记录形态评分
-        form_score = analysis_data.get('form_score', 0)
-        self.current_session['form_scores'].append(form_score)
-        
-        # 记录错误
-        errors = analysis_data.get('errors', [])
-        for error in errors:
-            self.current_session['errors'].append({
-                'rep_number': self.current_session['reps'],
-                'error_type': error.get('type'),
-                'message': error.get('message'),
-                'severity': error.get('severity'),
-                'timestamp': datetime.now().isoformat()
-            })
+    def record_rep(self, session_id: str, analysis_data: Dict) -> bool:
+        """记录一次动作，会话不存在或已结束时返回False"""
+        session = self._get(session_id)
+        if session is None:
+            return False
+
+        with session.lock:
+            # 取到会话后可能已被end_session结束，此时不能再计入
+            if session.closed:
+                return False
+            session.reps += 1
+            
+            # 记录形态评分
+            session.add_score(analysis_data.get('form_score', 0))
+            
+            # 记录错误
+            timestamp = datetime.now().isoformat()
+            for error in analysis_data.get('errors', []):
+                session.add_error(error, timestamp)
+                
+            # 记录详细分析数据
+            if session.keep_details:
+                session.pending_analysis.append((
+                    session.session_id, session.reps, timestamp,
+                    analysis_data.get('form_score', 0), encode_analysis_payload(analysis_data)
+                ))
             
-        # 记录详细分析数据
-        self.current_session['analysis_data'].append({
-            'rep_number': self.current_session['reps'],
-            'timestamp': datetime.now().isoformat(),
-            'analysis': analysis_data
-        })
-        
-        # 计算卡路里消耗
-        self._calculate_calories()
+            # 计算卡路里消耗
+            self._calculate_calories(session)
+
+            if session.pending_rows >= DETAIL_SPILL_ROWS:
+                self._queue_details(session)
+        return True
         
-    def record_error(self, error_data: Dict):
-        """记录实时错误"""
-        if not self.current_session:
-            return
-            
-        self.current_session['errors'].append({
-            'rep_number': self.current_session['reps'],
-            'error_type': error_data.get('type'),
-            'message': error_data.get('message'),
-            'severity': error_data.get('severity'),
-            'timestamp': datetime.now().isoformat()
-        })
+    def record_error(self, session_id: str, error_data: Dict) -> bool:
+        """记录实时错误，会话不存在或已结束时返回False"""
+        session = self._get(session_id)
+        if session is None:
+            return False
+
+        with session.lock:
+            if session.closed:
+                return False
+            session.add_error(error_data, datetime.now().isoformat())
+            if session.pending_rows >= DETAIL_SPILL_ROWS:
+                self._queue_details(session)
+        return True
         
-    def end_session(self) -> Dict:
+    def end_session(self, session_id: str) -> Dict:
         """结束运动会话并保存数据"""
-        if not self.current_session:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
             return {'error': '没有活动的运动会话'}
+
+        return self._finish(session, time.monotonic())
+
+    def evict_idle(self) -> int:
+        """结束并保存空闲超时的会话，返回数量"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                self._sessions.pop(session_id) for session_id, session in list(self._sessions.items())
+                if now - session.last_active > self.idle_timeout
+            ]
+            self._last_sweep = now
+
+        for session in expired:
+            # 空闲会话以最后一次活动时间作为结束时间
+            self._finish(session)
+        return len(expired)
+
+    def flush_all(self) -> int:
+        """结束并保存所有进行中的会话（进程退出时自动调用），返回数量"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+
+        for session in sessions:
+            self._finish(session)
+        return len(sessions)
+
+    def _sweep(self):
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.evict_idle()
+
+    def _finish(self, session: RecordingSession, now: Optional[float] = None) -> Dict:
+        """汇总会话并放入写入队列"""
+        with session.lock:
+            session.closed = True
+
+            # 计算会话统计
+            duration = session.elapsed(now)
+            end_time = session.start_time + timedelta(seconds=duration)
             
-        # 计算会话统计
-        end_time = datetime.now()
-        duration = (end_time - self.current_session['start_time']).total_seconds()
-        
-        # 计算平均评分
-        avg_score = 0
-        if self.current_session['form_scores']:
-            avg_score = sum(self.current_session['form_scores']) / len(self.current_session['form_scores'])
+            avg_score = session.avg_score
+                
+            # 统计错误类型
+            error_stats = self._calculate_error_stats(session)
+            
+            session_summary = {
+                'session_id': session.session_id,
+                'user_id': session.user_id,
+                'exercise_type': session.exercise_type,
+                'exercise_id': session.exercise_id,
+                'start_time': session.start_time.isoformat(),
+                'end_time': end_time.isoformat(),
+                'duration': duration,
+                'reps': session.reps,
+                'avg_form_score': avg_score,
+                'min_form_score': session.score_min,
+                'max_form_score': session.score_max,
+                'form_score_std': session.score_std,
+                'total_errors': session.error_total,
+                'error_stats': error_stats,
+                'calories_burned': session.calories_burned,
+                'performance_grade': self._calculate_performance_grade(avg_score, error_stats)
+            }
             
-        # 统计错误类型
-        error_stats = self._calculate_error_stats()
-        
-        session_summary = {
-            'session_id': self.current_session['session_id'],
-            'user_id': self.current_session['user_id'],
-            'exercise_type': self.current_session['exercise_type'],
-            'start_time': self.current_session['start_time'].isoformat(),
-            'end_time': end_time.isoformat(),
-            'duration': duration,
-            'reps': self.current_session['reps'],
-            'avg_form_score': avg_score,
-            'total_errors': len(self.current_session['errors']),
-            'error_stats': error_stats,
-            'calories_burned': self.current_session['calories_burned'],
-            'performance_grade': self._calculate_performance_grade(avg_score, error_stats)
-        }
-        
-        # 保存到数据库
-        self._save_to_database(session_summary)
-        
-        # 重置会话
-        self.current_session = None
+            # 交给写入队列，不等待写入完成
+            self._queue_details(session, (
+                session.session_id,
+                session.user_id,
+                session.exercise_type,
+                session.exercise_id,
+                session_summary['start_time'],
+                session_summary['end_time'],
+                duration,
+                session.reps,
+                avg_score,
+                session.error_total,
+                json.dumps(error_stats),
+                session.calories_burned,
+                session_summary['performance_grade']
+            ))
         
         return session_summary
         
-    def _calculate_calories(self):
+    def _calculate_calories(self, session: RecordingSession):
         """计算卡路里消耗"""
-        if not self.current_session:
-            return
-            
         # 基于运动类型和次数的卡路里计算
         exercise_calories = {
             'pushup': 0.5,      # 每次0.5卡路里
@@ -143,33 +421,22 @@ class WorkoutDataRecorder:
             'pull_ups': 0.8
         }
         
-        exercise_type = self.current_session['exercise_type']
+        exercise_type = session.exercise_type
         base_calories = exercise_calories.get(exercise_type, 0.3)
         
         if exercise_type == 'plank':
             # 平板支撑按时间计算
-            duration = (datetime.now() - self.current_session['start_time']).total_seconds()
-            self.current_session['calories_burned'] = duration * base_calories
+            session.calories_burned = session.elapsed() * base_calories
         else:
             # 其他运动按次数计算
-            self.current_session['calories_burned'] = self.current_session['reps'] * base_calories
-            
-    def _calculate_error_stats(self) -> Dict:
-        """计算错误统计"""
-        error_types = {}
-        severity_counts = {'high': 0, 'medium': 0, 'low': 0}
-        
-        for error in self.current_session['errors']:
-            error_type = error.get('error_type', 'unknown')
-            severity = error.get('severity', 'low')
-            
-            error_types[error_type] = error_types.get(error_type, 0) + 1
-            severity_counts[severity] = severity_counts.get(severity, 0) + 1
+            session.calories_burned = session.reps * base_calories
             
+    def _calculate_error_stats(self, session: RecordingSession) -> Dict:
+        """计算错误统计（直接读取累计计数）"""
         return {
-            'error_types': error_types,
-            'severity_counts': severity_counts,
-            'error_rate': len(self.current_session['errors']) / max(1, self.current_session['reps'])
+            'error_types': dict(session.error_types),
+            'severity_counts': dict(session.severity_counts),
+            'error_rate': session.error_total / max(1, session.reps)
         }
         
     def _calculate_performance_grade(self, avg_score: float, error_stats: Dict) -> str:
@@ -191,126 +458,86 @@ class WorkoutDataRecorder:
         else:
             return 'D'
             
-    def _save_to_database(self, session_summary: Dict):
-        """保存会话数据到数据库"""
+    def _ensure_schema(self):
+        """创建数据表和索引，并为旧表补充新增的列（启动时执行一次）"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 创建表（如果不存在）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS workout_sessions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT UNIQUE,
-                    user_id INTEGER,
-                    exercise_type TEXT,
-                    start_time TEXT,
-                    end_time TEXT,
-                    duration REAL,
-                    reps INTEGER,
-                    avg_form_score REAL,
-                    total_errors INTEGER,
-                    error_stats TEXT,
-                    calories_burned REAL,
-                    performance_grade TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 插入会话数据
-            cursor.execute('''
-                INSERT OR REPLACE INTO workout_sessions 
-                (session_id, user_id, exercise_type, start_time, end_time, duration, 
-                 reps, avg_form_score, total_errors, error_stats, calories_burned, performance_grade)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                session_summary['session_id'],
-                session_summary['user_id'],
-                session_summary['exercise_type'],
-                session_summary['start_time'],
-                session_summary['end_time'],
-                session_summary['duration'],
-                session_summary['reps'],
-                session_summary['avg_form_score'],
-                session_summary['total_errors'],
-                json.dumps(session_summary['error_stats']),
-                session_summary['calories_burned'],
-                session_summary['performance_grade']
-            ))
-            
-            # 保存详细错误数据
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS workout_errors (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    rep_number INTEGER,
-                    error_type TEXT,
-                    message TEXT,
-                    severity TEXT,
-                    timestamp TEXT,
-                    FOREIGN KEY (session_id) REFERENCES workout_sessions (session_id)
-                )
-            ''')
-            
-            for error in self.current_session['errors']:
-                cursor.execute('''
-                    INSERT INTO workout_errors 
-                    (session_id, rep_number, error_type, message, severity, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    session_summary['session_id'],
-                    error.get('rep_number', 0),
-                    error.get('error_type', ''),
-                    error.get('message', ''),
-                    error.get('severity', ''),
-                    error.get('timestamp', '')
-                ))
-                
-            # 保存详细分析数据
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS workout_analysis (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT,
-                    rep_number INTEGER,
-                    timestamp TEXT,
-                    analysis_data TEXT,
-                    FOREIGN KEY (session_id) REFERENCES workout_sessions (session_id)
-                )
-            ''')
-            
-            for analysis in self.current_session['analysis_data']:
-                cursor.execute('''
-                    INSERT INTO workout_analysis 
-                    (session_id, rep_number, timestamp, analysis_data)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    session_summary['session_id'],
-                    analysis.get('rep_number', 0),
-                    analysis.get('timestamp', ''),
-                    json.dumps(analysis.get('analysis', {}))
-                ))
-                
-            conn.commit()
-            conn.close()
-            
+            with self._pool.connection() as conn:
+                for statement in SCHEMA:
+                    conn.execute(statement)
+
+                for table, column, column_type in ADDED_COLUMNS:
+                    columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+                    if column not in columns:
+                        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+                for statement in INDEXES:
+                    conn.execute(statement)
+
         except Exception as e:
-            print(f"数据库保存错误: {e}")
+            print(f"数据库初始化错误: {e}")
+
+    def close(self):
+        """保存所有进行中的会话，写完队列后关闭数据库连接（进程退出时自动调用）"""
+        self.flush_all()
+        self._writer.close()
+        self._pool.close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已结束会话的数据全部写入数据库（或溢出文件），超时返回False"""
+        return self._writer.flush(timeout)
+
+    def _queue_details(self, session: RecordingSession, session_row: Optional[Tuple] = None):
+        """把暂存的逐次明细（和会话汇总行）交给写入队列并清空暂存（调用方持有session.lock）"""
+        if session_row is None and not session.pending_rows:
+            return
+        self._writer.put((session_row, session.pending_errors, session.pending_analysis))
+        session.pending_errors = []
+        session.pending_analysis = []
+
+    def _write_records(self, records: List):
+        """写入线程：一批记录（会话汇总行、错误明细、分析明细）在一个事务中写入"""
+        with self._pool.connection() as conn:
+            for session_row, error_rows, analysis_rows in records:
+                # 明细行在记录时已编码，整批插入
+                if error_rows:
+                    conn.executemany(INSERT_ERROR, error_rows)
+                if analysis_rows:
+                    conn.executemany(INSERT_ANALYSIS, analysis_rows)
+                if session_row is not None:
+                    conn.execute(INSERT_SESSION, session_row)
+
+    def migrate_exercise_ids(self, normalize: Callable[[str], Optional[int]]):
+        """按运动名称回填旧记录的exercise_id（列和索引在启动时已补充，可重复执行）
+
+        normalize把运动名称转换为编号（未知运动返回None），每种写法只调用一次。
+        """
+        try:
+            with self._pool.connection() as conn:
+                rows = conn.execute(
+                    'SELECT DISTINCT exercise_type FROM workout_sessions WHERE exercise_id IS NULL'
+                ).fetchall()
+                for (exercise_type,) in rows:
+                    exercise_id = normalize(exercise_type) if exercise_type else None
+                    if exercise_id is not None:
+                        conn.execute('''
+                            UPDATE workout_sessions SET exercise_id = ?
+                            WHERE exercise_type = ? AND exercise_id IS NULL
+                        ''', (exercise_id, exercise_type))
+
+        except Exception as e:
+            print(f"数据库迁移错误: {e}")
             
     def get_user_stats(self, user_id: int, days: int = 30) -> Dict:
         """获取用户统计数据"""
+        self.flush(self._pool.timeout)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 获取最近的会话数据
-            cursor.execute('''
-                SELECT exercise_type, reps, avg_form_score, calories_burned, performance_grade, start_time
-                FROM workout_sessions 
-                WHERE user_id = ? AND start_time >= datetime('now', '-{} days')
-                ORDER BY start_time DESC
-            '''.format(days), (user_id,))
-            
-            sessions = cursor.fetchall()
+            with self._pool.connection() as conn:
+                # 获取最近的会话数据
+                sessions = conn.execute('''
+                    SELECT exercise_type, reps, avg_form_score, calories_burned, performance_grade, start_time
+                    FROM workout_sessions 
+                    WHERE user_id = ? AND start_time >= datetime('now', ?)
+                    ORDER BY start_time DESC
+                ''', (user_id, f'-{int(days)} days')).fetchall()
             
             if not sessions:
                 return {'message': '没有找到运动记录'}
@@ -324,8 +551,6 @@ class WorkoutDataRecorder:
             for session in sessions:
                 exercise_type = session[0]
                 exercise_counts[exercise_type] = exercise_counts.get(exercise_type, 0) + session[1]
-                
-            conn.close()
             
             return {
                 'total_sessions': len(sessions),
@@ -341,34 +566,25 @@ class WorkoutDataRecorder:
             
     def get_session_details(self, session_id: str) -> Dict:
         """获取会话详细信息"""
+        self.flush(self._pool.timeout)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 获取会话基本信息
-            cursor.execute('''
-                SELECT * FROM workout_sessions WHERE session_id = ?
-            ''', (session_id,))
-            
-            session = cursor.fetchone()
-            if not session:
-                return {'error': '会话不存在'}
+            with self._pool.connection() as conn:
+                # 获取会话基本信息
+                session = conn.execute('''
+                    SELECT * FROM workout_sessions WHERE session_id = ?
+                ''', (session_id,)).fetchone()
+                if not session:
+                    return {'error': '会话不存在'}
+                    
+                # 获取错误详情
+                errors = conn.execute('''
+                    SELECT * FROM workout_errors WHERE session_id = ?
+                ''', (session_id,)).fetchall()
                 
-            # 获取错误详情
-            cursor.execute('''
-                SELECT * FROM workout_errors WHERE session_id = ?
-            ''', (session_id,))
-            
-            errors = cursor.fetchall()
-            
-            # 获取分析数据
-            cursor.execute('''
-                SELECT * FROM workout_analysis WHERE session_id = ?
-            ''', (session_id,))
-            
-            analysis_data = cursor.fetchall()
-            
-            conn.close()
+                # 获取分析数据
+                analysis_data = conn.execute('''
+                    SELECT * FROM workout_analysis WHERE session_id = ?
+                ''', (session_id,)).fetchall()
             
             return {
                 'session_info': session,
@@ -377,4 +593,4 @@ class WorkoutDataRecorder:
             }
             
         except Exception as e:
-            return {'error': f'获取会话详情失败: {e}'}
\ No newline at end of file
+            return {'error': f'获取会话详情失败: {e}'}
@@ -0,0 +1,600 @@
+import math
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .landmark_frame import LANDMARK_INDEX
+from .landmark_history import RollingLandmarkStats
+from .pose_kernel import (
+    EXERCISE_ANGLE_TRIPLETS, EXERCISE_SPREAD_PAIRS, compute_angles, compute_spreads
+)
+from .rep_counter import REP_SIGNALS, RepSpec, compile_rep_specs
+
+# 每种运动的声明式规格，启动时由compile_exercise_specs编译为ExerciseEvaluator
+#   angles/spreads: 关节角三元组和水平距离点对（默认取pose_kernel中的表）
+#   derived: 由已有特征派生的数值 {名称: (运算, (源特征, ...))}，运算见DERIVED_OPS
+#   metrics: 需要关键点位置或历史窗口统计的指标，见METRICS
+#   score: 评分曲线，按顺序匹配第一个满足range/when的区间，
+#          得分 = score - |特征 - center| * slope，未匹配时用fallback，最后按clip截断；
+#          penalties {指标: (权重, 容许值)} 从得分中扣除 权重 * max(0, 指标 - 容许值)
+#   errors: 特征/指标超过（above）或低于（below）阈值时报告的错误
+#   phase: 无会话计数器时的阶段判断，特征 <= down 为down，>= up 为up
+#   feedback: 各阶段的提示语
+#   rep: 计数信号 {'feature', 'mode', 'low_key', 'high_key', 'low', 'high'}（默认取rep_counter.REP_SIGNALS），
+#        阈值从EXERCISE_THRESHOLDS[运动][low_key/high_key]读取，缺省时用low/high
+# config.EXERCISE_SPECS中同名运动的各项覆盖这里的默认值，新运动只需在配置中声明
+DEFAULT_EXERCISE_SPECS = {
+    'pushup': {
+        'derived': {
+            'avg_arm_angle': ('mean', ('left_arm_angle', 'right_arm_angle')),
+            'arm_asymmetry': ('absdiff', ('left_arm_angle', 'right_arm_angle')),
+        },
+        'score': {
+            'feature': 'left_arm_angle',
+            'bands': [
+                {'range': (60, 120), 'score': 90, 'center': 90, 'slope': 2},    # 下降阶段
+                {'range': (150, 180), 'score': 95, 'center': 165, 'slope': 3},  # 上升阶段
+            ],
+            'fallback': {'score': 70, 'center': 120, 'slope': 1.5},
+            'clip': (30, 100),
+        },
+        'errors': [
+            {'feature': 'left_arm_angle', 'below': 50, 'type': 'form_error',
+             'message': '下压过深，注意保护肩膀', 'severity': 'medium'},
+            {'feature': 'left_arm_angle', 'above': 170, 'type': 'form_error',
+             'message': '手臂伸展过度，稍微弯曲', 'severity': 'low'},
+            {'feature': 'body_line_angle', 'above': 25, 'type': 'body_misalignment',
+             'message': '身体不够直，注意保持一条直线', 'severity': 'high',
+             'suggestion': '收紧核心，保持头、肩、髋、踝在一条直线上'},
+            {'feature': 'arm_asymmetry', 'above': 15, 'type': 'asymmetric_arms',
+             'message': '两臂动作不对称', 'severity': 'medium',
+             'suggestion': '保持两臂同步，均匀发力'},
+        ],
+        'phase': {'feature': 'left_arm_angle', 'down': 90, 'up': 150},
+        'feedback': {
+            'down': '很好！保持下压姿势',
+            'up': '完成一次！准备下一个',
+            'transition': '继续保持动作',
+            'unknown': '调整姿势，保持标准动作'
+        },
+    },
+    'squat': {
+        'derived': {
+            'avg_knee_angle': ('mean', ('left_knee_angle', 'right_knee_angle')),
+        },
+        'metrics': ['knee_alignment'],
+        'score': {
+            'feature': 'left_knee_angle',
+            'bands': [
+                {'range': (70, 120), 'score': 95, 'center': 95, 'slope': 2},    # 下蹲阶段
+                {'range': (150, 180), 'score': 90, 'center': 165, 'slope': 2},  # 站立阶段
+            ],
+            'fallback': {'score': 65, 'center': 120, 'slope': 1.5},
+            'clip': (30, 100),
+            'penalties': {'knee_alignment': (3, 10)},
+        },
+        'errors': [
+            {'feature': 'left_knee_angle', 'below': 60, 'type': 'form_error',
+             'message': '蹲得太深，注意膝盖保护', 'severity': 'medium'},
+            {'feature': 'left_knee_angle', 'above': 175, 'type': 'form_error',
+             'message': '站立过直，保持微弯', 'severity': 'low'},
+            {'feature': 'back_angle', 'below': 70, 'type': 'forward_lean',
+             'message': '身体过度前倾', 'severity': 'high',
+             'suggestion': '保持胸部挺起，背部挺直'},
+            {'feature': 'knee_alignment', 'above': 30, 'type': 'knee_misalignment',
+             'message': '膝盖内扣或外展', 'severity': 'high',
+             'suggestion': '保持膝盖与脚尖方向一致'},
+        ],
+        'phase': {'feature': 'left_knee_angle', 'down': 100, 'up': 150},
+        'feedback': {
+            'down': '很好！保持蹲下姿势',
+            'up': '完成一次！准备下一个',
+            'transition': '继续保持动作',
+            'unknown': '调整姿势，保持标准动作'
+        },
+    },
+    'situp': {
+        'metrics': ['leg_stability', 'neck_alignment'],
+        'score': {
+            'feature': 'torso_angle',
+            'bands': [
+                {'range': (30, 80), 'score': 95, 'center': 55, 'slope': 2},  # 起身阶段
+                {'range': (0, 30), 'score': 85, 'center': 15, 'slope': 2},   # 躺下阶段
+            ],
+            'fallback': {'score': 70, 'center': 55, 'slope': 1.5},
+            'clip': (30, 100),
+            'penalties': {'leg_stability': (2, 5), 'neck_alignment': (2, 25)},
+        },
+        'errors': [
+            {'feature': 'leg_stability', 'above': 20, 'type': 'unstable_legs',
+             'message': '腿部晃动过大', 'severity': 'medium',
+             'suggestion': '双脚固定在地面，避免借助腿部甩动发力'},
+            {'feature': 'neck_alignment', 'above': 25, 'type': 'neck_strain',
+             'message': '颈部过度前屈', 'severity': 'high',
+             'suggestion': '下巴与胸口保持一拳距离，用腹部发力而不是拉脖子'},
+        ],
+        'feedback': {
+            'down': '很好！保持起身姿势',
+            'up': '完成一次！准备下一个',
+            'transition': '继续保持动作',
+            'unknown': '调整姿势，保持标准动作'
+        },
+    },
+    'plank': {
+        'derived': {
+            'body_line': ('deviation', ('body_angle',)),
+        },
+        'metrics': ['hip_stability', 'shoulder_stability'],
+        'score': {
+            'feature': 'body_line',
+            'bands': [
+                {'range': (0, 10), 'score': 95, 'center': 0, 'slope': 2},
+                {'range': (10, 20), 'score': 85, 'center': 10, 'slope': 3},
+            ],
+            'fallback': {'score': 70, 'center': 20, 'slope': 2},
+            'clip': (30, 100),
+            'penalties': {'hip_stability': (5, 2), 'shoulder_stability': (3, 2)},
+        },
+        'errors': [
+            {'feature': 'body_line', 'above': 20, 'type': 'body_misalignment',
+             'message': '身体没有保持一条直线', 'severity': 'high',
+             'suggestion': '收紧腹部和臀部，避免塌腰或撅臀'},
+            {'feature': 'hip_stability', 'above': 10, 'type': 'unstable_hips',
+             'message': '髋部上下晃动', 'severity': 'medium',
+             'suggestion': '保持髋部高度稳定，均匀呼吸'},
+            {'feature': 'shoulder_stability', 'above': 10, 'type': 'unstable_shoulders',
+             'message': '肩部晃动过大', 'severity': 'medium',
+             'suggestion': '手肘位于肩膀正下方，肩胛骨保持稳定'},
+        ],
+        'feedback': {
+            'hold': '保持住！身体保持直线',
+            'unknown': '调整姿势，保持身体直线'
+        },
+    },
+    'jumping_jacks': {
+        'score': {
+            # 水平距离为归一化坐标（画面宽度为1），阈值由原640像素宽画面下的像素值换算
+            'feature': 'arm_spread',
+            'bands': [
+                {'range': (0.08, None), 'when': {'leg_spread': (0.05, None)}, 'score': 90},  # 张开状态
+                {'range': (None, 0.03), 'when': {'leg_spread': (None, 0.025)}, 'score': 85},  # 合拢状态
+            ],
+            'fallback': {'score': 75},  # 过渡状态
+            'clip': (50, 100),
+        },
+    },
+    'lunges': {
+        'derived': {
+            # 前腿为弯曲角度较小的一侧
+            'front_knee_angle': ('min', ('left_knee_angle', 'right_knee_angle')),
+        },
+        'score': {
+            'feature': 'front_knee_angle',
+            'bands': [
+                {'range': (80, 100), 'score': 90, 'center': 90, 'slope': 2},
+            ],
+            'fallback': {'score': 70, 'center': 90, 'slope': 1.5},
+            'clip': (40, 100),
+        },
+    },
+    'burpees': {
+        'score': {
+            'feature': 'torso_angle',
+            'bands': [
+                {'range': (160, 180), 'score': 90},  # 站立/跳跃阶段
+                {'range': (90, 120), 'score': 85},   # 蹲下阶段
+                {'range': (30, 60), 'score': 95},    # 平板支撑阶段
+            ],
+            'fallback': {'score': 70},
+            'clip': (50, 100),
+        },
+    },
+    'pull_ups': {
+        'score': {
+            'feature': 'left_arm_angle',
+            'bands': [
+                {'range': (60, 90), 'score': 95, 'center': 75, 'slope': 2},     # 拉起阶段
+                {'range': (150, 180), 'score': 85, 'center': 165, 'slope': 2},  # 悬挂阶段
+            ],
+            'fallback': {'score': 70, 'center': 120, 'slope': 1.5},
+            'clip': (40, 100),
+        },
+    },
+}
+
+# 未配置的运动类型的默认评分；评分所需的关键点缺失时的评分
+DEFAULT_FORM_SCORE = 75.0
+MISSING_FORM_SCORE = 60.0
+DEFAULT_FEEDBACK = '继续保持动作'
+
+
+def _midpoint(points: np.ndarray, left: str, right: str) -> np.ndarray:
+    return (points[LANDMARK_INDEX[left], :2] + points[LANDMARK_INDEX[right], :2]) / 2
+
+
+def _finite(value) -> float:
+    """关键点缺失导致的NaN按0处理，避免污染评分"""
+    value = float(value)
+    return value if math.isfinite(value) else 0.0
+
+
+def _torso_length(points: np.ndarray) -> float:
+    return float(np.linalg.norm(
+        _midpoint(points, 'left_shoulder', 'right_shoulder') - _midpoint(points, 'left_hip', 'right_hip')
+    ))
+
+
+def _position_spread(points: np.ndarray, stats: Optional[RollingLandmarkStats],
+                     names: Tuple[str, ...], axis: Optional[int] = None) -> float:
+    """指定关键点在历史窗口内的位置标准差（躯干长度的百分比，与画面大小、距离无关）"""
+    torso = _torso_length(points)
+    if stats is None or not torso > 0:
+        return 0.0
+    spreads = [stats.std(LANDMARK_INDEX[name]) for name in names]
+    spread = np.mean([item[axis] if axis is not None else np.linalg.norm(item) for item in spreads])
+    return _finite(spread / torso * 100)
+
+
+# 对齐指标为当前帧的几何角度（度）；稳定性指标为历史窗口内的位置标准差
+def knee_alignment(points: np.ndarray, stats: Optional[RollingLandmarkStats] = None) -> float:
+    """膝盖内扣角度：膝盖比脚踝更靠近身体中线时，小腿偏离竖直方向的角度（两侧平均）"""
+    midline = (points[LANDMARK_INDEX['left_hip'], 0] + points[LANDMARK_INDEX['right_hip'], 0]) / 2
+    angles = []
+    for side in ('left', 'right'):
+        knee = points[LANDMARK_INDEX[f'{side}_knee']]
+        ankle = points[LANDMARK_INDEX[f'{side}_ankle']]
+        inward = abs(ankle[0] - midline) - abs(knee[0] - midline)
+        angles.append(math.degrees(math.atan2(max(inward, 0.0), abs(ankle[1] - knee[1]))))
+    return _finite(np.mean(angles))
+
+
+def neck_alignment(points: np.ndarray, stats: Optional[RollingLandmarkStats] = None) -> float:
+    """颈部前屈角度：肩中点->耳中点 与 髋中点->肩中点 两个方向的夹角"""
+    hip = _midpoint(points, 'left_hip', 'right_hip')
+    shoulder = _midpoint(points, 'left_shoulder', 'right_shoulder')
+    ear = _midpoint(points, 'left_ear', 'right_ear')
+    torso, neck = shoulder - hip, ear - shoulder
+    norms = np.linalg.norm(torso) * np.linalg.norm(neck)
+    if not norms > 0:
+        return 0.0
+    cosine = np.clip(np.dot(torso, neck) / norms, -1.0, 1.0)
+    return _finite(math.degrees(math.acos(cosine)))
+
+
+def leg_stability(points: np.ndarray, stats: Optional[RollingLandmarkStats] = None) -> float:
+    """腿部晃动：膝盖和脚踝位置在窗口内的平均标准差"""
+    return _position_spread(points, stats, ('left_knee', 'right_knee', 'left_ankle', 'right_ankle'))
+
+
+def hip_stability(points: np.ndarray, stats: Optional[RollingLandmarkStats] = None) -> float:
+    """髋部高度波动：两侧髋部y坐标在窗口内的平均标准差"""
+    return _position_spread(points, stats, ('left_hip', 'right_hip'), axis=1)
+
+
+def shoulder_stability(points: np.ndarray, stats: Optional[RollingLandmarkStats] = None) -> float:
+    """肩部晃动：两侧肩部位置在窗口内的平均标准差"""
+    return _position_spread(points, stats, ('left_shoulder', 'right_shoulder'))
+
+
+METRICS: Dict[str, Callable] = {
+    'knee_alignment': knee_alignment,
+    'neck_alignment': neck_alignment,
+    'leg_stability': leg_stability,
+    'hip_stability': hip_stability,
+    'shoulder_stability': shoulder_stability,
+}
+
+DERIVED_OPS: Dict[str, Callable] = {
+    'mean': lambda values: sum(values) / len(values),
+    'min': min,
+    'max': max,
+    'absdiff': lambda values: abs(values[0] - values[1]),
+    'deviation': lambda values: abs(180 - values[0]),  # 偏离直线（180度）的角度
+}
+
+
+class ScoreBand(NamedTuple):
+    conditions: Tuple[Tuple[str, float, float], ...]  # (特征, 下限, 上限)，全部满足时使用该区间
+    score: float
+    center: float
+    slope: float
+
+
+class ErrorRule(NamedTuple):
+    feature: str
+    above: bool
+    threshold: float
+    error: Dict
+
+
+class PhaseRule(NamedTuple):
+    feature: str
+    down: float
+    up: float
+
+
+def _bounds(bounds) -> Tuple[float, float]:
+    low, high = bounds
+    return (-math.inf if low is None else float(low), math.inf if high is None else float(high))
+
+
+def _compile_band(feature: str, band: Dict) -> ScoreBand:
+    conditions = []
+    if 'range' in band:
+        conditions.append((feature,) + _bounds(band['range']))
+    for name, bounds in band.get('when', {}).items():
+        conditions.append((name,) + _bounds(bounds))
+    return ScoreBand(
+        conditions=tuple(conditions),
+        score=float(band['score']),
+        center=float(band.get('center', 0)),
+        slope=float(band.get('slope', 0))
+    )
+
+
+def _compile_points(entries, width: int) -> Tuple[List[str], Optional[np.ndarray]]:
+    """[(特征名, (关键点名, ...)), ...] 编译为特征名列表和 (K, width) 关键点索引数组"""
+    if not entries:
+        return [], None
+    names = [name for name, _ in entries]
+    indices = np.array(
+        [[LANDMARK_INDEX[point] for point in points] for _, points in entries], dtype=np.intp
+    ).reshape(-1, width)
+    return names, indices
+
+
+class ExerciseEvaluator:
+    """单个运动的预编译评估器：特征计算、派生值、指标、评分、错误规则、阶段和反馈"""
+
+    __slots__ = (
+        'id', 'key', 'display_name', 'rep_spec', 'angle_names', 'triplets', 'spread_names', 'pairs',
+        'derived', 'metrics', 'score_feature', 'bands', 'fallback', 'clip', 'penalties', 'required',
+        'errors', 'phase_rule', 'feedback'
+    )
+
+    def __init__(self, key: str, spec: Dict, exercise_id: int = 0, display_name: Optional[str] = None,
+                 rep_spec: Optional[RepSpec] = None):
+        self.id = exercise_id
+        self.key = key
+        self.display_name = display_name or key
+        self.rep_spec = rep_spec
+        self.angle_names, self.triplets = _compile_points(
+            spec.get('angles', EXERCISE_ANGLE_TRIPLETS.get(key)), 3
+        )
+        self.spread_names, self.pairs = _compile_points(
+            spec.get('spreads', EXERCISE_SPREAD_PAIRS.get(key)), 2
+        )
+
+        self.derived = tuple(
+            (derived_name, DERIVED_OPS[op], tuple(sources))
+            for derived_name, (op, sources) in spec.get('derived', {}).items()
+        )
+        self.metrics = tuple((metric, METRICS[metric]) for metric in spec.get('metrics', []))
+
+        score = spec.get('score', {})
+        self.score_feature = score.get('feature')
+        self.bands = tuple(_compile_band(self.score_feature, band) for band in score.get('bands', []))
+        fallback = score.get('fallback', {'score': DEFAULT_FORM_SCORE})
+        self.fallback = ScoreBand((), float(fallback['score']),
+                                  float(fallback.get('center', 0)), float(fallback.get('slope', 0)))
+        self.clip = tuple(score.get('clip', (0, 100)))
+        self.penalties = tuple(
+            (metric, float(weight), float(allowance))
+            for metric, (weight, allowance) in score.get('penalties', {}).items()
+        )
+        # 评分依赖的特征，任一缺失时返回MISSING_FORM_SCORE
+        required = {self.score_feature} if self.score_feature else set()
+        for band in self.bands:
+            required.update(condition[0] for condition in band.conditions)
+        self.required = tuple(sorted(required))
+
+        self.errors = tuple(
+            ErrorRule(
+                feature=rule['feature'],
+                above='above' in rule,
+                threshold=float(rule['above'] if 'above' in rule else rule['below']),
+                error={key: value for key, value in rule.items() if key not in ('feature', 'above', 'below')}
+            )
+            for rule in spec.get('errors', [])
+        )
+
+        phase = spec.get('phase')
+        self.phase_rule = PhaseRule(phase['feature'], float(phase['down']), float(phase['up'])) if phase else None
+        self.feedback = dict(spec.get('feedback', {}))
+
+    def batch_features(self, frames: np.ndarray) -> Dict[str, np.ndarray]:
+        """一次计算所有帧的关节角和水平距离，返回 {特征名: (帧数,) 数组}"""
+        features = {}
+        if self.triplets is not None:
+            angles = compute_angles(frames, self.triplets)
+            for column, name in enumerate(self.angle_names):
+                features[name] = angles[:, column]
+        if self.pairs is not None:
+            spreads = compute_spreads(frames, self.pairs)
+            for column, name in enumerate(self.spread_names):
+                features[name] = spreads[:, column]
+        return features
+
+    def features(self, points: np.ndarray) -> Dict[str, float]:
+        """单帧 (33, 4) 的特征"""
+        return {name: float(values[0]) for name, values in self.batch_features(points).items()}
+
+    def values(self, points: np.ndarray, features: Dict[str, float],
+               stats: Optional[RollingLandmarkStats] = None) -> Dict[str, float]:
+        """特征 + 派生值 + 指标"""
+        values = dict(features)
+        for name, op, sources in self.derived:
+            inputs = [values.get(source, math.nan) for source in sources]
+            values[name] = math.nan if any(math.isnan(value) for value in inputs) else op(inputs)
+        for name, metric in self.metrics:
+            values[name] = metric(points, stats)
+        return values
+
+    def score(self, values: Dict[str, float]) -> float:
+        if any(math.isnan(values.get(name, math.nan)) for name in self.required):
+            return MISSING_FORM_SCORE
+
+        chosen = self.fallback
+        for band in self.bands:
+            if all(low <= values[name] <= high for name, low, high in band.conditions):
+                chosen = band
+                break
+
+        value = values[self.score_feature] if self.score_feature else 0.0
+        score = chosen.score - abs(value - chosen.center) * chosen.slope
+        for metric, weight, allowance in self.penalties:
+            score -= weight * max(0.0, values.get(metric, 0.0) - allowance)
+        return float(max(self.clip[0], min(self.clip[1], score)))
+
+    def detect_errors(self, values: Dict[str, float]) -> List[Dict]:
+        errors = []
+        for rule in self.errors:
+            value = values.get(rule.feature, math.nan)
+            if value > rule.threshold if rule.above else value < rule.threshold:
+                errors.append(dict(rule.error))
+        return errors
+
+    def phase(self, values: Dict[str, float]) -> str:
+        """无计数器状态时按单帧判断阶段"""
+        if self.phase_rule is None:
+            return 'unknown'
+        value = values.get(self.phase_rule.feature, math.nan)
+        if math.isnan(value):
+            return 'unknown'
+        if value <= self.phase_rule.down:
+            return 'down'
+        if value >= self.phase_rule.up:
+            return 'up'
+        return 'transition'
+
+    def evaluate(self, points: np.ndarray, features: Optional[Dict[str, float]] = None,
+                 stats: Optional[RollingLandmarkStats] = None) -> Dict:
+        """评估一帧 (33, 4) 关键点，返回 {'values', 'form_score', 'errors'}
+
+        features为该帧已计算的特征（批量分析时整批计算），stats为会话历史窗口统计（稳定性指标）
+        """
+        if features is None:
+            features = self.features(points)
+        values = self.values(points, features, stats)
+        return {
+            'values': values,
+            'form_score': self.score(values),
+            'errors': self.detect_errors(values)
+        }
+
+    def feedback_for(self, phase: str) -> str:
+        return self.feedback.get(phase, DEFAULT_FEEDBACK)
+
+
+def _rep_signal(spec: Dict, default):
+    rep = spec.get('rep')
+    if rep is None:
+        return default
+    return (rep['feature'], rep.get('low_key', 'down'), rep.get('high_key', 'up'),
+            rep.get('mode', 'valley'), rep.get('low', 0), rep.get('high', 180))
+
+
+def load_exercise_specs(exercise_types: Optional[Dict] = None,
+                        specs: Optional[Dict] = None) -> Dict[str, Dict]:
+    """合并运动规格：内置默认 < config.EXERCISE_SPECS（按顶层项覆盖）
+
+    EXERCISE_TYPES中声明但没有规格的运动也会加入（使用默认评分），保证所有可选运动都能分析。
+    """
+    merged = {key: dict(spec) for key, spec in DEFAULT_EXERCISE_SPECS.items()}
+    for key, spec in (specs or {}).items():
+        merged[key] = dict(merged.get(key, {}), **spec)
+    for info in (exercise_types or {}).values():
+        merged.setdefault(info['english'], {})
+    return merged
+
+
+# 名称规范化缓存容量（请求中出现的不同写法数量）
+NAME_CACHE_SIZE = 256
+
+
+def normalize_exercise_name(name: str) -> str:
+    """运动名称的规范写法：去掉首尾空白，小写，连字符和空格统一为下划线"""
+    return '_'.join(name.strip().lower().replace('-', ' ').split())
+
+
+class ExerciseEngine:
+    """统一的动作评估引擎：运动编号 -> 预编译评估器的分派表
+
+    启动时把EXERCISE_TYPES（名称）、EXERCISE_IDS（编号）、EXERCISE_THRESHOLDS（计数阈值）
+    和EXERCISE_SPECS（评分/错误规则）编译一次；运行时按名称或编号查表，不做字符串比较和名称翻译。
+    关键点上传接口和图像帧分析共用同一个引擎。
+    """
+
+    def __init__(self, specs: Optional[Dict] = None, exercise_types: Optional[Dict] = None,
+                 exercise_ids: Optional[Dict[str, int]] = None, thresholds: Optional[Dict] = None,
+                 smoothing_window: int = 3, min_dwell_frames: int = 2):
+        specs = load_exercise_specs(exercise_types, specs)
+        if exercise_ids is None:
+            exercise_ids = {key: index for index, key in enumerate(specs, 1)}
+        display_names = {info['english']: name for name, info in (exercise_types or {}).items()}
+
+        signals = {key: _rep_signal(spec, REP_SIGNALS.get(key)) for key, spec in specs.items()}
+        rep_specs = compile_rep_specs(
+            thresholds, smoothing_window, min_dwell_frames,
+            signals={key: signal for key, signal in signals.items() if signal is not None}
+        )
+
+        self.evaluators: Dict[int, ExerciseEvaluator] = {}
+        self.aliases: Dict[str, int] = {}
+        # 原始名称 -> 编号的缓存：同一种写法只规范化一次，有界，防止任意输入撑大内存
+        self._normalized = lru_cache(maxsize=NAME_CACHE_SIZE)(self._lookup_normalized)
+        for key, spec in specs.items():
+            if key not in exercise_ids:
+                raise ValueError(f'运动类型{key}没有配置编号（EXERCISE_IDS）')
+            exercise_id = int(exercise_ids[key])
+            evaluator = ExerciseEvaluator(key, spec, exercise_id, display_names.get(key), rep_specs.get(key))
+            self.evaluators[exercise_id] = evaluator
+            # 英文名、中文名、编号字符串都可以查到同一个评估器
+            for alias in (key, evaluator.display_name, str(exercise_id)):
+                self.aliases[alias] = exercise_id
+                self.aliases[normalize_exercise_name(alias)] = exercise_id
+
+    @classmethod
+    def from_config(cls, config) -> 'ExerciseEngine':
+        """按Flask配置（或任意映射）构建"""
+        exercise_config = config.get('EXERCISE_CONFIG') or {}
+        return cls(
+            specs=config.get('EXERCISE_SPECS'),
+            exercise_types=config.get('EXERCISE_TYPES'),
+            exercise_ids=config.get('EXERCISE_IDS'),
+            thresholds=config.get('EXERCISE_THRESHOLDS'),
+            smoothing_window=exercise_config.get('rep_smoothing_window', 3),
+            min_dwell_frames=exercise_config.get('rep_min_dwell_frames', 2)
+        )
+
+    @property
+    def rep_specs(self) -> Dict[str, RepSpec]:
+        """{运动类型: RepSpec}，供会话计数器使用"""
+        return {
+            evaluator.key: evaluator.rep_spec
+            for evaluator in self.evaluators.values() if evaluator.rep_spec is not None
+        }
+
+    @property
+    def exercise_ids(self) -> Dict[str, int]:
+        """{运动类型: 编号}，二进制关键点上传格式使用（下发给前端，避免两端各维护一份）"""
+        return {evaluator.key: evaluator.id for evaluator in self.evaluators.values()}
+
+    def _lookup_normalized(self, name: str) -> Optional[int]:
+        return self.aliases.get(normalize_exercise_name(name))
+
+    def exercise_id(self, exercise) -> Optional[int]:
+        """把编号、英文名或中文名（忽略大小写、首尾空白和连字符写法）规范化为整数编号，未知运动返回None"""
+        if isinstance(exercise, int):
+            return exercise if exercise in self.evaluators else None
+        if not isinstance(exercise, str):
+            return None
+        exercise_id = self.aliases.get(exercise)
+        if exercise_id is None:
+            exercise_id = self._normalized(exercise)
+        return exercise_id
+
+    def resolve(self, exercise) -> Optional[ExerciseEvaluator]:
+        """按编号、英文名或中文名查找评估器，未知运动返回None"""
+        return self.evaluators.get(self.exercise_id(exercise))
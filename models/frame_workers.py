@@ -0,0 +1,316 @@
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .landmark_frame import LandmarkFrame
+
+# 每个工作进程最多保留的会话档位状态数（超出后淘汰最久未用的）
+MAX_WORKER_SESSIONS = 256
+
+# 每个工作进程最多同时保留的会话独有MediaPipe检测器数（超出后关闭最久未用会话的检测器，
+# 该会话下一帧重新做全图检测）
+MAX_WORKER_GRAPHS = 8
+
+# 结果收集线程检查工作进程存活的间隔（秒）
+WORKER_CHECK_INTERVAL = 1.0
+
+
+class FramePoolBusy(Exception):
+    """工作进程队列已满（背压），调用方应稍后重试或丢弃该帧"""
+
+
+class FramePoolError(Exception):
+    """图像帧分析失败"""
+
+
+def _worker_main(worker_index: int, task_queue, result_queue,
+                 exercise_config: Optional[Dict], pose_profiles: Optional[Dict]):
+    """工作进程：预热MediaPipe后循环处理图像帧，只做解码和姿态推理"""
+    from .pose_analyzer import AdvancedPoseAnalyzer, load_vision_stack
+
+    cv2, _ = load_vision_stack()
+    analyzer = AdvancedPoseAnalyzer(exercise_config=exercise_config, pose_profiles=pose_profiles)
+
+    # 预热：提前加载默认档位及可降级档位的模型，避免第一帧或中途降级时承担加载（下载）开销
+    analyzer.preload_profiles()
+    analyzer.detect_landmarks(np.zeros((256, 256, 3), dtype=np.uint8), analyzer.create_governor())
+    result_queue.put(('ready', worker_index, None, None))
+
+    # 会话ID -> (请求的档位, 档位控制器, 自适应跳帧状态, 会话独有的检测器)；同一会话固定分配到本进程。
+    # MediaPipe视频模式用上一帧结果跟踪人体，每个会话使用自己的检测器，避免不同用户的帧互相影响
+    sessions: OrderedDict = OrderedDict()
+    # 持有检测器的会话（按最近使用排序）
+    graph_owners: OrderedDict = OrderedDict()
+
+    def release(session_key, state):
+        graph_owners.pop(session_key, None)
+        analyzer.release_graphs(state[3])
+        state[2].reset()
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        task_id, session_key, profile, payload = task
+        try:
+            frame = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError('无法解码图像')
+
+            state = sessions.pop(session_key, None)
+            if state is None or (profile and profile != state[0]):
+                if state is not None:
+                    release(session_key, state)
+                state = (profile, analyzer.create_governor(profile), analyzer.create_tracker(), {})
+            sessions[session_key] = state
+            if len(sessions) > MAX_WORKER_SESSIONS:
+                release(*sessions.popitem(last=False))
+
+            graph_owners[session_key] = True
+            graph_owners.move_to_end(session_key)
+            if len(graph_owners) > MAX_WORKER_GRAPHS:
+                oldest = next(iter(graph_owners))
+                release(oldest, sessions[oldest])
+
+            _, governor, tracker, graphs = state
+            landmarks, _ = analyzer.detect_landmarks(frame, governor, tracker, graphs)
+            encoded = landmarks.to_bytes() if landmarks is not None else None
+            result_queue.put((task_id, encoded, governor.profile, None))
+
+        except Exception as e:
+            result_queue.put((task_id, None, None, str(e)))
+
+
+class FrameWorkerPool:
+    """预热的MediaPipe工作进程池
+
+    - 每个工作进程一个有界任务队列，队列满时立即抛出FramePoolBusy（背压）
+    - 同一会话始终分配到同一个工作进程，使用独有的MediaPipe检测器，跟踪状态和档位降级在会话内连续
+      （每个进程最多保留MAX_WORKER_GRAPHS个会话的检测器，被淘汰的会话下一帧重新做全图检测）
+    - 工作进程异常退出时，排队中的帧立即失败，进程自动重启；预热阶段就退出的进程不再重启
+      （如启动脚本缺少 if __name__ == '__main__' 保护，spawn子进程重新执行脚本后退出）
+    - 推理在工作进程中进行，Flask请求线程只等待结果，慢帧不会阻塞其他请求
+    """
+
+    def __init__(self, workers: int = 0, queue_size: int = 4, timeout: float = 5.0,
+                 exercise_config: Optional[Dict] = None, pose_profiles: Optional[Dict] = None):
+        self.workers = workers if workers > 0 else max(1, (os.cpu_count() or 2) - 1)
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.exercise_config = exercise_config
+        self.pose_profiles = pose_profiles
+
+        self._task_ids = itertools.count()
+        # 任务ID -> (Future, 工作进程序号)
+        self._pending: Dict[int, Tuple[Future, int]] = {}
+        self._pending_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._context = None
+        self._task_queues = []
+        self._processes = []
+        self._result_queue = None
+        self._collector = None
+        self._ready = threading.Event()
+        self._ready_count = 0
+        # 每个工作进程是否已完成预热；未完成预热就退出的进程记入_failed_workers，不再重启
+        self._worker_ready = []
+        self._failed_workers = set()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._processes)
+
+    def start(self):
+        """启动工作进程（重复调用无副作用）"""
+        with self._start_lock:
+            if self._processes:
+                return
+
+            # 使用spawn，避免fork继承Flask进程中的线程和锁。
+            # spawn子进程会重新导入启动脚本，启动脚本必须有 if __name__ == '__main__' 保护
+            self._context = multiprocessing.get_context('spawn')
+            self._result_queue = self._context.Queue()
+
+            # 全部进程启动成功后才保存，启动失败时回滚，之后可以重新调用start()
+            task_queues, processes = [], []
+            try:
+                for worker_index in range(self.workers):
+                    task_queue, process = self._spawn(worker_index)
+                    task_queues.append(task_queue)
+                    processes.append(process)
+            except Exception as e:
+                for process in processes:
+                    process.terminate()
+                    process.join()
+                self._result_queue.close()
+                self._result_queue = None
+                raise FramePoolError(f'工作进程启动失败: {e}') from e
+
+            self._task_queues = task_queues
+            self._processes = processes
+            self._worker_ready = [False] * self.workers
+            self._failed_workers = set()
+            self._collector = threading.Thread(target=self._collect_results, name='pose-worker-results', daemon=True)
+            self._collector.start()
+
+    def _spawn(self, worker_index: int):
+        """启动一个工作进程，返回 (新的任务队列, 进程)（调用方持有_start_lock）"""
+        task_queue = self._context.Queue(maxsize=self.queue_size)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_index, task_queue, self._result_queue, self.exercise_config, self.pose_profiles),
+            name=f'pose-worker-{worker_index}',
+            daemon=True
+        )
+        process.start()
+        return task_queue, process
+
+    def _restart_dead_workers(self) -> int:
+        """重启已退出的工作进程，分配给它们的未完成帧立即失败，返回重启的进程数"""
+        with self._start_lock:
+            dead = [
+                worker_index for worker_index, process in enumerate(self._processes)
+                if process is not None and not process.is_alive()
+            ]
+            for worker_index in dead:
+                if worker_index in self._failed_workers:
+                    continue
+                exitcode = self._processes[worker_index].exitcode
+                if not self._worker_ready[worker_index]:
+                    # 预热阶段就退出，重启也会同样失败
+                    self._failed_workers.add(worker_index)
+                    print(f"工作进程{worker_index}预热时退出（退出码{exitcode}），不再重启")
+                    continue
+                print(f"工作进程{worker_index}异常退出（退出码{exitcode}），正在重启")
+                try:
+                    task_queue, process = self._spawn(worker_index)
+                except Exception as e:
+                    print(f"工作进程{worker_index}重启失败（下次检查时重试）: {e}")
+                    continue
+                self._task_queues[worker_index] = task_queue
+                self._processes[worker_index] = process
+                self._worker_ready[worker_index] = False
+
+        if dead:
+            with self._pending_lock:
+                failed = [
+                    (task_id, future) for task_id, (future, worker_index) in self._pending.items()
+                    if worker_index in dead
+                ]
+                for task_id, _ in failed:
+                    del self._pending[task_id]
+            for _, future in failed:
+                if not future.done():
+                    future.set_exception(FramePoolError('工作进程异常退出'))
+        return len(dead)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """等待所有工作进程完成预热"""
+        return self._ready.wait(timeout)
+
+    def submit(self, session_key: str, payload: bytes, profile: Optional[str] = None) -> Future:
+        """提交一帧编码后的图像（JPEG/PNG），返回Future，结果为 (关键点或None, 实际使用的档位)"""
+        if not self._processes:
+            self.start()
+
+        worker_index = zlib.crc32(session_key.encode('utf-8')) % self.workers
+        process = self._processes[worker_index] if worker_index < len(self._processes) else None
+        if process is None:
+            raise FramePoolError('工作进程池未启动')
+        if not process.is_alive():
+            self._restart_dead_workers()
+            if worker_index in self._failed_workers:
+                raise FramePoolError(f'工作进程{worker_index}启动失败')
+
+        task_id = next(self._task_ids)
+        future = Future()
+
+        with self._pending_lock:
+            self._pending[task_id] = (future, worker_index)
+        try:
+            self._task_queues[worker_index].put_nowait((task_id, session_key, profile, payload))
+        except queue.Full:
+            with self._pending_lock:
+                self._pending.pop(task_id, None)
+            raise FramePoolBusy(f'工作进程{worker_index}队列已满')
+
+        return future
+
+    def analyze(self, session_key: str, payload: bytes,
+                profile: Optional[str] = None) -> Tuple[Optional[LandmarkFrame], Optional[str]]:
+        """同步提交并等待结果，超时抛出FramePoolError"""
+        future = self.submit(session_key, payload, profile)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise FramePoolError('图像帧分析超时')
+
+    def _collect_results(self):
+        last_check = time.monotonic()
+        while True:
+            # 定期检查工作进程是否存活
+            if time.monotonic() - last_check >= WORKER_CHECK_INTERVAL:
+                self._restart_dead_workers()
+                last_check = time.monotonic()
+
+            try:
+                task_id, encoded, profile, error = self._result_queue.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if task_id == 'ready':
+                # 预热完成消息的第二项是工作进程序号
+                if encoded < len(self._worker_ready):
+                    self._worker_ready[encoded] = True
+                self._ready_count += 1
+                if self._ready_count >= self.workers:
+                    self._ready.set()
+                continue
+            if task_id is None:
+                break
+
+            with self._pending_lock:
+                future, _ = self._pending.pop(task_id, (None, None))
+            if future is None or future.done():
+                continue
+
+            if error:
+                future.set_exception(FramePoolError(error))
+            else:
+                landmarks = LandmarkFrame.from_bytes(encoded) if encoded is not None else None
+                future.set_result((landmarks, profile))
+
+    def shutdown(self, timeout: float = 5.0):
+        """停止所有工作进程"""
+        with self._start_lock:
+            for task_queue in self._task_queues:
+                if task_queue is None:
+                    continue
+                try:
+                    task_queue.put_nowait(None)
+                except queue.Full:
+                    pass
+            for process in self._processes:
+                if process is None:
+                    continue
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+            if self._result_queue is not None:
+                self._result_queue.put((None, None, None, None))
+
+            self._task_queues = []
+            self._processes = []
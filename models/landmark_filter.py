@@ -0,0 +1,132 @@
+import math
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from .landmark_frame import NUM_LANDMARKS
+
+# 默认滤波参数（坐标为归一化坐标，速度单位为 画面宽高/秒）
+# one_euro: 静止时按min_cutoff强平滑去抖，运动越快截止频率越高（beta），减少滞后
+# ema: 固定系数alpha的指数平滑；none: 不滤波
+DEFAULT_LANDMARK_FILTERS = {
+    'default': {'type': 'one_euro', 'min_cutoff': 1.0, 'beta': 5.0, 'd_cutoff': 1.0, 'alpha': 0.5},
+}
+
+FILTER_TYPES = ('one_euro', 'ema', 'none')
+
+# 只平滑x/y/z，可见度保持原值
+SMOOTHED_FIELDS = 3
+
+
+class FilterSpec(NamedTuple):
+    type: str
+    min_cutoff: float
+    beta: float
+    d_cutoff: float
+    alpha: float
+    frame_period: float
+
+
+def compile_filter_specs(filters: Optional[Dict] = None, frame_rate: float = 30) -> Dict[Optional[str], FilterSpec]:
+    """把滤波配置编译为 {运动类型: FilterSpec}，运动类型的配置覆盖default，键None为默认参数"""
+    filters = filters or DEFAULT_LANDMARK_FILTERS
+    base = dict(DEFAULT_LANDMARK_FILTERS['default'])
+    base.update(filters.get('default', {}))
+    frame_period = 1.0 / frame_rate if frame_rate else 1.0 / 30
+
+    def build(options: Dict) -> FilterSpec:
+        merged = dict(base, **options)
+        if merged['type'] not in FILTER_TYPES:
+            raise ValueError(f"未知的关键点滤波类型: {merged['type']}")
+        return FilterSpec(
+            type=merged['type'],
+            min_cutoff=float(merged['min_cutoff']),
+            beta=float(merged['beta']),
+            d_cutoff=float(merged['d_cutoff']),
+            alpha=float(merged['alpha']),
+            frame_period=frame_period
+        )
+
+    specs: Dict[Optional[str], FilterSpec] = {None: build({})}
+    for exercise, options in filters.items():
+        if exercise != 'default':
+            specs[exercise] = build(options)
+    return specs
+
+
+def _smoothing_factor(elapsed: float, cutoff):
+    """一阶低通滤波系数 alpha = 1 / (1 + tau / dt)，tau = 1 / (2π·cutoff)"""
+    return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * elapsed))
+
+
+class LandmarkFilter:
+    """单个会话的关键点时域滤波（对33个关键点整体向量化，每帧O(1)）
+
+    状态数组在创建时预分配。某个关键点缺失（NaN）时其状态随之清空，
+    重新出现时直接采用新值，不会从旧位置"滑"过去。
+    """
+
+    __slots__ = ('spec', '_value', '_derivative', '_delta', '_cutoff', '_last_time')
+
+    def __init__(self, spec: Optional[FilterSpec] = None):
+        self.spec = spec or compile_filter_specs()[None]
+        shape = (NUM_LANDMARKS, SMOOTHED_FIELDS)
+        self._value = np.full(shape, np.nan, dtype=np.float32)
+        self._derivative = np.zeros(shape, dtype=np.float32)
+        self._delta = np.empty(shape, dtype=np.float32)
+        self._cutoff = np.empty(shape, dtype=np.float32)
+        self._last_time: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.spec.type != 'none'
+
+    def reset(self):
+        self._value.fill(np.nan)
+        self._derivative.fill(0.0)
+        self._last_time = None
+
+    def apply(self, frame: np.ndarray, timestamp: Optional[float] = None) -> np.ndarray:
+        """输入一帧 (33, 4) 关键点和时间戳（秒），返回平滑后的新数组（不修改输入）"""
+        if not self.enabled:
+            return frame
+
+        # 时间戳缺失或不递增时按标称帧间隔计算
+        elapsed = self.spec.frame_period
+        if timestamp is not None:
+            if self._last_time is not None and timestamp > self._last_time:
+                elapsed = timestamp - self._last_time
+            self._last_time = timestamp
+
+        raw = frame[:, :SMOOTHED_FIELDS]
+        value, delta = self._value, self._delta
+        fresh = np.isnan(value)
+        np.subtract(raw, value, out=delta)
+
+        if self.spec.type == 'ema':
+            value += self.spec.alpha * delta
+        else:
+            # 速度先做低通，再由速度决定每个坐标的截止频率
+            derivative = self._derivative
+            derivative += _smoothing_factor(elapsed, self.spec.d_cutoff) * (delta / elapsed - derivative)
+            np.abs(derivative, out=self._cutoff)
+            self._cutoff *= self.spec.beta
+            self._cutoff += self.spec.min_cutoff
+            value += _smoothing_factor(elapsed, self._cutoff) * delta
+            derivative[fresh] = 0.0
+
+        # 新出现的关键点直接取原值；缺失的关键点保持NaN（下一帧视为新出现）
+        np.copyto(value, raw, where=fresh)
+
+        smoothed = np.array(frame, dtype=np.float32)
+        smoothed[:, :SMOOTHED_FIELDS] = value
+        return smoothed
+
+    def apply_batch(self, frames: np.ndarray, timestamps) -> np.ndarray:
+        """按时间顺序逐帧滤波 (帧数, 33, 4)，返回新数组"""
+        if not self.enabled:
+            return frames
+        smoothed = np.empty(frames.shape, dtype=np.float32)
+        for index, (frame, timestamp) in enumerate(zip(frames, timestamps)):
+            smoothed[index] = self.apply(frame, timestamp)
+        return smoothed
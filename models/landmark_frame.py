@@ -0,0 +1,171 @@
+import numpy as np
+from typing import Dict, List, Optional
+
+# MediaPipe Pose 33个关键点的固定顺序
+LANDMARK_NAMES = [
+    'nose', 'left_eye_inner', 'left_eye', 'left_eye_outer',
+    'right_eye_inner', 'right_eye', 'right_eye_outer',
+    'left_ear', 'right_ear', 'mouth_left', 'mouth_right',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_pinky', 'right_pinky',
+    'left_index', 'right_index', 'left_thumb', 'right_thumb',
+    'left_hip', 'right_hip', 'left_knee', 'right_knee',
+    'left_ankle', 'right_ankle', 'left_heel', 'right_heel',
+    'left_foot_index', 'right_foot_index'
+]
+NUM_LANDMARKS = len(LANDMARK_NAMES)
+LANDMARK_INDEX = {name: index for index, name in enumerate(LANDMARK_NAMES)}
+
+# 每个关键点的分量顺序
+LANDMARK_FIELDS = ('x', 'y', 'z', 'visibility')
+FIELD_INDEX = {name: index for index, name in enumerate(LANDMARK_FIELDS)}
+FIELD_INDEX['confidence'] = FIELD_INDEX['visibility']
+FRAME_SIZE = NUM_LANDMARKS * len(LANDMARK_FIELDS)
+
+
+def _to_camel(name: str) -> str:
+    head, *rest = name.split('_')
+    return head + ''.join(part.capitalize() for part in rest)
+
+
+# 前端使用驼峰命名（leftShoulder），后端使用下划线命名（left_shoulder）
+LANDMARK_ALIASES = dict(LANDMARK_INDEX)
+LANDMARK_ALIASES.update({_to_camel(name): index for name, index in LANDMARK_INDEX.items()})
+
+
+class LandmarkPoint:
+    """单个关键点的只读视图，兼容旧的字典访问方式（point['x']、point.get('x')）"""
+
+    __slots__ = ('_row',)
+
+    def __init__(self, row: np.ndarray):
+        self._row = row
+
+    @property
+    def x(self) -> float:
+        return float(self._row[0])
+
+    @property
+    def y(self) -> float:
+        return float(self._row[1])
+
+    @property
+    def z(self) -> float:
+        return float(self._row[2])
+
+    @property
+    def visibility(self) -> float:
+        return float(self._row[3])
+
+    def __getitem__(self, field: str) -> float:
+        return float(self._row[FIELD_INDEX[field]])
+
+    def get(self, field: str, default=None):
+        index = FIELD_INDEX.get(field)
+        return default if index is None else float(self._row[index])
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(zip(LANDMARK_FIELDS, self._row.tolist()))
+
+
+class LandmarkFrame:
+    """紧凑的单帧关键点：固定顺序的 (33, 4) float32 数组 [x, y, z, visibility]
+
+    缺失的关键点用NaN表示。按名称访问返回LandmarkPoint视图，不复制数据。
+    """
+
+    __slots__ = ('data', 'timestamp')
+
+    def __init__(self, data: Optional[np.ndarray] = None, timestamp: Optional[float] = None):
+        if data is None:
+            data = np.full((NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32)
+        else:
+            data = np.asarray(data, dtype=np.float32).reshape(NUM_LANDMARKS, len(LANDMARK_FIELDS))
+        self.data = data
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_dict(cls, landmarks: Dict, timestamp: Optional[float] = None) -> 'LandmarkFrame':
+        """从 {名称: {x, y, z, visibility}} 字典创建（兼容驼峰命名和confidence字段）"""
+        frame = cls(timestamp=timestamp)
+        for name, point in landmarks.items():
+            index = LANDMARK_ALIASES.get(name)
+            if index is None or not point:
+                continue
+            frame.data[index] = (
+                point.get('x', 0),
+                point.get('y', 0),
+                point.get('z', 0),
+                point.get('visibility', point.get('confidence', 1))
+            )
+        return frame
+
+    @classmethod
+    def from_list(cls, values: List, timestamp: Optional[float] = None) -> 'LandmarkFrame':
+        """从扁平数组（33 × [x, y, z, visibility]，缺失为null）创建"""
+        if len(values) != FRAME_SIZE:
+            raise ValueError(f'关键点数组长度应为{FRAME_SIZE}，实际为{len(values)}')
+        return cls(np.asarray(values, dtype=np.float32), timestamp)
+
+    @classmethod
+    def from_mediapipe(cls, pose_landmarks, timestamp: Optional[float] = None) -> 'LandmarkFrame':
+        """从MediaPipe检测结果创建"""
+        data = np.array(
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark],
+            dtype=np.float32
+        )
+        return cls(data, timestamp)
+
+    @classmethod
+    def from_bytes(cls, buffer: bytes, timestamp: Optional[float] = None) -> 'LandmarkFrame':
+        """从二进制编码（小端float32，共528字节）创建"""
+        return cls(np.frombuffer(buffer, dtype='<f4', count=FRAME_SIZE), timestamp)
+
+    @classmethod
+    def from_payload(cls, payload, timestamp: Optional[float] = None) -> 'LandmarkFrame':
+        """从接口数据创建：支持LandmarkFrame、扁平数组或旧的字典格式"""
+        if isinstance(payload, cls):
+            return payload
+        if isinstance(payload, dict):
+            return cls.from_dict(payload, timestamp)
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            return cls.from_bytes(payload, timestamp)
+        return cls.from_list(payload, timestamp)
+
+    def __getitem__(self, name: str) -> LandmarkPoint:
+        return LandmarkPoint(self.data[LANDMARK_ALIASES[name]])
+
+    def __contains__(self, name: str) -> bool:
+        index = LANDMARK_ALIASES.get(name)
+        return index is not None and not np.isnan(self.data[index, 0])
+
+    def get(self, name: str, default=None):
+        """按名称获取关键点，缺失时返回default"""
+        return self[name] if name in self else default
+
+    def to_list(self) -> List:
+        """编码为扁平数组（JSON友好，NaN编码为null）"""
+        return [None if value != value else value for value in self.data.ravel().tolist()]
+
+    def to_bytes(self) -> bytes:
+        """编码为二进制（小端float32，共528字节）"""
+        return self.data.astype('<f4', copy=False).tobytes()
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """转换为旧的字典格式（仅包含已检测到的关键点）"""
+        return {
+            name: dict(zip(LANDMARK_FIELDS, self.data[index].tolist()))
+            for index, name in enumerate(LANDMARK_NAMES)
+            if not np.isnan(self.data[index, 0])
+        }
+
+
+def stack_landmark_payloads(payloads: List) -> np.ndarray:
+    """把多帧接口数据合并为 (帧数, 33, 4) 数组"""
+    if payloads and all(isinstance(payload, list) for payload in payloads):
+        frames = np.asarray(payloads, dtype=np.float32)
+        if frames.shape[1:] != (FRAME_SIZE,):
+            raise ValueError(f'关键点数组长度应为{FRAME_SIZE}')
+        return frames.reshape(len(payloads), NUM_LANDMARKS, len(LANDMARK_FIELDS))
+
+    return np.stack([LandmarkFrame.from_payload(payload).data for payload in payloads])
@@ -0,0 +1,138 @@
+from typing import Optional
+
+import numpy as np
+
+from .landmark_frame import NUM_LANDMARKS, LANDMARK_FIELDS
+
+
+class LandmarkRingBuffer:
+    """固定容量、预分配的关键点历史环形缓冲区
+
+    采用镜像双缓冲：每帧同时写入位置i和i+capacity，因此最近n帧总是一段连续内存，
+    window(n)直接返回按时间顺序排列的视图，不做任何拷贝。内存占用与会话时长无关。
+    """
+
+    __slots__ = ('capacity', '_frames', '_timestamps', '_next', '_count')
+
+    def __init__(self, capacity: int = 90):
+        self.capacity = max(1, capacity)
+        self._frames = np.full(
+            (2 * self.capacity, NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32
+        )
+        self._timestamps = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count == self.capacity
+
+    def clear(self):
+        """清空历史（保留已分配的内存）"""
+        self._next = 0
+        self._count = 0
+
+    def oldest(self) -> Optional[np.ndarray]:
+        """缓冲区已满时返回下一次push将被覆盖的帧（视图），否则返回None"""
+        if not self.full:
+            return None
+        return self._frames[self._next]
+
+    def push(self, frame: np.ndarray, timestamp: float = 0.0):
+        """写入一帧 (33, 4) 关键点"""
+        index = self._next
+        self._frames[index] = frame
+        self._frames[index + self.capacity] = frame
+        self._timestamps[index] = timestamp
+        self._timestamps[index + self.capacity] = timestamp
+
+        self._next = (index + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def latest(self) -> Optional[np.ndarray]:
+        """最近一帧（视图）"""
+        if not self._count:
+            return None
+        return self._frames[self._next - 1 + self.capacity]
+
+    def window(self, size: Optional[int] = None) -> np.ndarray:
+        """最近size帧，形状 (n, 33, 4)，按时间从旧到新排列的视图"""
+        size = self._count if size is None else min(size, self._count)
+        end = self._next + self.capacity
+        return self._frames[end - size:end]
+
+    def timestamps(self, size: Optional[int] = None) -> np.ndarray:
+        """与window(size)对应的时间戳视图"""
+        size = self._count if size is None else min(size, self._count)
+        end = self._next + self.capacity
+        return self._timestamps[end - size:end]
+
+    def velocity(self) -> Optional[np.ndarray]:
+        """最近两帧之间每个关键点的位移速度 (33, 2)，帧数不足或时间间隔为0时返回None"""
+        if self._count < 2:
+            return None
+        frames = self.window(2)
+        times = self.timestamps(2)
+        elapsed = times[1] - times[0]
+        if elapsed <= 0:
+            return None
+        return (frames[1, :, :2] - frames[0, :, :2]) / elapsed
+
+
+class RollingLandmarkStats:
+    """关键点x/y坐标在滑动窗口内的均值和方差（Welford增量算法，每帧O(1)）
+
+    与LandmarkRingBuffer配合使用：写入新帧前把即将被覆盖的最旧帧（oldest()）一并传入，
+    从统计中移除，因此窗口长度等于环形缓冲区容量，计算量与会话时长无关。
+    缺失的关键点（NaN）不参与统计，每个坐标单独计数。
+    """
+
+    __slots__ = ('_count', '_mean', '_m2')
+
+    def __init__(self):
+        shape = (NUM_LANDMARKS, 2)
+        self._count = np.zeros(shape, dtype=np.int32)
+        self._mean = np.zeros(shape, dtype=np.float64)
+        self._m2 = np.zeros(shape, dtype=np.float64)
+
+    def clear(self):
+        self._count.fill(0)
+        self._mean.fill(0.0)
+        self._m2.fill(0.0)
+
+    def update(self, frame: np.ndarray, evicted: Optional[np.ndarray] = None):
+        """加入一帧 (33, 4)；evicted为离开窗口的旧帧"""
+        count, mean, m2 = self._count, self._mean, self._m2
+
+        if evicted is not None:
+            old = evicted[:, :2].astype(np.float64)
+            leaving = ~np.isnan(old) & (count > 0)
+            count -= leaving
+            remaining = np.maximum(count, 1)
+            delta = np.where(leaving, old - mean, 0.0)
+            mean -= np.where(leaving & (count > 0), delta / remaining, delta)
+            m2 -= np.where(leaving, delta * (old - mean), 0.0)
+            empty = count == 0
+            mean[empty] = 0.0
+            m2[empty] = 0.0
+            np.maximum(m2, 0.0, out=m2)
+
+        new = frame[:, :2].astype(np.float64)
+        entering = ~np.isnan(new)
+        count += entering
+        delta = np.where(entering, new - mean, 0.0)
+        mean += delta / np.maximum(count, 1)
+        m2 += np.where(entering, delta * (new - mean), 0.0)
+
+    def mean(self, index: int) -> np.ndarray:
+        """关键点在窗口内的平均位置 (x, y)"""
+        return self._mean[index]
+
+    def std(self, index: int) -> np.ndarray:
+        """关键点x、y坐标在窗口内的标准差，样本不足2个时为0"""
+        count = self._count[index]
+        return np.sqrt(np.where(count > 1, self._m2[index] / np.maximum(count, 1), 0.0))
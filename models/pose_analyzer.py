@@ -1,418 +1,363 @@
-import cv2
 import numpy as np
-import mediapipe as mp
-import tensorflow as tf
-from typing import Dict, List, Tuple, Optional
-import math
-import json
+from typing import Dict, List, NamedTuple, Tuple, Optional
+import threading
+import time
 from datetime import datetime
 
+from .session_registry import PoseSession
+from .rep_counter import RepSpec
+from .landmark_filter import FilterSpec
+from .landmark_frame import LandmarkFrame
+from .exercise_engine import ExerciseEngine
+from .pose_profile import PoseProfile, ProfileGovernor, compile_pose_profiles
+from .adaptive_tracking import AdaptiveTracker, THUMBNAIL_SIZE
+
+# OpenCV和MediaPipe导入慢、占用内存大，只在真正分析图像帧时才加载
+cv2 = None
+mp = None
+_vision_lock = threading.Lock()
+
+
+def load_vision_stack():
+    """按需导入cv2和mediapipe（进程内只导入一次）"""
+    global cv2, mp
+    if mp is None:
+        with _vision_lock:
+            if mp is None:
+                import cv2 as _cv2
+                import mediapipe as _mp
+                cv2 = _cv2
+                mp = _mp
+    return cv2, mp
+
+# 各运动在画面左上角显示的角度：(标签, analysis字段)
+ANGLE_OVERLAYS = {
+    'pushup': [
+        ('Left Arm: ', 'left_arm_angle'),
+        ('Right Arm: ', 'right_arm_angle'),
+        ('Body Align: ', 'body_line_angle'),
+    ],
+    'squat': [
+        ('Left Knee: ', 'left_knee_angle'),
+        ('Right Knee: ', 'right_knee_angle'),
+        ('Back Angle: ', 'back_angle'),
+    ],
+}
+
+# 静态文字图层缓存上限
+MAX_TEXT_LAYERS = 32
+
+
+class TextLayer(NamedTuple):
+    """预渲染的静态文字：非零像素的坐标和颜色，以及各数值的绘制位置"""
+    rows: np.ndarray
+    cols: np.ndarray
+    pixels: np.ndarray
+    value_positions: List[Tuple[str, Tuple[int, int]]]
+    reps_position: Tuple[int, int]
+
 class AdvancedPoseAnalyzer:
     """高级姿态分析器 - 使用深度学习进行精确动作检测"""
     
-    def __init__(self):
-        # 初始化MediaPipe
-        self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
-        
-        # 初始化姿态检测器
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=2,  # 使用最高精度模型
-            enable_segmentation=True,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
+    def __init__(self, rep_specs: Optional[Dict[str, RepSpec]] = None,
+                 exercise_config: Optional[Dict] = None, pose_profiles: Optional[Dict] = None,
+                 filter_specs: Optional[Dict[Optional[str], FilterSpec]] = None,
+                 engine: Optional[ExerciseEngine] = None):
+        exercise_config = exercise_config or {}
+        
+        # MediaPipe在第一次分析图像帧时才初始化（见_get_pose），每个档位一个共享检测器；
+        # 多个会话交替推理时，调用方为每个会话传入独立的graphs（见detect_landmarks）
+        self.mp_pose = None
+        self.mp_drawing = None
+        self.mp_drawing_styles = None
+        self._poses: Dict[str, object] = {}
+        # 模型无法加载的档位（lite/heavy模型不随MediaPipe发布，首次使用需要联网下载）
+        self._unavailable_profiles = set()
+        self._text_layers: Dict[Tuple, TextLayer] = {}
+        
+        # 质量/性能档位（lite/full/heavy）及延迟预算
+        self.profiles = compile_pose_profiles(pose_profiles)
+        self.default_profile = exercise_config.get('pose_profile', 'full')
+        if self.default_profile not in self.profiles:
+            self.default_profile = next(iter(self.profiles))
+        self.latency_budget_ms = exercise_config.get('pose_latency_budget_ms')
+        self.detection_confidence = exercise_config.get('detection_confidence', 0.5)
+        self.tracking_confidence = exercise_config.get('tracking_confidence', 0.5)
+        
+        # 自适应推理（跳帧 + ROI裁剪）的激进程度，0为关闭
+        self.adaptive_aggressiveness = exercise_config.get('adaptive_aggressiveness', 0.0)
+        
+        # 评分、错误和阶段规则（与关键点上传接口共用同一个引擎）
+        self.engine = engine or ExerciseEngine()
+        
+        # 检测器的创建、关闭和推理加锁（共享检测器和会话独有的检测器都经过这里）
+        self._pose_lock = threading.Lock()
+        
+        # 状态跟踪（未指定会话时使用默认会话）
+        self.rep_specs = rep_specs if rep_specs is not None else self.engine.rep_specs
+        self.session = PoseSession(
+            'default', rep_specs=self.rep_specs,
+            history_size=exercise_config.get('history_frames', 90),
+            filter_specs=filter_specs
         )
         
-        # 运动标准参数
-        self.exercise_standards = {
-            'pushup': {
-                'arm_angle_down': (60, 120),  # 下降时手臂角度范围（放宽）
-                'arm_angle_up': (150, 180),   # 上升时手臂角度范围（放宽）
-                'body_alignment_threshold': 25,  # 身体直线度阈值（放宽）
-                'hip_shoulder_angle': (150, 180),  # 髋肩角度（放宽）
-                'min_depth': 0.2,  # 最小下降幅度（降低）
-            },
-            'squat': {
-                'knee_angle_down': (60, 120),  # 下蹲时膝盖角度（放宽）
-                'knee_angle_up': (150, 180),   # 站立时膝盖角度（放宽）
-                'back_angle': (70, 110),       # 背部角度（放宽）
-                'knee_foot_alignment': 30,     # 膝盖脚踝对齐度（放宽）
-                'min_depth': 0.3,  # 最小下蹲幅度（降低）
-            },
-            'situp': {
-                'torso_angle_down': (0, 40),   # 躺下时躯干角度（放宽）
-                'torso_angle_up': (35, 100),    # 起身时躯干角度（放宽）
-                'leg_stability': 20,           # 腿部稳定性（放宽）
-                'neck_alignment': 25,          # 颈部对齐（放宽）
-            },
-            'plank': {
-                'body_line_threshold': 20,     # 身体直线度（放宽）
-                'hip_height_variance': 0.1,  # 髋部高度变化（放宽）
-                'shoulder_stability': 10,      # 肩部稳定性（放宽）
-                'hold_time_min': 5,          # 最小保持时间（降低）
-            }
-        }
-        
-        # 错误检测阈值
-        self.error_thresholds = {
-            'angle_deviation': 15,      # 角度偏差阈值
-            'alignment_deviation': 20,  # 对齐偏差阈值
-            'stability_threshold': 0.1, # 稳定性阈值
-            'consistency_frames': 5     # 连续帧数要求
-        }
-        
-        # 状态跟踪
-        self.current_exercise = None
-        self.exercise_state = 'ready'
-        self.rep_count = 0
-        self.error_history = []
-        self.frame_buffer = []
-        self.last_analysis = None
+    @property
+    def current_exercise(self) -> Optional[str]:
+        return self.session.exercise
+        
+    @property
+    def rep_count(self) -> int:
+        return self.session.rep_count
+        
+    @property
+    def exercise_state(self) -> str:
+        return self.session.exercise_state
         
     def set_exercise(self, exercise_type: str):
-        """设置当前运动类型"""
-        self.current_exercise = exercise_type
-        self.exercise_state = 'ready'
-        self.rep_count = 0
-        self.error_history = []
-        self.frame_buffer = []
-        
-    def analyze_frame(self, frame: np.ndarray) -> Dict:
-        """分析单帧图像"""
-        if self.current_exercise is None:
+        """设置默认会话的运动类型（英文名、中文名或编号）"""
+        evaluator = self.engine.resolve(exercise_type)
+        self.session.reset(evaluator.key if evaluator else exercise_type)
+        
+    def set_profile(self, profile: str, session: Optional[PoseSession] = None):
+        """设置会话使用的推理档位（默认会话为self.session）"""
+        if profile not in self.profiles:
+            raise ValueError(f'未知的推理档位: {profile}')
+        session = session or self.session
+        session.governor = self.create_governor(profile)
+        
+    def create_governor(self, profile: Optional[str] = None) -> ProfileGovernor:
+        """创建档位控制器，未指定或档位未知时使用部署默认档位"""
+        if profile not in self.profiles:
+            profile = self.default_profile
+        return ProfileGovernor(profile, self.latency_budget_ms)
+        
+    def preload_profiles(self) -> List[str]:
+        """预先加载默认档位及所有可降级到的档位模型，返回可用的档位名
+
+        需要下载的模型在启动时下载，而不是在会话中途降级时才下载；加载失败的档位不再用于降级。
+        """
+        names = list(self.profiles)
+        for name in names[:names.index(self.default_profile) + 1]:
+            try:
+                self._get_pose(self.profiles[name])
+            except Exception as e:
+                self._unavailable_profiles.add(name)
+                print(f"推理档位{name}的模型加载失败，该档位不可用: {e}")
+        return [name for name in names if name not in self._unavailable_profiles]
+        
+    def analyze_frame(self, frame: np.ndarray, session: Optional[PoseSession] = None,
+                      annotate: bool = False) -> Dict:
+        """分析单帧图像，状态写入指定会话（默认会话为self.session）
+
+        annotate为True时结果包含annotated_frame。标注图像绘制在会话复用的缓冲区中，
+        下一次分析同一会话时会被覆盖，需要保留时请自行复制。
+        """
+        session = session or self.session
+        if session.exercise is None:
             return {'error': '未设置运动类型'}
+        evaluator = self.engine.resolve(session.exercise)
+        if evaluator is None:
+            return {'error': f'不支持的运动类型: {session.exercise}'}
             
-        # 转换颜色空间
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # 姿态检测
-        results = self.pose.process(rgb_frame)
-        
-        if not results.pose_landmarks:
+        if session.governor is None:
+            session.governor = self.create_governor()
+        if session.tracker is None:
+            session.tracker = self.create_tracker()
+            
+        landmarks, results = self.detect_landmarks(frame, session.governor, session.tracker)
+        if landmarks is None:
             return {'error': '未检测到人体姿态'}
             
-        # 提取关键点
-        landmarks = self._extract_landmarks(results.pose_landmarks)
-        
-        # 运动特定分析
-        analysis = self._analyze_exercise_specific(landmarks)
-        
-        # 错误检测
-        errors = self._detect_errors(landmarks, analysis)
-        
-        # 绘制检测结果
-        annotated_frame = self._draw_analysis(frame, results, analysis, errors)
-        
-        # 更新状态
-        self._update_exercise_state(analysis)
-        
-        result = {
-            'landmarks': landmarks,
-            'analysis': analysis,
-            'errors': errors,
-            'annotated_frame': annotated_frame,
-            'rep_count': self.rep_count,
-            'exercise_state': self.exercise_state,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        self.last_analysis = result
-        return result
-        
-    def _extract_landmarks(self, pose_landmarks) -> Dict:
-        """提取关键点坐标"""
-        landmarks = {}
-        
-        # 定义关键点映射
-        keypoint_map = {
-            'nose': self.mp_pose.PoseLandmark.NOSE,
-            'left_shoulder': self.mp_pose.PoseLandmark.LEFT_SHOULDER,
-            'right_shoulder': self.mp_pose.PoseLandmark.RIGHT_SHOULDER,
-            'left_elbow': self.mp_pose.PoseLandmark.LEFT_ELBOW,
-            'right_elbow': self.mp_pose.PoseLandmark.RIGHT_ELBOW,
-            'left_wrist': self.mp_pose.PoseLandmark.LEFT_WRIST,
-            'right_wrist': self.mp_pose.PoseLandmark.RIGHT_WRIST,
-            'left_hip': self.mp_pose.PoseLandmark.LEFT_HIP,
-            'right_hip': self.mp_pose.PoseLandmark.RIGHT_HIP,
-            'left_knee': self.mp_pose.PoseLandmark.LEFT_KNEE,
-            'right_knee': self.mp_pose.PoseLandmark.RIGHT_KNEE,
-            'left_ankle': self.mp_pose.PoseLandmark.LEFT_ANKLE,
-            'right_ankle': self.mp_pose.PoseLandmark.RIGHT_ANKLE
-        }
-        
-        for name, landmark_id in keypoint_map.items():
-            landmark = pose_landmarks.landmark[landmark_id]
-            landmarks[name] = {
-                'x': landmark.x,
-                'y': landmark.y,
-                'z': landmark.z,
-                'visibility': landmark.visibility
+        with session.lock:
+            # 时域滤波去除关键点抖动，避免阶段来回跳变造成误计数和重复报错
+            landmarks = session.smooth(landmarks, time.monotonic())
+            
+            # 先写入历史窗口，稳定性指标包含当前帧
+            session.record_frame(landmarks.data)
+            
+            # 关节角、派生值、稳定性指标各计算一次，评分和错误规则共用
+            evaluation = evaluator.evaluate(landmarks.data, stats=session.landmark_stats)
+            analysis = dict(evaluation['values'], form_score=evaluation['form_score'])
+            errors = evaluation['errors']
+            
+            # 更新状态
+            self._update_exercise_state(analysis, evaluation['values'], session)
+            session.record_errors(errors)
+            
+            result = {
+                'landmarks': landmarks,
+                'analysis': analysis,
+                'errors': errors,
+                'rep_count': session.rep_count,
+                'exercise_state': session.exercise_state,
+                'profile': session.governor.profile,
+                'inferred': results is not None,
+                'timestamp': datetime.now().isoformat()
             }
             
-        return landmarks
-        
-    def _analyze_exercise_specific(self, landmarks: Dict) -> Dict:
-        """运动特定分析"""
-        if self.current_exercise == 'pushup':
-            return self._analyze_pushup(landmarks)
-        elif self.current_exercise == 'squat':
-            return self._analyze_squat(landmarks)
-        elif self.current_exercise == 'situp':
-            return self._analyze_situp(landmarks)
-        elif self.current_exercise == 'plank':
-            return self._analyze_plank(landmarks)
-        else:
-            return {'error': f'不支持的运动类型: {self.current_exercise}'}
+            # 会话只保留数值结果，不持有图像
+            session.last_analysis = result
             
-    def _analyze_pushup(self, landmarks: Dict) -> Dict:
-        """俯卧撑分析"""
-        # 计算手臂角度
-        left_arm_angle = self._calculate_angle(
-            landmarks['left_shoulder'], landmarks['left_elbow'], landmarks['left_wrist']
-        )
-        right_arm_angle = self._calculate_angle(
-            landmarks['right_shoulder'], landmarks['right_elbow'], landmarks['right_wrist']
-        )
-        
-        # 计算身体直线度
-        body_alignment = self._calculate_body_alignment(
-            landmarks['left_shoulder'], landmarks['left_hip'], landmarks['left_ankle']
-        )
-        
-        # 计算髋肩角度
-        hip_shoulder_angle = self._calculate_angle(
-            landmarks['left_hip'], landmarks['left_shoulder'], landmarks['right_shoulder']
-        )
-        
-        # 判断动作阶段
-        avg_arm_angle = (left_arm_angle + right_arm_angle) / 2
-        standards = self.exercise_standards['pushup']
+            # 只有调用方需要时才绘制标注图像
+            if annotate:
+                result = dict(result, annotated_frame=self._draw_analysis(frame, results, analysis, errors, session))
+        return result
         
-        if avg_arm_angle < standards['arm_angle_down'][1]:
-            phase = 'down'
-        elif avg_arm_angle > standards['arm_angle_up'][0]:
-            phase = 'up'
-        else:
-            phase = 'transition'
+    def detect_landmarks(self, frame: np.ndarray, governor: ProfileGovernor,
+                         tracker: Optional[AdaptiveTracker] = None,
+                         graphs: Optional[Dict[str, object]] = None) -> Tuple[Optional[LandmarkFrame], object]:
+        """只做姿态推理：按档位缩放图像并检测关键点，返回 (关键点, MediaPipe原始结果)
+
+        未检测到人体时关键点为None。推理耗时计入governor，超出预算时自动降级档位。
+        传入tracker时启用自适应模式：画面变化小的帧沿用上次关键点（原始结果为None），
+        其余帧只对上一帧人体所在区域推理。
+        MediaPipe检测器在视频模式下会用上一帧的结果跟踪人体，graphs为调用方会话独有的
+        {档位名: 检测器}（按需创建，用完调用release_graphs），未传入时使用共享检测器。
+        """
+        profile, pose = self._resolve_pose(governor, graphs)
+        
+        # 按档位缩小输入（关键点坐标是归一化的，不受缩放影响）
+        frame = self._downscale(frame, profile.input_size)
+        
+        thumbnail = None
+        if tracker is not None and tracker.enabled:
+            thumbnail = self._motion_thumbnail(frame)
+            if tracker.should_skip(thumbnail):
+                return tracker.last_landmarks, None
+                
+        started = time.perf_counter()
+        height, width = frame.shape[:2]
+        box = tracker.crop_box(width, height) if tracker is not None else None
+        
+        # 姿态检测（有ROI时只处理人体所在区域，丢失时回退到全图）
+        with self._pose_lock:
+            if box is not None:
+                x0, y0, x1, y1 = box
+                results = pose.process(cv2.cvtColor(frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB))
+                if results.pose_landmarks:
+                    self._map_roi_landmarks(results.pose_landmarks, box, width, height)
+                else:
+                    results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            else:
+                results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
             
-        return {
-            'left_arm_angle': left_arm_angle,
-            'right_arm_angle': right_arm_angle,
-            'avg_arm_angle': avg_arm_angle,
-            'body_alignment': body_alignment,
-            'hip_shoulder_angle': hip_shoulder_angle,
-            'phase': phase,
-            'form_score': self._calculate_pushup_score(left_arm_angle, right_arm_angle, body_alignment)
-        }
-        
-    def _analyze_squat(self, landmarks: Dict) -> Dict:
-        """深蹲分析"""
-        # 计算膝盖角度
-        left_knee_angle = self._calculate_angle(
-            landmarks['left_hip'], landmarks['left_knee'], landmarks['left_ankle']
-        )
-        right_knee_angle = self._calculate_angle(
-            landmarks['right_hip'], landmarks['right_knee'], landmarks['right_ankle']
-        )
-        
-        # 计算背部角度
-        back_angle = self._calculate_angle(
-            landmarks['left_shoulder'], landmarks['left_hip'], landmarks['left_knee']
-        )
+        # 超出延迟预算时自动降到更轻的档位（只在可用档位之间降级）
+        available = {name: item for name, item in self.profiles.items() if name not in self._unavailable_profiles}
+        governor.record((time.perf_counter() - started) * 1000, available)
         
-        # 膝盖脚踝对齐
-        knee_alignment = self._calculate_knee_alignment(landmarks)
-        
-        # 判断动作阶段
-        avg_knee_angle = (left_knee_angle + right_knee_angle) / 2
-        standards = self.exercise_standards['squat']
-        
-        if avg_knee_angle < standards['knee_angle_down'][1]:
-            phase = 'down'
-        elif avg_knee_angle > standards['knee_angle_up'][0]:
-            phase = 'up'
-        else:
-            phase = 'transition'
+        if not results.pose_landmarks:
+            if tracker is not None:
+                tracker.reset()
+            return None, results
             
-        return {
-            'left_knee_angle': left_knee_angle,
-            'right_knee_angle': right_knee_angle,
-            'avg_knee_angle': avg_knee_angle,
-            'back_angle': back_angle,
-            'knee_alignment': knee_alignment,
-            'phase': phase,
-            'form_score': self._calculate_squat_score(left_knee_angle, right_knee_angle, back_angle, knee_alignment)
-        }
-        
-    def _analyze_situp(self, landmarks: Dict) -> Dict:
-        """仰卧起坐分析"""
-        # 计算躯干角度
-        torso_angle = self._calculate_angle(
-            landmarks['left_hip'], landmarks['left_shoulder'], landmarks['nose']
-        )
-        
-        # 腿部稳定性
-        leg_stability = self._calculate_leg_stability(landmarks)
-        
-        # 颈部对齐
-        neck_alignment = self._calculate_neck_alignment(landmarks)
-        
-        # 判断动作阶段
-        standards = self.exercise_standards['situp']
-        
-        if torso_angle < standards['torso_angle_down'][1]:
-            phase = 'down'
-        elif torso_angle > standards['torso_angle_up'][0]:
-            phase = 'up'
-        else:
-            phase = 'transition'
+        landmarks = self._extract_landmarks(results.pose_landmarks)
+        if tracker is not None:
+            tracker.update(landmarks, thumbnail if thumbnail is not None else self._motion_thumbnail(frame))
+        return landmarks, results
+        
+    def create_tracker(self, aggressiveness: Optional[float] = None) -> AdaptiveTracker:
+        """创建自适应推理状态，未指定时使用部署配置的激进程度"""
+        if aggressiveness is None:
+            aggressiveness = self.adaptive_aggressiveness
+        return AdaptiveTracker(aggressiveness)
+        
+    def _motion_thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        """生成用于判断画面变化的灰度缩略图"""
+        small = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+        
+    def _map_roi_landmarks(self, pose_landmarks, box: Tuple[int, int, int, int], width: int, height: int):
+        """把裁剪区域内的归一化坐标原地换算回整幅图像的归一化坐标"""
+        x0, y0, x1, y1 = box
+        scale_x = (x1 - x0) / width
+        scale_y = (y1 - y0) / height
+        for landmark in pose_landmarks.landmark:
+            landmark.x = x0 / width + landmark.x * scale_x
+            landmark.y = y0 / height + landmark.y * scale_y
             
-        return {
-            'torso_angle': torso_angle,
-            'leg_stability': leg_stability,
-            'neck_alignment': neck_alignment,
-            'phase': phase,
-            'form_score': self._calculate_situp_score(torso_angle, leg_stability, neck_alignment)
-        }
-        
-    def _analyze_plank(self, landmarks: Dict) -> Dict:
-        """平板支撑分析"""
-        # 身体直线度
-        body_line = self._calculate_plank_alignment(landmarks)
-        
-        # 髋部高度稳定性
-        hip_stability = self._calculate_hip_stability(landmarks)
-        
-        # 肩部稳定性
-        shoulder_stability = self._calculate_shoulder_stability(landmarks)
-        
-        return {
-            'body_line': body_line,
-            'hip_stability': hip_stability,
-            'shoulder_stability': shoulder_stability,
-            'phase': 'hold',
-            'form_score': self._calculate_plank_score(body_line, hip_stability, shoulder_stability)
-        }
-        
-    def _calculate_angle(self, point1: Dict, point2: Dict, point3: Dict) -> float:
-        """计算三点角度"""
-        # 向量计算
-        v1 = np.array([point1['x'] - point2['x'], point1['y'] - point2['y']])
-        v2 = np.array([point3['x'] - point2['x'], point3['y'] - point2['y']])
-        
-        # 计算角度
-        cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-        cos_angle = np.clip(cos_angle, -1.0, 1.0)
-        angle = np.arccos(cos_angle) * 180 / np.pi
-        
-        return angle
-        
-    def _calculate_body_alignment(self, shoulder: Dict, hip: Dict, ankle: Dict) -> float:
-        """计算身体直线度"""
-        # 计算肩膀到脚踝的直线与肩膀到髋部的角度偏差
-        shoulder_ankle = np.array([ankle['x'] - shoulder['x'], ankle['y'] - shoulder['y']])
-        shoulder_hip = np.array([hip['x'] - shoulder['x'], hip['y'] - shoulder['y']])
-        
-        cos_angle = np.dot(shoulder_ankle, shoulder_hip) / (np.linalg.norm(shoulder_ankle) * np.linalg.norm(shoulder_hip))
-        cos_angle = np.clip(cos_angle, -1.0, 1.0)
-        angle = np.arccos(cos_angle) * 180 / np.pi
-        
-        return 180 - angle  # 返回偏离直线的角度
-        
-    def _detect_errors(self, landmarks: Dict, analysis: Dict) -> List[Dict]:
-        """检测动作错误"""
-        errors = []
-        
-        if self.current_exercise == 'pushup':
-            errors.extend(self._detect_pushup_errors(analysis))
-        elif self.current_exercise == 'squat':
-            errors.extend(self._detect_squat_errors(analysis))
-        elif self.current_exercise == 'situp':
-            errors.extend(self._detect_situp_errors(analysis))
-        elif self.current_exercise == 'plank':
-            errors.extend(self._detect_plank_errors(analysis))
+    def release_graphs(self, graphs: Dict[str, object]):
+        """关闭会话独有的检测器"""
+        with self._pose_lock:
+            for pose in graphs.values():
+                pose.close()
+            graphs.clear()
             
-        return errors
-        
-    def _detect_pushup_errors(self, analysis: Dict) -> List[Dict]:
-        """检测俯卧撑错误"""
-        errors = []
-        standards = self.exercise_standards['pushup']
-        
-        # 检查手臂角度
-        if analysis['phase'] == 'down':
-            if analysis['avg_arm_angle'] > standards['arm_angle_down'][1]:
-                errors.append({
-                    'type': 'insufficient_depth',
-                    'message': '下降深度不够，手臂弯曲角度过大',
-                    'severity': 'medium',
-                    'suggestion': '继续下降直到胸部接近地面'
-                })
-                
-        # 检查身体对齐
-        if analysis['body_alignment'] > standards['body_alignment_threshold']:
-            errors.append({
-                'type': 'body_misalignment',
-                'message': '身体不够直，注意保持一条直线',
-                'severity': 'high',
-                'suggestion': '收紧核心，保持头、肩、髋、踝在一条直线上'
-            })
+    def reset_tracking(self):
+        """重置共享检测器的跟踪状态，下一帧重新做全图人体检测"""
+        with self._pose_lock:
+            for pose in self._poses.values():
+                pose.reset()
+            
+    def _resolve_pose(self, governor: ProfileGovernor, graphs: Optional[Dict[str, object]] = None):
+        """获取governor当前档位的检测器；模型无法加载时（如离线降级到lite）标记档位不可用，
+        改用默认档位或已加载的档位继续推理，而不是让会话中途失败"""
+        error = None
+        for name in [governor.profile, self.default_profile, *self._poses]:
+            if name in self._unavailable_profiles:
+                continue
+            try:
+                pose = self._get_pose(self.profiles[name], graphs)
+            except Exception as e:
+                self._unavailable_profiles.add(name)
+                print(f"推理档位{name}的模型加载失败，改用其他档位: {e}")
+                error = e
+                continue
+            governor.profile = name
+            return self.profiles[name], pose
+        raise RuntimeError(f'没有可用的推理档位: {error}')
             
-        # 检查手臂不对称
-        arm_diff = abs(analysis['left_arm_angle'] - analysis['right_arm_angle'])
-        if arm_diff > 15:
-            errors.append({
-                'type': 'asymmetric_arms',
-                'message': '两臂动作不对称',
-                'severity': 'medium',
-                'suggestion': '保持两臂同步，均匀发力'
-            })
+    def _get_pose(self, profile: PoseProfile, graphs: Optional[Dict[str, object]] = None):
+        """获取指定档位的姿态检测器（graphs为None时为共享检测器），首次使用时加载视觉依赖并创建"""
+        cache = self._poses if graphs is None else graphs
+        pose = cache.get(profile.name)
+        if pose is not None:
+            return pose
             
-        return errors
-        
-    def _detect_squat_errors(self, analysis: Dict) -> List[Dict]:
-        """检测深蹲错误"""
-        errors = []
-        standards = self.exercise_standards['squat']
-        
-        # 检查膝盖角度
-        if analysis['phase'] == 'down':
-            if analysis['avg_knee_angle'] > standards['knee_angle_down'][1]:
-                errors.append({
-                    'type': 'insufficient_depth',
-                    'message': '下蹲深度不够',
-                    'severity': 'medium',
-                    'suggestion': '继续下蹲直到大腿与地面平行'
-                })
+        load_vision_stack()
+        with self._pose_lock:
+            pose = cache.get(profile.name)
+            if pose is not None:
+                return pose
                 
-        # 检查背部角度
-        if analysis['back_angle'] < standards['back_angle'][0]:
-            errors.append({
-                'type': 'forward_lean',
-                'message': '身体过度前倾',
-                'severity': 'high',
-                'suggestion': '保持胸部挺起，背部挺直'
-            })
+            self.mp_pose = mp.solutions.pose
+            self.mp_drawing = mp.solutions.drawing_utils
+            self.mp_drawing_styles = mp.solutions.drawing_styles
             
-        # 检查膝盖对齐
-        if analysis['knee_alignment'] > standards['knee_foot_alignment']:
-            errors.append({
-                'type': 'knee_misalignment',
-                'message': '膝盖内扣或外展',
-                'severity': 'high',
-                'suggestion': '保持膝盖与脚尖方向一致'
-            })
+            # 初始化姿态检测器
+            pose = self.mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=profile.model_complexity,
+                enable_segmentation=profile.enable_segmentation,
+                min_detection_confidence=self.detection_confidence,
+                min_tracking_confidence=self.tracking_confidence
+            )
+            cache[profile.name] = pose
+            return pose
             
-        return errors
-        
-    def _draw_analysis(self, frame: np.ndarray, results, analysis: Dict, errors: List[Dict]) -> np.ndarray:
-        """绘制分析结果"""
-        annotated_frame = frame.copy()
+    def _downscale(self, frame: np.ndarray, input_size: Optional[int]) -> np.ndarray:
+        """把图像最长边缩小到input_size，已足够小时原样返回"""
+        height, width = frame.shape[:2]
+        longest = max(height, width)
+        if not input_size or longest <= input_size:
+            return frame
+        scale = input_size / longest
+        return cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        
+    def _extract_landmarks(self, pose_landmarks) -> LandmarkFrame:
+        """提取关键点坐标（33个关键点的紧凑数组，按名称访问兼容旧的字典用法）"""
+        return LandmarkFrame.from_mediapipe(pose_landmarks)
+        
+    def _draw_analysis(self, frame: np.ndarray, results, analysis: Dict, errors: List[Dict],
+                       session: PoseSession) -> np.ndarray:
+        """绘制分析结果：复制到会话复用的缓冲区后原地绘制，不为每帧分配新图像"""
+        annotated_frame = session.annotation_buffer
+        if annotated_frame is None or annotated_frame.shape != frame.shape or annotated_frame.dtype != frame.dtype:
+            annotated_frame = np.empty_like(frame)
+            session.annotation_buffer = annotated_frame
+        np.copyto(annotated_frame, frame)
         
         # 绘制姿态骨架
-        if results.pose_landmarks:
+        if results is not None and results.pose_landmarks:
             self.mp_drawing.draw_landmarks(
                 annotated_frame,
                 results.pose_landmarks,
@@ -420,37 +365,62 @@ class AdvancedPoseAnalyzer:
                 landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
             )
             
+        # 静态文字（标签、运动类型）使用缓存的图层，只绘制变化的数值
+        layer = self._get_text_layer(session.exercise, annotated_frame.shape)
+        annotated_frame[layer.rows, layer.cols] = layer.pixels
+        
         # 绘制分析信息
-        self._draw_exercise_info(annotated_frame, analysis)
+        self._draw_exercise_info(annotated_frame, analysis, layer)
         
         # 绘制错误提示
         self._draw_errors(annotated_frame, errors)
         
         # 绘制状态信息
-        self._draw_status_info(annotated_frame, analysis)
+        self._draw_status_info(annotated_frame, session, layer)
         
         return annotated_frame
         
-    def _draw_exercise_info(self, frame: np.ndarray, analysis: Dict):
-        """绘制运动信息"""
+    def _get_text_layer(self, exercise: Optional[str], shape: Tuple[int, ...]) -> TextLayer:
+        """获取（首次使用时渲染）指定运动和画面尺寸的静态文字图层"""
+        height, width = shape[:2]
+        key = (exercise, width, height)
+        layer = self._text_layers.get(key)
+        if layer is not None:
+            return layer
+            
+        canvas = np.zeros((height, width, 3), dtype=np.uint8)
+        value_positions = []
+        
+        # 角度标签（数值紧跟在标签之后绘制）
+        for index, (label, field) in enumerate(ANGLE_OVERLAYS.get(exercise, [])):
+            y_pos = 30 + index * 30
+            cv2.putText(canvas, label, (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+            (label_width, _), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)
+            value_positions.append((field, (10 + label_width, y_pos)))
+            
+        # 次数标签和运动类型
+        cv2.putText(canvas, 'Reps: ', (width - 150, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        (reps_width, _), _ = cv2.getTextSize('Reps: ', cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+        cv2.putText(canvas, f"Exercise: {exercise or 'None'}", 
+                   (width - 200, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+                   
+        rows, cols = np.nonzero(canvas.any(axis=2))
+        layer = TextLayer(rows, cols, canvas[rows, cols], value_positions, (width - 150 + reps_width, 30))
+        
+        # 画面尺寸和运动类型组合有限，缓存数量设上限防止异常输入导致无限增长
+        if len(self._text_layers) >= MAX_TEXT_LAYERS:
+            self._text_layers.clear()
+        self._text_layers[key] = layer
+        return layer
+        
+    def _draw_exercise_info(self, frame: np.ndarray, analysis: Dict, layer: TextLayer):
+        """绘制运动信息（标签来自静态图层，这里只绘制数值）"""
         height, width = frame.shape[:2]
         
-        # 绘制角度信息
-        if self.current_exercise == 'pushup':
-            cv2.putText(frame, f"Left Arm: {analysis.get('left_arm_angle', 0):.1f}°", 
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(frame, f"Right Arm: {analysis.get('right_arm_angle', 0):.1f}°", 
-                       (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(frame, f"Body Align: {analysis.get('body_alignment', 0):.1f}°", 
-                       (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                       
-        elif self.current_exercise == 'squat':
-            cv2.putText(frame, f"Left Knee: {analysis.get('left_knee_angle', 0):.1f}°", 
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(frame, f"Right Knee: {analysis.get('right_knee_angle', 0):.1f}°", 
-                       (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            cv2.putText(frame, f"Back Angle: {analysis.get('back_angle', 0):.1f}°", 
-                       (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        # 绘制角度数值
+        for field, position in layer.value_positions:
+            cv2.putText(frame, f"{analysis.get(field, 0):.1f}°", 
+                       position, cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                        
         # 绘制动作阶段
         phase_color = (0, 255, 255) if analysis.get('phase') == 'down' else (255, 255, 0)
@@ -478,74 +448,12 @@ class AdvancedPoseAnalyzer:
             cv2.putText(frame, f"⚠ {error['message']}", 
                        (width - 400, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, severity_color, 2)
                        
-    def _draw_status_info(self, frame: np.ndarray, analysis: Dict):
-        """绘制状态信息"""
-        height, width = frame.shape[:2]
-        
-        # 绘制次数
-        cv2.putText(frame, f"Reps: {self.rep_count}", 
-                   (width - 150, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-                   
-        # 绘制运动类型
-        cv2.putText(frame, f"Exercise: {self.current_exercise or 'None'}", 
-                   (width - 200, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    def _draw_status_info(self, frame: np.ndarray, session: PoseSession, layer: TextLayer):
+        """绘制状态信息（运动类型在静态图层中，这里只绘制次数）"""
+        cv2.putText(frame, str(session.rep_count), 
+                   layer.reps_position, cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
                    
-    def _update_exercise_state(self, analysis: Dict):
-        """更新运动状态"""
-        # 简单的状态机逻辑
-        current_phase = analysis.get('phase', 'unknown')
-        
-        if self.exercise_state == 'ready' and current_phase == 'down':
-            self.exercise_state = 'down'
-        elif self.exercise_state == 'down' and current_phase == 'up':
-            self.exercise_state = 'up'
-            self.rep_count += 1
-        elif self.exercise_state == 'up' and current_phase == 'down':
-            self.exercise_state = 'down'
-            
-    # 辅助计算方法
-    def _calculate_pushup_score(self, left_arm: float, right_arm: float, alignment: float) -> float:
-        """计算俯卧撑评分"""
-        arm_score = 100 - abs(left_arm - right_arm) * 2
-        alignment_score = 100 - alignment * 3
-        return max(0, min(100, (arm_score + alignment_score) / 2))
-        
-    def _calculate_squat_score(self, left_knee: float, right_knee: float, back: float, alignment: float) -> float:
-        """计算深蹲评分"""
-        knee_score = 100 - abs(left_knee - right_knee) * 2
-        back_score = 100 - abs(back - 90) * 2
-        alignment_score = 100 - alignment * 3
-        return max(0, min(100, (knee_score + back_score + alignment_score) / 3))
-        
-    def _calculate_situp_score(self, torso: float, stability: float, neck: float) -> float:
-        """计算仰卧起坐评分"""
-        return max(0, min(100, 100 - torso * 0.5 - stability * 2 - neck * 2))
-        
-    def _calculate_plank_score(self, body_line: float, hip_stability: float, shoulder_stability: float) -> float:
-        """计算平板支撑评分"""
-        return max(0, min(100, 100 - body_line * 3 - hip_stability * 5 - shoulder_stability * 3))
-        
-    # 其他辅助方法的占位符
-    def _calculate_knee_alignment(self, landmarks: Dict) -> float:
-        return 0.0
-        
-    def _calculate_leg_stability(self, landmarks: Dict) -> float:
-        return 0.0
-        
-    def _calculate_neck_alignment(self, landmarks: Dict) -> float:
-        return 0.0
-        
-    def _calculate_plank_alignment(self, landmarks: Dict) -> float:
-        return 0.0
-        
-    def _calculate_hip_stability(self, landmarks: Dict) -> float:
-        return 0.0
-        
-    def _calculate_shoulder_stability(self, landmarks: Dict) -> float:
-        return 0.0
-        
-    def _detect_situp_errors(self, analysis: Dict) -> List[Dict]:
-        return []
-        
-    def _detect_plank_errors(self, analysis: Dict) -> List[Dict]:
-        return []
\ No newline at end of file
+    def _update_exercise_state(self, analysis: Dict, features: Dict, session: PoseSession):
+        """更新运动状态：由会话计数器按配置阈值判断阶段并计数"""
+        analysis['rep_completed'] = session.update(features)
+        analysis['phase'] = session.phase
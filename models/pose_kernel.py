@@ -0,0 +1,92 @@
+import numpy as np
+from typing import Dict, List
+
+# 每种运动需要的关节角：(特征名, (a, b, c))，角度取在b点
+EXERCISE_ANGLE_TRIPLETS = {
+    'pushup': [
+        ('left_arm_angle', ('left_shoulder', 'left_elbow', 'left_wrist')),
+        ('right_arm_angle', ('right_shoulder', 'right_elbow', 'right_wrist')),
+        ('hip_shoulder_angle', ('left_hip', 'left_shoulder', 'right_shoulder')),
+        ('body_line_angle', ('left_ankle', 'left_shoulder', 'left_hip')),
+    ],
+    'squat': [
+        ('left_knee_angle', ('left_hip', 'left_knee', 'left_ankle')),
+        ('right_knee_angle', ('right_hip', 'right_knee', 'right_ankle')),
+        ('back_angle', ('left_shoulder', 'left_hip', 'left_knee')),
+    ],
+    'situp': [
+        ('torso_angle', ('left_shoulder', 'left_hip', 'left_knee')),
+        ('head_torso_angle', ('left_hip', 'left_shoulder', 'nose')),
+    ],
+    'plank': [
+        ('body_angle', ('left_shoulder', 'left_hip', 'left_ankle')),
+    ],
+    'jumping_jacks': [
+        ('arm_angle', ('left_hip', 'left_shoulder', 'left_wrist')),
+    ],
+    'lunges': [
+        ('left_knee_angle', ('left_hip', 'left_knee', 'left_ankle')),
+        ('right_knee_angle', ('right_hip', 'right_knee', 'right_ankle')),
+    ],
+    'burpees': [
+        ('torso_angle', ('left_shoulder', 'left_hip', 'left_knee')),
+    ],
+    'pull_ups': [
+        ('left_arm_angle', ('left_shoulder', 'left_elbow', 'left_wrist')),
+    ],
+}
+
+# 水平张开距离：(特征名, (a, b))，取|x_a - x_b|
+EXERCISE_SPREAD_PAIRS = {
+    'jumping_jacks': [
+        ('arm_spread', ('left_shoulder', 'left_wrist')),
+        ('leg_spread', ('left_hip', 'left_ankle')),
+    ],
+}
+
+
+def compute_angles(frames: np.ndarray, triplets: np.ndarray) -> np.ndarray:
+    """向量化计算关节角
+
+    frames: (帧数, 33, C) 关键点数组，C >= 2，只使用x、y
+    triplets: (K, 3) 关键点索引，角度取在中间点
+    返回 (帧数, K) 角度（度）；关键点缺失为NaN，向量长度为0时为90度
+    """
+    frames = np.asarray(frames)
+    if frames.ndim == 2:
+        frames = frames[np.newaxis]
+
+    xy = frames[..., :2].astype(np.float64, copy=False)
+    a = xy[:, triplets[:, 0]]
+    b = xy[:, triplets[:, 1]]
+    c = xy[:, triplets[:, 2]]
+
+    v1 = a - b
+    v2 = c - b
+    dot = np.einsum('fkd,fkd->fk', v1, v2)
+    norm = np.sqrt(np.einsum('fkd,fkd->fk', v1, v1) * np.einsum('fkd,fkd->fk', v2, v2))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_angle = np.clip(dot / norm, -1.0, 1.0)
+    angles = np.degrees(np.arccos(cos_angle))
+    return np.where(norm == 0, 90.0, angles)
+
+
+def compute_spreads(frames: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """向量化计算关键点水平距离，返回 (帧数, K)"""
+    frames = np.asarray(frames)
+    if frames.ndim == 2:
+        frames = frames[np.newaxis]
+
+    x = frames[..., 0].astype(np.float64, copy=False)
+    return np.abs(x[:, pairs[:, 0]] - x[:, pairs[:, 1]])
+
+
+def split_feature_rows(features: Dict[str, np.ndarray], frame_count: int) -> List[Dict[str, float]]:
+    """把批量特征拆成逐帧的字典"""
+    names = list(features.keys())
+    if not names:
+        return [{} for _ in range(frame_count)]
+
+    columns = np.column_stack([features[name] for name in names]).tolist()
+    return [dict(zip(names, row)) for row in columns]
@@ -0,0 +1,83 @@
+from typing import Dict, List, NamedTuple, Optional
+
+# 默认档位：lite/full/heavy对应MediaPipe的model_complexity 0/1/2
+# input_size为推理前缩放后的最长边（像素），None表示不缩放
+DEFAULT_POSE_PROFILES = {
+    'lite': {'model_complexity': 0, 'enable_segmentation': False, 'input_size': 256},
+    'full': {'model_complexity': 1, 'enable_segmentation': False, 'input_size': 480},
+    'heavy': {'model_complexity': 2, 'enable_segmentation': True, 'input_size': None},
+}
+
+# 延迟指数滑动平均系数
+LATENCY_SMOOTHING = 0.2
+
+
+class PoseProfile(NamedTuple):
+    name: str
+    model_complexity: int
+    enable_segmentation: bool
+    input_size: Optional[int]
+
+
+def compile_pose_profiles(profiles: Optional[Dict] = None) -> Dict[str, PoseProfile]:
+    """把档位配置编译为 {档位名: PoseProfile}，按模型复杂度从轻到重排列"""
+    profiles = profiles or DEFAULT_POSE_PROFILES
+    compiled = [
+        PoseProfile(
+            name=name,
+            model_complexity=int(options.get('model_complexity', 1)),
+            enable_segmentation=bool(options.get('enable_segmentation', False)),
+            input_size=options.get('input_size')
+        )
+        for name, options in profiles.items()
+    ]
+    compiled.sort(key=lambda profile: (profile.model_complexity, profile.enable_segmentation))
+    return {profile.name: profile for profile in compiled}
+
+
+def lighter_profile(profiles: Dict[str, PoseProfile], name: str) -> Optional[str]:
+    """返回比指定档位低一级的档位名，已是最轻档位时返回None"""
+    names: List[str] = list(profiles.keys())
+    if name not in names:
+        return None
+    index = names.index(name)
+    return names[index - 1] if index > 0 else None
+
+
+class ProfileGovernor:
+    """按单帧推理延迟自动降级档位
+
+    延迟的滑动平均连续slow_frame_limit帧超过预算时降到更轻的档位，
+    降级后重新开始统计，不会自动升级（避免在两个档位之间来回切换）。
+    """
+
+    __slots__ = ('profile', 'budget_ms', 'slow_frame_limit', 'latency_ms', 'slow_frames')
+
+    def __init__(self, profile: str, budget_ms: Optional[float] = None, slow_frame_limit: int = 10):
+        self.profile = profile
+        self.budget_ms = budget_ms
+        self.slow_frame_limit = slow_frame_limit
+        self.latency_ms = None
+        self.slow_frames = 0
+
+    def record(self, elapsed_ms: float, profiles: Dict[str, PoseProfile]) -> Optional[str]:
+        """记录一帧推理耗时，需要降级时返回新的档位名"""
+        if self.latency_ms is None:
+            self.latency_ms = elapsed_ms
+        else:
+            self.latency_ms += LATENCY_SMOOTHING * (elapsed_ms - self.latency_ms)
+
+        if not self.budget_ms or self.latency_ms <= self.budget_ms:
+            self.slow_frames = 0
+            return None
+
+        self.slow_frames += 1
+        if self.slow_frames < self.slow_frame_limit:
+            return None
+
+        fallback = lighter_profile(profiles, self.profile)
+        self.slow_frames = 0
+        self.latency_ms = None
+        if fallback:
+            self.profile = fallback
+        return fallback
@@ -0,0 +1,164 @@
+import math
+import time
+from collections import deque
+from typing import Dict, NamedTuple, Optional
+
+# 每种运动的计数信号：(特征名, 低阈值键, 高阈值键, 计数方式, 默认低阈值, 默认高阈值)
+#   valley：先低于低阈值再回到高阈值以上计一次（俯卧撑、深蹲等关节角先变小再恢复）
+#   peak：  先高于高阈值再回到低阈值以下计一次（开合跳手臂先抬起再放下）
+#   hold：  处于[低阈值, 高阈值]区间内累计保持时间（平板支撑）
+# 阈值键对应 config.py 的 EXERCISE_THRESHOLDS，缺省时使用默认值
+REP_SIGNALS = {
+    'pushup': ('left_arm_angle', 'down', 'up', 'valley', 70, 140),
+    'squat': ('left_knee_angle', 'down', 'up', 'valley', 80, 160),
+    'situp': ('torso_angle', 'down', 'up', 'valley', 60, 120),
+    'plank': ('body_angle', 'min_angle', 'max_angle', 'hold', 160, 180),
+    'jumping_jacks': ('arm_angle', 'arm_down_threshold', 'arm_threshold', 'peak', 40, 120),
+    'lunges': ('left_knee_angle', 'down', 'up', 'valley', 90, 170),
+    'burpees': ('torso_angle', 'squat_threshold', 'jump_threshold', 'valley', 90, 150),
+    'pull_ups': ('left_arm_angle', 'down', 'up', 'valley', 100, 150),
+}
+
+# 灵敏度越低，需要的最少停留帧数越多
+SENSITIVITY_DWELL_OFFSET = {'high': 0, 'medium': 1, 'low': 2}
+
+# 平板支撑两帧间隔超过该值（秒）时不计入保持时间（掉帧或暂停）
+MAX_HOLD_GAP = 1.0
+
+
+class RepSpec(NamedTuple):
+    feature: str
+    mode: str
+    low: float
+    high: float
+    smoothing_window: int
+    min_dwell_frames: int
+
+
+def compile_rep_specs(thresholds: Optional[Dict] = None, smoothing_window: int = 3,
+                      min_dwell_frames: int = 2, signals: Optional[Dict] = None) -> Dict[str, RepSpec]:
+    """把阈值配置编译为 {运动类型: RepSpec}，启动时执行一次（signals默认为REP_SIGNALS）"""
+    thresholds = thresholds or {}
+    signals = signals if signals is not None else REP_SIGNALS
+    specs = {}
+    for exercise, (feature, low_key, high_key, mode, low, high) in signals.items():
+        config = thresholds.get(exercise, {})
+        dwell_offset = SENSITIVITY_DWELL_OFFSET.get(config.get('sensitivity', 'high'), 0)
+        specs[exercise] = RepSpec(
+            feature=feature,
+            mode=mode,
+            low=float(config.get(low_key, low)),
+            high=float(config.get(high_key, high)),
+            smoothing_window=max(1, smoothing_window),
+            min_dwell_frames=max(1, min_dwell_frames + dwell_offset)
+        )
+    return specs
+
+
+class RepCounter:
+    """增量计数器：每帧O(1)更新，滑动平均平滑 + 双阈值迟滞 + 最少停留帧数去抖
+
+    状态只在平滑后的数值越过阈值并连续保持min_dwell_frames帧后切换，
+    两个阈值之间的区间不改变状态，避免在阈值附近抖动时重复计数。
+    """
+
+    __slots__ = (
+        'spec', '_window', '_window_sum', 'state', '_pending_state', '_pending_frames',
+        'rep_count', 'hold_time', '_last_timestamp', 'value'
+    )
+
+    def __init__(self, spec: Optional[RepSpec] = None):
+        self.spec = spec
+        self._window = deque(maxlen=spec.smoothing_window if spec else 1)
+        self._window_sum = 0.0
+        self.state = 'ready'
+        self._pending_state = None
+        self._pending_frames = 0
+        self.rep_count = 0
+        self.hold_time = 0.0
+        self._last_timestamp = None
+        self.value = None
+
+    @property
+    def phase(self) -> str:
+        """当前动作阶段：down / up / transition / hold / unknown"""
+        if self.spec is None or self.value is None:
+            return 'unknown'
+        if self.spec.mode == 'hold':
+            return 'hold' if self.state == 'hold' else 'unknown'
+        if self.value <= self.spec.low:
+            return 'down'
+        if self.value >= self.spec.high:
+            return 'up'
+        return 'transition'
+
+    def update(self, features: Dict[str, float], timestamp: Optional[float] = None) -> bool:
+        """输入一帧特征（timestamp单位为秒），完成一次动作时返回True"""
+        if self.spec is None:
+            return False
+
+        raw_value = features.get(self.spec.feature)
+        if raw_value is None or math.isnan(raw_value):
+            return False
+
+        # 滑动平均（维护窗口和，O(1)）
+        if len(self._window) == self._window.maxlen:
+            self._window_sum -= self._window[0]
+        self._window.append(raw_value)
+        self._window_sum += raw_value
+        self.value = self._window_sum / len(self._window)
+
+        if self.spec.mode == 'hold':
+            return self._update_hold(timestamp)
+
+        target = self._target_state()
+        if target is None or target == self.state:
+            self._pending_state = None
+            self._pending_frames = 0
+            return False
+
+        # 去抖：越过阈值后需连续保持若干帧才切换状态
+        if target != self._pending_state:
+            self._pending_state = target
+            self._pending_frames = 0
+        self._pending_frames += 1
+        if self._pending_frames < self.spec.min_dwell_frames:
+            return False
+
+        previous_state = self.state
+        self.state = target
+        self._pending_state = None
+        self._pending_frames = 0
+
+        # valley：低→高完成一次；peak：高→低完成一次
+        completed_from = 'down' if self.spec.mode == 'valley' else 'up'
+        if previous_state == completed_from:
+            self.rep_count += 1
+            return True
+        return False
+
+    def _target_state(self) -> Optional[str]:
+        if self.value <= self.spec.low:
+            return 'down'
+        if self.value >= self.spec.high:
+            return 'up'
+        return None
+
+    def _update_hold(self, timestamp: Optional[float]) -> bool:
+        now = timestamp if timestamp is not None else time.monotonic()
+        in_range = self.spec.low <= self.value <= self.spec.high
+
+        if in_range:
+            self._pending_frames += 1
+            if self._pending_frames >= self.spec.min_dwell_frames:
+                if self.state == 'hold' and self._last_timestamp is not None:
+                    gap = now - self._last_timestamp
+                    if 0 < gap <= MAX_HOLD_GAP:
+                        self.hold_time += gap
+                self.state = 'hold'
+        else:
+            self._pending_frames = 0
+            self.state = 'ready'
+
+        self._last_timestamp = now
+        return False
@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from .landmark_filter import FilterSpec, LandmarkFilter, compile_filter_specs
+from .landmark_frame import LandmarkFrame
+from .landmark_history import LandmarkRingBuffer, RollingLandmarkStats
+from .rep_counter import RepCounter, RepSpec, compile_rep_specs
+
+# 每个会话保留的最近错误条数
+ERROR_HISTORY_SIZE = 50
+
+
+class PoseSession:
+    """单个训练会话的姿态分析状态（计数器、历史记录）"""
+
+    __slots__ = (
+        'session_id', 'exercise', 'rep_specs', 'filter_specs', 'counter', 'landmark_filter',
+        'governor', 'tracker', 'annotation_buffer', 'landmark_stats', 'error_history', 'frame_buffer', 'last_analysis', 'last_active', 'lock'
+    )
+
+    def __init__(self, session_id: str, exercise: Optional[str] = None,
+                 rep_specs: Optional[Dict[str, RepSpec]] = None, history_size: int = 90,
+                 filter_specs: Optional[Dict[Optional[str], FilterSpec]] = None):
+        self.session_id = session_id
+        self.rep_specs = rep_specs if rep_specs is not None else compile_rep_specs()
+        self.filter_specs = filter_specs if filter_specs is not None else compile_filter_specs()
+        # 最近的关键点帧（预分配环形缓冲区）和错误记录，容量固定，长时间会话内存不增长
+        self.frame_buffer = LandmarkRingBuffer(history_size)
+        # 与frame_buffer同一窗口的关键点位置统计，用于稳定性指标
+        self.landmark_stats = RollingLandmarkStats()
+        self.error_history: Deque[Dict] = deque(maxlen=ERROR_HISTORY_SIZE)
+        # 服务端图像推理的档位选择、延迟统计和自适应跳帧状态（首次分析图像帧时创建）
+        self.governor = None
+        self.tracker = None
+        self.annotation_buffer = None
+        # 可重入：批量分析持有锁期间逐帧调用的单帧分析会再次获取
+        self.lock = threading.RLock()
+        self.reset(exercise)
+
+    def reset(self, exercise: Optional[str]):
+        """切换运动类型并清空计数状态"""
+        self.exercise = exercise
+        self.counter = RepCounter(self.rep_specs.get(exercise))
+        self.landmark_filter = LandmarkFilter(self.filter_specs.get(exercise, self.filter_specs[None]))
+        self.frame_buffer.clear()
+        self.landmark_stats.clear()
+        self.error_history.clear()
+        self.last_analysis = None
+        self.last_active = time.monotonic()
+
+    @property
+    def rep_count(self) -> int:
+        return self.counter.rep_count
+
+    @property
+    def exercise_state(self) -> str:
+        return self.counter.state
+
+    @property
+    def phase(self) -> str:
+        return self.counter.phase
+
+    def touch(self):
+        """刷新最近活跃时间"""
+        self.last_active = time.monotonic()
+
+    def update(self, features: Dict[str, float], timestamp: Optional[float] = None) -> bool:
+        """输入一帧特征推进计数器，完成一次动作时返回True"""
+        return self.counter.update(features, timestamp)
+
+    def smooth(self, landmarks: LandmarkFrame, timestamp: Optional[float] = None) -> LandmarkFrame:
+        """对一帧关键点做时域滤波（时间戳单位为秒），返回新的LandmarkFrame"""
+        return LandmarkFrame(self.landmark_filter.apply(landmarks.data, timestamp), landmarks.timestamp)
+
+    def record_frame(self, landmarks, timestamp: Optional[float] = None):
+        """记录一帧关键点 (33, 4)，离开窗口的旧帧同时从统计中移除"""
+        self.landmark_stats.update(landmarks, self.frame_buffer.oldest())
+        self.frame_buffer.push(landmarks, time.monotonic() if timestamp is None else timestamp)
+
+    def record_errors(self, errors):
+        """记录本帧检测到的错误（只保留最近ERROR_HISTORY_SIZE条）"""
+        if errors:
+            self.error_history.extend(errors)
+
+
+class PoseSessionRegistry:
+    """按会话ID管理姿态分析状态，空闲会话自动淘汰"""
+
+    def __init__(self, idle_timeout: float = 600, sweep_interval: float = 60,
+                 rep_specs: Optional[Dict[str, RepSpec]] = None, history_size: int = 90,
+                 filter_specs: Optional[Dict[Optional[str], FilterSpec]] = None):
+        self.idle_timeout = idle_timeout
+        self.history_size = history_size
+        self.rep_specs = rep_specs if rep_specs is not None else compile_rep_specs()
+        self.filter_specs = filter_specs if filter_specs is not None else compile_filter_specs()
+        self.sweep_interval = sweep_interval
+        self._sessions: Dict[str, PoseSession] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def get_or_create(self, session_id: str, exercise: Optional[str] = None) -> PoseSession:
+        """获取会话状态，不存在时创建；运动类型变化时重置计数"""
+        now = time.monotonic()
+
+        with self._lock:
+            if now - self._last_sweep >= self.sweep_interval:
+                self._evict_locked(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = PoseSession(session_id, exercise, self.rep_specs, self.history_size, self.filter_specs)
+                self._sessions[session_id] = session
+
+        if exercise and session.exercise != exercise:
+            # 在会话锁内重置，不与正在进行的分析交错（不持有注册表锁等待，避免阻塞其他会话）
+            with session.lock:
+                if session.exercise != exercise:
+                    session.reset(exercise)
+
+        session.touch()
+        return session
+
+    def get(self, session_id: str) -> Optional[PoseSession]:
+        """获取已有会话状态"""
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id: str) -> Optional[PoseSession]:
+        """移除会话状态"""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def evict_idle(self) -> int:
+        """淘汰空闲超时的会话，返回淘汰数量"""
+        with self._lock:
+            return self._evict_locked(time.monotonic())
+
+    def _evict_locked(self, now: float) -> int:
+        expired = [
+            session_id for session_id, session in self._sessions.items()
+            if now - session.last_active > self.idle_timeout
+        ]
+        for session_id in expired:
+            del self._sessions[session_id]
+
+        self._last_sweep = now
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,79 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+# 允许的synchronous级别（WAL模式下NORMAL只在检查点时fsync，崩溃时不会损坏数据库）
+SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+# 每个连接缓存的预编译语句数
+STATEMENT_CACHE_SIZE = 64
+
+
+class SQLiteConnectionPool:
+    """有上限的SQLite连接池
+
+    连接按需创建（最多size个），创建时设置WAL日志模式、synchronous级别和忙等待超时，之后复用：
+    sqlite3按SQL文本缓存预编译语句，同一连接重复执行相同语句不再重新解析。
+    连接借出期间只被一个线程使用，因此可以跨线程归还（check_same_thread=False）。
+    """
+
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 5.0, synchronous: str = 'NORMAL'):
+        synchronous = synchronous.upper()
+        if synchronous not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f'未知的synchronous级别: {synchronous}')
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.timeout, check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                conn = self._open()
+                self._created += 1
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError('等待数据库连接超时')
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """借出一个连接：代码块正常结束时提交事务，抛出异常时回滚，最后归还连接"""
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._created -= 1
@@ -0,0 +1,306 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .analysis_api import analyze_landmark_batch
+from .exercise_engine import ExerciseEngine
+from .landmark_frame import LANDMARK_FIELDS, NUM_LANDMARKS
+from .session_registry import PoseSession
+
+# 解码线程最多领先推理的批数（超出后阻塞，限制内存占用）
+DECODE_QUEUE_BATCHES = 4
+
+# 工作进程内的姿态分析器（由_init_video_worker创建）
+_worker_analyzer = None
+
+
+class VideoPipelineError(Exception):
+    """视频无法打开或解码失败"""
+
+
+def _init_video_worker(exercise_config: Optional[Dict], pose_profiles: Optional[Dict]):
+    """工作进程初始化：加载视觉依赖并创建分析器（每个进程只做一次）"""
+    global _worker_analyzer
+    from .pose_analyzer import AdvancedPoseAnalyzer, load_vision_stack
+
+    load_vision_stack()
+    _worker_analyzer = AdvancedPoseAnalyzer(exercise_config=exercise_config, pose_profiles=pose_profiles)
+
+
+def _detect_chunk(frames: np.ndarray, profile: Optional[str]) -> np.ndarray:
+    """对一段连续视频帧 (n, 高, 宽, 3) 逐帧检测关键点，返回 (n, 33, 4)，未检测到人体的帧为NaN
+
+    离线处理不受实时延迟预算限制，整段固定使用同一档位；段内启用自适应跳帧和ROI裁剪。
+    同一进程先后处理的段不一定相邻，开始前重置检测器的跟踪状态，不沿用上一段的人体位置。
+    """
+    analyzer = _worker_analyzer
+    analyzer.reset_tracking()
+    governor = analyzer.create_governor(profile)
+    governor.budget_ms = None
+    tracker = analyzer.create_tracker()
+
+    landmarks = np.full((len(frames), NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.nan, dtype=np.float32)
+    for index, frame in enumerate(frames):
+        detected, _ = analyzer.detect_landmarks(frame, governor, tracker)
+        if detected is not None:
+            landmarks[index] = detected.data
+    return landmarks
+
+
+def _decode_video(path: str, batch_size: int, stride: int, max_side: Optional[int],
+                  batches: queue.Queue, stop: threading.Event):
+    """解码线程：按stride抽帧、缩放后按batch_size打包放入队列，结束时放入None"""
+    from .pose_analyzer import load_vision_stack
+
+    cv2, _ = load_vision_stack()
+    capture = cv2.VideoCapture(path)
+    try:
+        if not capture.isOpened():
+            batches.put(VideoPipelineError(f'无法打开视频: {path}'))
+            return
+
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frames: List[np.ndarray] = []
+        timestamps: List[float] = []
+        index = 0
+        while not stop.is_set():
+            # 跳过的帧只grab不解码
+            if index % stride:
+                if not capture.grab():
+                    break
+                index += 1
+                continue
+
+            ok, frame = capture.read()
+            if not ok:
+                break
+
+            if max_side:
+                height, width = frame.shape[:2]
+                longest = max(height, width)
+                if longest > max_side:
+                    scale = max_side / longest
+                    frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+            frames.append(frame)
+            timestamps.append(index * 1000.0 / fps)
+            index += 1
+
+            if len(frames) == batch_size:
+                batches.put((timestamps, np.stack(frames)))
+                frames, timestamps = [], []
+
+        if frames and not stop.is_set():
+            batches.put((timestamps, np.stack(frames)))
+    except Exception as e:
+        batches.put(VideoPipelineError(f'视频解码失败: {e}'))
+    finally:
+        capture.release()
+        batches.put(None)
+
+
+class VideoAnalysisPipeline:
+    """离线视频批量分析：解码线程 -> 推理进程池 -> 评估引擎 -> 数据记录器
+
+    - 解码在后台线程中进行，通过有界队列与推理重叠
+    - 帧按batch_size打包提交到进程池，多个批次并行推理，结果按视频顺序取回
+    - 关键点整批滤波、整批向量化计算关节角，计数和评分与实时接口完全一致
+    analyze()是生成器，逐帧产出分析结果，调用方可以边处理边输出。
+    """
+
+    def __init__(self, engine: ExerciseEngine, exercise_config: Optional[Dict] = None,
+                 pose_profiles: Optional[Dict] = None, filter_specs: Optional[Dict] = None,
+                 workers: int = 0, batch_size: int = 32, stride: int = 1, max_side: Optional[int] = 640):
+        exercise_config = exercise_config or {}
+        self.engine = engine
+        self.exercise_config = exercise_config
+        self.pose_profiles = pose_profiles
+        self.filter_specs = filter_specs
+        self.history_size = exercise_config.get('history_frames', 90)
+        self.workers = workers if workers > 0 else max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = max(1, batch_size)
+        self.stride = max(1, stride)
+        self.max_side = max_side
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> ProcessPoolExecutor:
+        """启动推理进程池（重复调用无副作用），返回进程池"""
+        with self._start_lock:
+            if self._executor is None:
+                # 使用spawn，避免fork继承Flask进程中的线程和锁。
+                # spawn子进程会重新导入启动脚本，启动脚本必须有 if __name__ == '__main__' 保护
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_video_worker,
+                    initargs=(self.exercise_config, self.pose_profiles)
+                )
+            return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        """丢弃已损坏的进程池（工作进程启动失败或异常退出），下次调用start()时重新创建"""
+        with self._start_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._start_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def landmark_batches(self, path: str, profile: Optional[str] = None) -> Iterator[Tuple[List[float], np.ndarray]]:
+        """按视频顺序产出 (时间戳毫秒列表, 关键点数组 (n, 33, 4))"""
+        executor = self.start()
+        batches: queue.Queue = queue.Queue(maxsize=DECODE_QUEUE_BATCHES)
+        stop = threading.Event()
+        decoder = threading.Thread(
+            target=_decode_video, args=(path, self.batch_size, self.stride, self.max_side, batches, stop),
+            name='video-decoder', daemon=True
+        )
+        decoder.start()
+
+        # 在途批次数有上限（背压），结果按提交顺序取回
+        pending = deque()
+        try:
+            while True:
+                item = batches.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                timestamps, frames = item
+                pending.append((timestamps, executor.submit(_detect_chunk, frames, profile)))
+                if len(pending) >= 2 * self.workers:
+                    timestamps, future = pending.popleft()
+                    yield timestamps, future.result()
+
+            while pending:
+                timestamps, future = pending.popleft()
+                yield timestamps, future.result()
+        except (BrokenProcessPool, OSError) as e:
+            # 进程池无法再使用，丢弃后下一次分析重新创建
+            self._discard(executor)
+            raise VideoPipelineError(f'视频推理进程异常退出: {e}') from e
+        finally:
+            stop.set()
+            for _, future in pending:
+                future.cancel()
+            # 解码线程可能阻塞在已满的队列上，清空后再等待其退出
+            while decoder.is_alive():
+                try:
+                    batches.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            decoder.join()
+
+    def analyze(self, path: str, exercise_type, profile: Optional[str] = None,
+                recorder=None, recording_id: Optional[str] = None) -> Iterator[Dict]:
+        """逐帧产出分析结果（含timestamp，毫秒）；未检测到人体的帧只产出 {'timestamp', 'error'}
+
+        传入recorder和recording_id（recorder.start_session()返回的会话ID）时，
+        每完成一次动作同时写入运动数据记录器。
+        """
+        exercise = self.engine.resolve(exercise_type)
+        if exercise is None:
+            raise ValueError(f'不支持的运动类型: {exercise_type}')
+
+        pose_session = PoseSession(
+            f'video:{path}', exercise.key, self.engine.rep_specs,
+            history_size=self.history_size, filter_specs=self.filter_specs
+        )
+
+        for timestamps, landmarks in self.landmark_batches(path, profile):
+            detected = ~np.isnan(landmarks[:, :, 0]).all(axis=1)
+            results = iter(analyze_landmark_batch(
+                landmarks[detected], exercise, pose_session,
+                [timestamp for timestamp, found in zip(timestamps, detected) if found]
+            )) if detected.any() else iter([])
+
+            for timestamp, found in zip(timestamps, detected):
+                if not found:
+                    yield {'timestamp': timestamp, 'error': '未检测到人体姿态'}
+                    continue
+
+                analysis_result = next(results)
+                if recorder is not None and analysis_result['rep_completed']:
+                    recorder.record_rep(recording_id, {
+                        'form_score': analysis_result['form_score'],
+                        'errors': analysis_result['errors']
+                    })
+                yield analysis_result
+
+    def summarize(self, path: str, exercise_type, profile: Optional[str] = None,
+                  recorder=None, user_id: Optional[int] = None, keep_frames: bool = False) -> Dict:
+        """分析整段视频并返回汇总（次数、平均评分、错误统计、处理速度）
+
+        传入recorder和user_id时，整段视频作为该用户的一次运动会话写入记录器。
+        """
+        exercise = self.engine.resolve(exercise_type)
+        if exercise is None:
+            raise ValueError(f'不支持的运动类型: {exercise_type}')
+
+        recording_id = None
+        if recorder is not None:
+            recording_id = recorder.start_session(user_id, exercise.key, exercise.id)
+
+        started = time.perf_counter()
+        frames = 0
+        detected = 0
+        score_total = 0.0
+        rep_count = 0
+        hold_time = None
+        last_timestamp = 0.0
+        error_counts: Dict[str, int] = {}
+        details = [] if keep_frames else None
+
+        try:
+            for analysis_result in self.analyze(path, exercise.id, profile, recorder, recording_id):
+                frames += 1
+                last_timestamp = analysis_result['timestamp']
+                if details is not None:
+                    details.append(analysis_result)
+                if 'error' in analysis_result:
+                    continue
+
+                detected += 1
+                score_total += analysis_result['form_score']
+                rep_count = analysis_result['rep_count']
+                hold_time = analysis_result.get('hold_time', hold_time)
+                for error in analysis_result['errors']:
+                    error_counts[error['type']] = error_counts.get(error['type'], 0) + 1
+        finally:
+            # 分析失败时也保存已记录的部分
+            session_data = recorder.end_session(recording_id) if recording_id is not None else None
+
+        elapsed = time.perf_counter() - started
+        summary = {
+            'exercise_type': exercise.key,
+            'frames_analyzed': frames,
+            'frames_detected': detected,
+            'video_seconds': round(last_timestamp / 1000.0, 2),
+            'rep_count': rep_count,
+            'avg_form_score': round(score_total / detected, 1) if detected else 0,
+            'error_counts': error_counts,
+            'processing_seconds': round(elapsed, 2),
+            'processing_fps': round(frames / elapsed, 1) if elapsed > 0 else 0
+        }
+        if hold_time is not None:
+            summary['hold_time'] = hold_time
+        if session_data is not None:
+            summary['session_data'] = session_data
+        if details is not None:
+            summary['frames'] = details
+        return summary
@@ -0,0 +1,63 @@
+import struct
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from .landmark_frame import NUM_LANDMARKS, LANDMARK_FIELDS
+
+# 二进制关键点上传格式（小端）：
+#   头部 8 字节：magic(2s) 'LM' | version(B) | exercise_id(B) | landmark_count(H) | frame_count(H)
+#   每帧：timestamp(float64, 毫秒) + landmark_count × [x, y, z, visibility](float32)
+# 缺失的关键点用NaN表示
+PACKET_MAGIC = b'LM'
+PACKET_VERSION = 1
+PACKET_HEADER = struct.Struct('<2sBBHH')
+PACKET_CONTENT_TYPE = 'application/octet-stream'
+
+FRAME_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('landmarks', '<f4', (NUM_LANDMARKS, len(LANDMARK_FIELDS)))
+])
+
+
+class LandmarkPacketError(ValueError):
+    """二进制关键点数据格式错误"""
+
+
+class LandmarkPacket(NamedTuple):
+    exercise_id: int
+    timestamps: List[float]
+    frames: np.ndarray  # (帧数, 33, 4) float32
+
+
+def decode_landmark_packet(buffer: bytes) -> LandmarkPacket:
+    """解析二进制关键点数据，关键点数组直接引用请求缓冲区，不做逐点拷贝"""
+    if len(buffer) < PACKET_HEADER.size:
+        raise LandmarkPacketError('数据长度不足')
+
+    magic, version, exercise_id, landmark_count, frame_count = PACKET_HEADER.unpack_from(buffer)
+    if magic != PACKET_MAGIC:
+        raise LandmarkPacketError('数据格式标识错误')
+    if version != PACKET_VERSION:
+        raise LandmarkPacketError(f'不支持的数据格式版本: {version}')
+    if landmark_count != NUM_LANDMARKS:
+        raise LandmarkPacketError(f'关键点数量应为{NUM_LANDMARKS}，实际为{landmark_count}')
+
+    expected_size = PACKET_HEADER.size + frame_count * FRAME_DTYPE.itemsize
+    if len(buffer) != expected_size:
+        raise LandmarkPacketError(f'数据长度应为{expected_size}字节，实际为{len(buffer)}字节')
+
+    records = np.frombuffer(buffer, dtype=FRAME_DTYPE, count=frame_count, offset=PACKET_HEADER.size)
+    return LandmarkPacket(exercise_id, records['timestamp'].tolist(), records['landmarks'])
+
+
+def encode_landmark_packet(exercise_id: int, frames: np.ndarray,
+                           timestamps: Optional[List[float]] = None) -> bytes:
+    """把 (帧数, 33, 4) 关键点数组编码为二进制数据"""
+    frames = np.asarray(frames, dtype=np.float32).reshape(-1, NUM_LANDMARKS, len(LANDMARK_FIELDS))
+    records = np.empty(len(frames), dtype=FRAME_DTYPE)
+    records['timestamp'] = timestamps if timestamps is not None else 0.0
+    records['landmarks'] = frames
+
+    header = PACKET_HEADER.pack(PACKET_MAGIC, PACKET_VERSION, exercise_id, NUM_LANDMARKS, len(frames))
+    return header + records.tobytes()
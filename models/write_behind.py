@@ -0,0 +1,217 @@
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows没有fcntl，溢出文件只在进程内加锁
+    fcntl = None
+
+# 写入线程等待新记录的轮询间隔（秒），用于及时响应关闭
+POLL_INTERVAL = 0.5
+
+
+class WriteBehindQueue:
+    """异步写入队列：请求线程只把记录放入内存队列，后台线程批量写入
+
+    - 写入线程每次最多取batch_size条记录，交给write_batch在一个事务中写入
+    - 写入失败按指数退避重试max_retries次，仍失败的批次追加到溢出文件
+    - 队列有容量上限，已满时记录直接追加到溢出文件，不阻塞调用方等待数据库
+    - 溢出文件为JSON Lines，每次追加后fsync；start()时先整体重放再开始接收新记录
+    - 同一溢出文件可能被多个进程使用（如Web服务和analyze_video.py），追加和重放时
+      对旁边的.lock文件加flock排他锁，重放不会删除其他进程刚追加的记录
+    记录必须可以JSON序列化（元组重放后变为列表）。进程被强制终止时，
+    仍在内存队列中的记录会丢失；正常退出时close()会写完或溢出全部记录。
+    """
+
+    def __init__(self, write_batch: Callable[[List], None], spill_path: str, capacity: int = 1024,
+                 batch_size: int = 64, max_retries: int = 3, retry_delay: float = 0.5, name: str = 'write-behind'):
+        self.write_batch = write_batch
+        self.spill_path = spill_path
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max(0, max_retries)
+        self.retry_delay = retry_delay
+        self.name = name
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, capacity))
+        self._spill_lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._in_flight = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 统计
+        self.written = 0
+        self.spilled = 0
+        self.failed_batches = 0
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def pending(self) -> int:
+        """尚未写入的记录数（队列中和正在写入的）"""
+        return self._in_flight
+
+    def start(self):
+        """重放溢出文件中的记录并启动写入线程（重复调用无副作用）"""
+        if self._thread is not None:
+            return
+        self.replay()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def put(self, record) -> bool:
+        """放入一条记录；写入线程未运行或队列已满时追加到溢出文件，返回是否进入队列"""
+        if self._thread is None or self._stopping.is_set():
+            self._spill([record])
+            return False
+
+        with self._idle:
+            self._in_flight += 1
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self._done(1)
+            print(f"写入队列已满，记录暂存到溢出文件: {self.spill_path}")
+            self._spill([record])
+            return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待已放入的记录全部处理完（写入或溢出），超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """停止接收新记录，写完队列中的记录；超时未写完的记录追加到溢出文件"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            leftover = []
+            while True:
+                try:
+                    leftover.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if leftover:
+                self._spill(leftover)
+                self._done(len(leftover))
+        self._thread = None
+
+    def replay(self) -> int:
+        """把溢出文件中的记录在一个批次中写入，成功后删除文件，返回条数"""
+        with self._locked_spill():
+            if not os.path.exists(self.spill_path):
+                return 0
+
+            records = []
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # 崩溃时可能留下写了一半的最后一行
+                        continue
+
+            if records:
+                try:
+                    self.write_batch(records)
+                except Exception as e:
+                    print(f"重放溢出文件失败（下次启动时重试）: {e}")
+                    return 0
+
+            os.remove(self.spill_path)
+            self.written += len(records)
+            if records:
+                print(f"已从溢出文件恢复 {len(records)} 条记录")
+            return len(records)
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=POLL_INTERVAL)]
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._write(batch)
+            self._done(len(batch))
+
+    def _write(self, batch: List):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.write_batch(batch)
+                self.written += len(batch)
+                return
+            except Exception as e:
+                error = e
+                if attempt < self.max_retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+
+        self.failed_batches += 1
+        print(f"批量写入失败 {self.max_retries + 1} 次，{len(batch)} 条记录暂存到溢出文件: {error}")
+        self._spill(batch)
+
+    def _spill(self, records: List):
+        """追加到溢出文件并fsync（新建文件时同时fsync所在目录）"""
+        try:
+            with self._locked_spill():
+                created = not os.path.exists(self.spill_path)
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                if created and hasattr(os, 'O_DIRECTORY'):
+                    directory = os.open(os.path.dirname(os.path.abspath(self.spill_path)), os.O_DIRECTORY)
+                    try:
+                        os.fsync(directory)
+                    finally:
+                        os.close(directory)
+            self.spilled += len(records)
+        except Exception as e:
+            print(f"写入溢出文件失败，{len(records)} 条记录丢失: {e}")
+
+    @contextmanager
+    def _locked_spill(self):
+        """持有溢出文件的进程内锁和跨进程文件锁"""
+        with self._spill_lock:
+            if fcntl is None:
+                yield
+                return
+            # 锁加在单独的文件上：溢出文件重放后会被删除，不能作为锁
+            with open(self.spill_path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _done(self, count: int):
+        with self._idle:
+            self._in_flight -= count
+            if not self._in_flight:
+                self._idle.notify_all()
@@ -1,6 +1,69 @@
 // 姿态检测和运动识别模块
+
+// MediaPipe姿态关键点索引映射（与后端 models/landmark_frame.py 的固定顺序一致）
+const MEDIAPIPE_KEYPOINT_INDEX = {
+    nose: 0,
+    leftEye: 2,
+    rightEye: 5,
+    leftEar: 7,
+    rightEar: 8,
+    leftShoulder: 11,
+    rightShoulder: 12,
+    leftElbow: 13,
+    rightElbow: 14,
+    leftWrist: 15,
+    rightWrist: 16,
+    leftHip: 23,
+    rightHip: 24,
+    leftKnee: 25,
+    rightKnee: 26,
+    leftAnkle: 27,
+    rightAnkle: 28
+};
+const POSE_LANDMARK_COUNT = 33;
+const LANDMARK_STRIDE = 4; // x, y, z, visibility
+
+// 二进制关键点上传格式（与后端 models/wire_format.py 一致，小端）
+// 头部：'LM' | 版本(uint8) | 运动编号(uint8) | 关键点数(uint16) | 帧数(uint16)
+// 每帧：时间戳(float64) + 33 × [x, y, z, visibility](float32)，缺失为NaN
+const LANDMARK_PACKET_VERSION = 1;
+const LANDMARK_PACKET_HEADER_SIZE = 8;
+const LANDMARK_PACKET_FRAME_SIZE = 8 + POSE_LANDMARK_COUNT * LANDMARK_STRIDE * 4;
+
+function encodeLandmarkPacket(exerciseId, frames) {
+    const buffer = new ArrayBuffer(LANDMARK_PACKET_HEADER_SIZE + frames.length * LANDMARK_PACKET_FRAME_SIZE);
+    const view = new DataView(buffer);
+
+    view.setUint8(0, 0x4c); // 'L'
+    view.setUint8(1, 0x4d); // 'M'
+    view.setUint8(2, LANDMARK_PACKET_VERSION);
+    view.setUint8(3, exerciseId);
+    view.setUint16(4, POSE_LANDMARK_COUNT, true);
+    view.setUint16(6, frames.length, true);
+
+    let offset = LANDMARK_PACKET_HEADER_SIZE;
+    frames.forEach(frame => {
+        view.setFloat64(offset, frame.timestamp, true);
+        offset += 8;
+        frame.landmarks.forEach(value => {
+            view.setFloat32(offset, value === null ? NaN : value, true);
+            offset += 4;
+        });
+    });
+
+    return buffer;
+}
+
+// 分析会话ID：每次开始检测生成一个，服务端按它隔离计数器和滤波状态（同一用户的多个标签页/设备互不影响）
+function createAnalysisSessionId() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+}
+
 class PoseDetector {
-    constructor() {
+    constructor(options = {}) {
         this.video = null;
         this.canvas = null;
         this.ctx = null;
@@ -31,8 +94,25 @@ class PoseDetector {
         // 深度学习分析器
         this.advancedAnalyzer = null;
         this.analysisResults = null;
-        this.sessionId = null;
-        this.dataRecorder = null;
+        this.sessionId = null; // 分析会话ID（见createAnalysisSessionId）
+        this.recordingSessionId = null; // 服务端训练记录会话ID（实时通道建立时返回）
+
+        // 批量分析：按时间窗口合并帧后一次提交，避免每帧一个请求
+        this.analysisQueue = [];
+        this.analysisBatchInterval = 200; // 合并窗口(ms)
+        this.analysisBatchMaxFrames = 30; // 单批最多帧数
+        this.analysisQueueMaxBatches = 4; // 请求未返回时最多积压的批数，超出丢弃最旧的帧
+        this.useBinaryUpload = true; // 使用二进制格式上传关键点（约为JSON的1/10）
+        // 运动类型编号由服务端下发（config.py的EXERCISE_IDS）；没有编号的运动使用JSON上传
+        this.exerciseWireIds = options.exerciseIds || {};
+        this.analysisFlushTimer = null;
+        this.analysisInFlight = false;
+        this.lastAdvancedAnalysis = null;
+
+        // 实时分析通道（WebSocket），不可用时回退到批量HTTP；服务端未开放时（独立分析服务部署）不尝试连接
+        this.useAnalysisStream = options.analysisStream !== false;
+        this.analysisSocket = null;
+        this.streamReady = false;
         
         // 运动阈值配置 - 重新优化检测标准，提高灵敏度
         this.exerciseThresholds = {
@@ -163,157 +243,12 @@ class PoseDetector {
                 }
             };
             
-            // 初始化数据记录器
-            this.dataRecorder = {
-                sessionActive: false,
-                currentSession: {
-                    id: null,
-                    startTime: null,
-                    endTime: null,
-                    exerciseType: null,
-                    reps: 0,
-                    formScores: [],
-                    errors: [],
-                    analysisData: [],
-                    duration: 0,
-                    calories: 0
-                },
-                startSession: async (exerciseType) => {
-                    try {
-                        const response = await fetch('/api/start_session', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json'
-                            },
-                            body: JSON.stringify({
-                                exercise_type: exerciseType
-                            })
-                        });
-                        const result = await response.json();
-                        return result.success ? result.session_id : null;
-                    } catch (error) {
-                        console.error('开始会话失败:', error);
-                        return null;
-                    }
-                },
-                endSession: async (sessionId) => {
-                    try {
-                        const response = await fetch('/api/end_session', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json'
-                            },
-                            body: JSON.stringify({
-                                session_id: sessionId
-                            })
-                        });
-                        const result = await response.json();
-                        return result.success ? result.session_data : null;
-                    } catch (error) {
-                        console.error('结束会话失败:', error);
-                        return null;
-                    }
-                },
-                recordRep: async (sessionId, formScore, errors) => {
-                    try {
-                        const response = await fetch('/api/record_rep', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json'
-                            },
-                            body: JSON.stringify({
-                                session_id: sessionId,
-                                form_score: formScore,
-                                errors: errors
-                            })
-                        });
-                        const result = await response.json();
-                        return result.success;
-                    } catch (error) {
-                        console.error('记录重复次数失败:', error);
-                        return false;
-                    }
-                }
-            };
-            
             console.log('高级姿态分析器初始化完成');
         } catch (error) {
             console.error('高级分析器初始化失败:', error);
         }
     }
     
-    async startSession(userId = 1) {
-        if (!this.advancedAnalyzer || !this.advancedAnalyzer.isReady) {
-            console.error('高级分析器未就绪');
-            return false;
-        }
-        
-        try {
-            // 调用后端API开始新会话
-            this.sessionId = await this.dataRecorder.startSession(this.currentExercise);
-            
-            if (this.sessionId) {
-                this.dataRecorder.sessionActive = true;
-                this.dataRecorder.currentSession = {
-                    id: this.sessionId,
-                    userId: userId,
-                    exerciseType: this.currentExercise,
-                    startTime: new Date(),
-                    reps: 0,
-                    errors: [],
-                    formScores: [],
-                    analysisData: []
-                };
-                
-                console.log(`训练会话已开始: ${this.sessionId}`);
-                return true;
-            } else {
-                console.error('无法创建会话');
-                return false;
-            }
-        } catch (error) {
-            console.error('开始会话失败:', error);
-            return false;
-        }
-    }
-    
-    async endSession() {
-        if (!this.dataRecorder.sessionActive) {
-            return null;
-        }
-        
-        try {
-            const session = this.dataRecorder.currentSession;
-            session.endTime = new Date();
-            session.duration = (session.endTime - session.startTime) / 1000;
-            
-            // 计算会话统计
-            const avgScore = session.formScores.length > 0 
-                ? session.formScores.reduce((a, b) => a + b, 0) / session.formScores.length 
-                : 0;
-                
-            const sessionSummary = {
-                ...session,
-                avgFormScore: avgScore,
-                totalErrors: session.errors.length,
-                caloriesBurned: this.calculateCalories(session.reps, session.duration)
-            };
-            
-            // 调用后端API结束会话
-            const savedData = await this.dataRecorder.endSession(this.sessionId);
-            
-            // 重置会话
-            this.dataRecorder.sessionActive = false;
-            this.dataRecorder.currentSession = null;
-            this.sessionId = null;
-            
-            return savedData || sessionSummary;
-        } catch (error) {
-            console.error('结束会话失败:', error);
-            return null;
-        }
-    }
-    
     async loadPoseModel() {
         try {
             // 检查是否支持MediaPipe
@@ -620,6 +555,10 @@ class PoseDetector {
         this.realTimeAccuracy = 0;
         this.accuracyHistory = [];
         this.currentFormScore = 0;
+        this.analysisQueue = [];
+        this.lastAdvancedAnalysis = null;
+        this.sessionId = createAnalysisSessionId();
+        this.openAnalysisStream();
 
         // 重置改进的计数系统
         this.stateBuffer = [];
@@ -639,6 +578,10 @@ class PoseDetector {
     stopDetection() {
         this.isDetecting = false;
 
+        // 提交剩余的待分析帧并关闭实时通道
+        this.flushAnalysisQueue();
+        this.closeAnalysisStream();
+
         // 停止语音合成
         if ('speechSynthesis' in window) {
             speechSynthesis.cancel();
@@ -754,30 +697,9 @@ class PoseDetector {
     }
     
     convertMediaPipeToKeypoints(landmarks) {
-        // MediaPipe姿态关键点索引映射
-        const keypointMap = {
-            nose: 0,
-            leftEye: 2,
-            rightEye: 5,
-            leftEar: 7,
-            rightEar: 8,
-            leftShoulder: 11,
-            rightShoulder: 12,
-            leftElbow: 13,
-            rightElbow: 14,
-            leftWrist: 15,
-            rightWrist: 16,
-            leftHip: 23,
-            rightHip: 24,
-            leftKnee: 25,
-            rightKnee: 26,
-            leftAnkle: 27,
-            rightAnkle: 28
-        };
-        
         const keypoints = {};
         
-        Object.entries(keypointMap).forEach(([name, index]) => {
+        Object.entries(MEDIAPIPE_KEYPOINT_INDEX).forEach(([name, index]) => {
             if (landmarks[index]) {
                 keypoints[name] = {
                     x: landmarks[index].x * this.canvas.width,
@@ -854,72 +776,234 @@ class PoseDetector {
         }
     }
     
-    async performAdvancedAnalysis(keypoints) {
+    openAnalysisStream() {
+        if (!this.useAnalysisStream || typeof WebSocket === 'undefined' || !this.currentExercise) {
+            return;
+        }
+
+        this.closeAnalysisStream();
+
         try {
-            // 转换keypoints为分析格式
-            const landmarkData = this.convertKeypointsToAnalysisFormat(keypoints);
-
-            // 总是尝试调用后端API进行准确率分析
-            if (this.currentExercise && landmarkData) {
-                try {
-                    const response = await fetch('/api/analyze_pose', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify({
-                            landmarks: landmarkData,
-                            exercise_type: this.currentExercise
-                        })
-                    });
+            const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+            const socket = new WebSocket(`${protocol}//${window.location.host}/ws/pose`);
+            this.analysisSocket = socket;
+
+            socket.onopen = () => {
+                socket.send(JSON.stringify({
+                    type: 'start',
+                    exercise_type: this.currentExercise,
+                    session_id: this.sessionId
+                }));
+            };
 
-                    if (response.ok) {
-                        const result = await response.json();
-                        if (result.success && result.analysis) {
-                            const analysisResult = result.analysis;
-
-                            // 更新准确率统计
-                            this.updateAccuracyStats(analysisResult.form_score || 75);
-
-                            // 更新当前形态评分
-                            this.currentFormScore = analysisResult.form_score || 75;
-
-                            // 更新当前错误信息
-                            this.currentErrors = analysisResult.errors || [];
-
-                            // 更新反馈信息
-                            this.feedback = analysisResult.feedback || '继续保持动作';
-
-                            return {
-                                landmarks: landmarkData,
-                                analysis: { exerciseType: this.currentExercise, phase: analysisResult.phase },
-                                formScore: analysisResult.form_score || 75,
-                                errors: analysisResult.errors || [],
-                                timestamp: Date.now(),
-                                phase: analysisResult.phase || 'unknown',
-                                feedback: analysisResult.feedback || '继续保持动作'
-                            };
+            socket.onmessage = (event) => {
+                const message = JSON.parse(event.data);
+                this.handleStreamMessage(message);
+            };
+
+            socket.onerror = (error) => {
+                console.warn('实时分析通道出错，回退到批量HTTP:', error);
+            };
+
+            socket.onclose = () => {
+                if (this.analysisSocket === socket) {
+                    this.analysisSocket = null;
+                    this.streamReady = false;
+                }
+            };
+        } catch (error) {
+            console.warn('无法建立实时分析通道，使用批量HTTP:', error);
+            this.analysisSocket = null;
+            this.streamReady = false;
+        }
+    }
+
+    handleStreamMessage(message) {
+        switch (message.type) {
+            case 'started':
+                this.streamReady = true;
+                this.recordingSessionId = message.session_id || null;
+                console.log('实时分析通道已建立:', message.session_id);
+                break;
+            case 'analysis':
+                (message.results || []).forEach(analysisResult => {
+                    this.applyAdvancedAnalysisResult(analysisResult, null);
+                });
+                break;
+            case 'ended':
+                console.log('实时分析会话已结束:', message.session_data);
+                break;
+            case 'error':
+                console.warn('实时分析通道错误:', message.message);
+                break;
+        }
+    }
+
+    closeAnalysisStream() {
+        const socket = this.analysisSocket;
+        if (!socket) {
+            return;
+        }
+
+        this.analysisSocket = null;
+        this.streamReady = false;
+
+        if (socket.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({ type: 'end' }));
+        } else {
+            socket.close();
+        }
+    }
+
+    submitAnalysisFrame(keypoints) {
+        // 每个检测到的帧都交给服务端分析：通道已建立时经WebSocket推送，否则进入批量队列合并提交
+        if (!this.currentExercise || !keypoints) {
+            return;
+        }
+        this.queueAnalysisFrame(this.convertKeypointsToAnalysisFormat(keypoints));
+    }
+
+    queueAnalysisFrame(landmarkData) {
+        const frame = {
+            timestamp: Date.now(),
+            landmarks: landmarkData
+        };
+
+        // 通道已建立时直接推送，无需等待合并窗口
+        if (this.streamReady && this.analysisSocket && this.analysisSocket.readyState === WebSocket.OPEN) {
+            this.analysisSocket.send(JSON.stringify({
+                type: 'frames',
+                frames: [frame]
+            }));
+            return;
+        }
+
+        this.analysisQueue.push(frame);
+
+        // 上一批请求未返回时队列会持续增长，超过上限丢弃最旧的帧
+        const maxQueuedFrames = this.analysisBatchMaxFrames * this.analysisQueueMaxBatches;
+        if (this.analysisQueue.length > maxQueuedFrames) {
+            this.analysisQueue.splice(0, this.analysisQueue.length - maxQueuedFrames);
+        }
+
+        if (this.analysisQueue.length >= this.analysisBatchMaxFrames) {
+            this.flushAnalysisQueue();
+        } else if (!this.analysisFlushTimer) {
+            this.analysisFlushTimer = setTimeout(() => this.flushAnalysisQueue(), this.analysisBatchInterval);
+        }
+    }
+
+    async flushAnalysisQueue() {
+        if (this.analysisFlushTimer) {
+            clearTimeout(this.analysisFlushTimer);
+            this.analysisFlushTimer = null;
+        }
+
+        // 上一批未返回时不重复提交，队列保留到下一个窗口
+        if (this.analysisInFlight || this.analysisQueue.length === 0 || !this.currentExercise) {
+            return;
+        }
+
+        const frames = this.analysisQueue.splice(0, this.analysisBatchMaxFrames);
+        this.analysisInFlight = true;
+
+        try {
+            const exerciseId = this.exerciseWireIds[this.currentExercise];
+            const request = this.useBinaryUpload && exerciseId
+                ? {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/octet-stream',
+                        'X-Session-Id': this.sessionId
+                    },
+                    body: encodeLandmarkPacket(exerciseId, frames)
+                }
+                : {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify({
+                        frames: frames,
+                        exercise_type: this.currentExercise,
+                        session_id: this.sessionId
+                    })
+                };
+
+            const response = await fetch('/api/analyze_pose_batch', request);
+
+            if (response.ok) {
+                const result = await response.json();
+                if (result.success && Array.isArray(result.results)) {
+                    result.results.forEach((analysisResult, index) => {
+                        if (!analysisResult.error) {
+                            this.applyAdvancedAnalysisResult(analysisResult, frames[index].landmarks);
                         }
-                    }
-                } catch (apiError) {
-                    console.warn('API调用失败，使用本地分析:', apiError);
+                    });
                 }
             }
+        } catch (apiError) {
+            console.warn('批量分析API调用失败，使用本地分析:', apiError);
+        } finally {
+            this.analysisInFlight = false;
+            if (this.analysisQueue.length > 0 && this.isDetecting) {
+                this.analysisFlushTimer = setTimeout(() => this.flushAnalysisQueue(), this.analysisBatchInterval);
+            }
+        }
+    }
+
+    applyServerRepCount(analysisResult) {
+        // 平板支撑按服务端累计的保持秒数显示，其他运动直接使用服务端次数
+        const serverCount = typeof analysisResult.hold_time === 'number'
+            ? Math.floor(analysisResult.hold_time)
+            : analysisResult.rep_count;
+        if (typeof serverCount !== 'number' || serverCount === this.exerciseCounter) {
+            return;
+        }
 
-            // 如果API调用失败，使用本地分析并生成模拟准确率
-            const localFormScore = this.calculateLocalFormScore(keypoints);
-            this.updateAccuracyStats(localFormScore);
-            this.currentFormScore = localFormScore;
+        const added = serverCount - this.exerciseCounter;
+        this.exerciseCounter = serverCount;
+        for (let i = 0; i < added; i++) {
+            this.updateCalories();
+        }
 
-            return this.basicAnalysis(keypoints);
-        } catch (error) {
-            console.error('分析失败:', error);
-            // 即使出错也要更新准确率
-            const fallbackScore = 60;
-            this.updateAccuracyStats(fallbackScore);
-            this.currentFormScore = fallbackScore;
-            return this.basicAnalysis(keypoints);
+        if (analysisResult.rep_completed) {
+            this.playCountSound();
+            this.recordRepTime();
+            this.showFeedback(`完成 ${this.exerciseCounter} 次${this.getExerciseName(this.currentExercise)}`, 'success');
+            if (this.onRepComplete) this.onRepComplete(this.exerciseCounter, this.calories, this.accuracy);
         }
+
+        this.updateStats();
+    }
+
+    applyAdvancedAnalysisResult(analysisResult, landmarkData) {
+        const formScore = analysisResult.form_score || 75;
+
+        // 次数和完成提示来自服务端
+        this.applyServerRepCount(analysisResult);
+
+        // 更新准确率统计
+        this.updateAccuracyStats(formScore);
+
+        // 更新当前形态评分
+        this.currentFormScore = formScore;
+
+        // 更新当前错误信息
+        this.currentErrors = analysisResult.errors || [];
+
+        // 更新反馈信息
+        this.feedback = analysisResult.feedback || '继续保持动作';
+
+        this.lastAdvancedAnalysis = {
+            landmarks: landmarkData,
+            analysis: { exerciseType: this.currentExercise, phase: analysisResult.phase },
+            formScore: formScore,
+            errors: analysisResult.errors || [],
+            timestamp: analysisResult.timestamp || Date.now(),
+            phase: analysisResult.phase || 'unknown',
+            feedback: analysisResult.feedback || '继续保持动作'
+        };
     }
 
     calculateLocalFormScore(keypoints) {
@@ -1083,17 +1167,21 @@ class PoseDetector {
     }
     
     convertKeypointsToAnalysisFormat(keypoints) {
-        const converted = {};
+        // 紧凑格式：33个关键点按固定顺序展开为 [x, y, z, visibility, ...]，缺失为null。
+        // 坐标换算回MediaPipe的归一化坐标（0~1），与服务端图像推理一致，时域滤波参数按归一化坐标设定
+        const converted = new Array(POSE_LANDMARK_COUNT * LANDMARK_STRIDE).fill(null);
+        const width = this.canvas && this.canvas.width ? this.canvas.width : 1;
+        const height = this.canvas && this.canvas.height ? this.canvas.height : 1;
         
         Object.keys(keypoints).forEach(name => {
             const point = keypoints[name];
-            if (point) {
-                converted[name] = {
-                    x: point.x,
-                    y: point.y,
-                    z: point.z || 0,
-                    visibility: point.confidence || 1
-                };
+            const index = MEDIAPIPE_KEYPOINT_INDEX[name];
+            if (point && index !== undefined) {
+                const offset = index * LANDMARK_STRIDE;
+                converted[offset] = point.x / width;
+                converted[offset + 1] = point.y / height;
+                converted[offset + 2] = point.z || 0;
+                converted[offset + 3] = point.confidence || 1;
             }
         });
         
@@ -1361,37 +1449,6 @@ class PoseDetector {
         }
     }
     
-    recordAnalysisData(analysisResult) {
-        if (!this.dataRecorder.sessionActive || !analysisResult) {
-            return;
-        }
-        
-        const session = this.dataRecorder.currentSession;
-        
-        // 记录形态评分
-        session.formScores.push(analysisResult.formScore);
-        
-        // 记录错误
-        if (analysisResult.errors && analysisResult.errors.length > 0) {
-            session.errors.push(...analysisResult.errors.map(error => ({
-                ...error,
-                timestamp: analysisResult.timestamp,
-                repNumber: session.reps
-            })));
-        }
-        
-        // 记录详细分析数据
-        session.analysisData.push({
-            timestamp: analysisResult.timestamp,
-            analysis: analysisResult.analysis,
-            formScore: analysisResult.formScore,
-            phase: analysisResult.phase
-        });
-        
-        // 更新实时显示
-        this.updateRealTimeDisplay(analysisResult);
-    }
-    
     updateRealTimeDisplay(analysisResult) {
         // 更新错误提示
         this.showRealTimeFeedback(analysisResult.errors);
@@ -1417,25 +1474,6 @@ class PoseDetector {
         // });
     }
     
-    calculateCalories(reps, duration) {
-        // 根据运动类型和强度计算卡路里
-        const caloriesPerRep = {
-            'pushup': 0.5,
-            'squat': 0.3,
-            'situp': 0.4,
-            'plank': 0.1, // 每秒
-            'jumping_jacks': 0.8,
-            'lunges': 1.2,
-            'burpees': 2.5,
-            'pull_ups': 0.8
-        };
-        
-        const baseCalories = (caloriesPerRep[this.currentExercise] || 0.5) * reps;
-        const timeBonus = duration > 300 ? duration * 0.01 : 0; // 超过5分钟的时间奖励
-        
-        return baseCalories + timeBonus;
-    }
-    
     drawPose(keypoints) {
         if (!keypoints || !this.ctx) return;
         
@@ -1673,6 +1711,9 @@ class PoseDetector {
     
     analyzePose(keypoints) {
         if (!this.currentExercise) return;
+
+        // 关键点提交到服务端分析，次数以服务端计数器为准（见applyServerRepCount）
+        this.submitAnalysisFrame(keypoints);
         console.log(`Analyzing pose for ${this.currentExercise}, current counter: ${this.exerciseCounter}, state: ${this.exerciseState}`);
         
         // 重置当前帧的错误状态
@@ -1982,13 +2023,7 @@ class PoseDetector {
                 console.log('俯卧撑: 下降阶段');
             } else if (this.exerciseState === 'down' && angle > thresholds.up) {
                 this.exerciseState = 'up';
-                this.exerciseCounter++;
-                this.calories += 0.5;
-                this.feedback = '向上 - 完成!';
-                this.showFeedback(`完成 ${this.exerciseCounter} 次俯卧撑`, 'success');
-                this.playCountSound();
-                console.log('俯卧撑计数:', this.exerciseCounter, '- 完成一次完整动作(下降->上升)');
-                if (this.onRepComplete) this.onRepComplete(this.exerciseCounter, this.calories, this.accuracy);
+                this.feedback = '向上';
                 poseValidForAccuracy = true;
             } else if ((this.exerciseState === 'up' && angle >= thresholds.down) ||
                        (this.exerciseState === 'down' && angle <= thresholds.up)) {
@@ -2029,13 +2064,7 @@ class PoseDetector {
                 console.log('深蹲: 下蹲阶段');
             } else if (this.exerciseState === 'down' && angle > thresholds.up) {
                 this.exerciseState = 'up';
-                this.exerciseCounter++;
-                this.calories += 0.32;
-                this.feedback = '起立 - 完成!';
-                this.showFeedback(`完成 ${this.exerciseCounter} 次深蹲`, 'success');
-                this.playCountSound();
-                console.log('深蹲计数:', this.exerciseCounter, '- 完成一次完整动作(下蹲->起立)');
-                if (this.onRepComplete) this.onRepComplete(this.exerciseCounter, this.calories, this.accuracy);
+                this.feedback = '起立';
                 poseValidForAccuracy = true;
             } else if ((this.exerciseState === 'up' && angle >= thresholds.down) ||
                        (this.exerciseState === 'down' && angle <= thresholds.up)) {
@@ -2059,10 +2088,6 @@ class PoseDetector {
         
         if (angle > threshold.maxAngle && this.exerciseState === 'down') {
             this.exerciseState = 'up';
-            this.exerciseCounter++;
-            this.calories += 0.4; // 每个仰卧起坐消耗约0.4卡路里
-            this.showFeedback(`仰卧起坐 ${this.exerciseCounter} 个`, 'success');
-            this.updateStats();
             return true;
         } else if (angle < threshold.minAngle && this.exerciseState === 'up') {
             this.exerciseState = 'down';
@@ -2076,15 +2101,7 @@ class PoseDetector {
         const threshold = this.exerciseThresholds.plank;
         
         if (angle >= threshold.minAngle && angle <= threshold.maxAngle) {
-            // 平板支撑按时间计算
-            const currentTime = Date.now();
-            if (currentTime - this.lastPoseTime > 1000) { // 每秒更新一次
-                this.exerciseCounter++;
-                this.calories += 0.1; // 每秒消耗约0.1卡路里
-                this.lastPoseTime = currentTime;
-                this.showFeedback(`平板支撑 ${this.exerciseCounter} 秒`, 'success');
-                this.updateStats();
-            }
+            // 保持时间由服务端累计
             return true;
         } else {
             this.showFeedback('保持身体挺直', 'warning');
@@ -2693,10 +2710,7 @@ class PoseDetector {
         
         if (armsOpen && legsOpen) {
             if (this.exerciseState === 'closed') {
-                this.exerciseCounter++;
-                this.calories += 0.8; // 每次开合跳消耗约0.8卡路里
                 this.exerciseState = 'open';
-                this.showFeedback('很好！继续保持节奏', 'success');
             }
         } else {
             if (this.exerciseState === 'open') {
@@ -2739,11 +2753,7 @@ class PoseDetector {
             console.log('弓步蹲: 下蹲状态');
         } else if (!isLungePosition && frontLegAngle >= thresholds.up && this.exerciseState === 'down') {
             this.exerciseState = 'up';
-            this.exerciseCounter++;
-            this.calories += 1.2;
-            this.showFeedback(`弓步蹲 ${this.exerciseCounter} 次！`, 'success');
-            this.playCountSound();
-            console.log('弓步蹲计数:', this.exerciseCounter, '- 完成一次完整动作(下蹲->起立)');
+            console.log('弓步蹲: 起立状态');
         }
 
         // 计算准确率 - 基于前腿角度
@@ -2782,11 +2792,8 @@ class PoseDetector {
                 }
                 break;
             case 'jump':
-                if (torsoAngle > 150) { // 完成一次波比跳
-                    this.exerciseCounter++;
-                    this.calories += 2.5; // 每次波比跳消耗约2.5卡路里
+                if (torsoAngle > 150) { // 回到站立
                     this.burpeePhase = 'stand';
-                    this.showFeedback('波比跳完成！继续加油！', 'success');
                 }
                 break;
         }
@@ -2863,12 +2870,8 @@ class PoseDetector {
 
             // 状态切换检测 - 修复计数逻辑，确保下降到上拉为一次完整动作
             if (isPulledUp && this.exerciseState === 'down') {
-                this.exerciseCounter++;
-                this.calories += 0.8;
                 this.exerciseState = 'up';
-                this.showFeedback(`引体向上 ${this.exerciseCounter} 次！`, 'success');
-                this.playCountSound();
-                console.log('引体向上计数:', this.exerciseCounter, '- 完成一次完整动作(下降->上拉)');
+                console.log('引体向上: 上拉阶段');
 
                 // 计算准确率 - 上拉动作完成时给高分
                 this.accuracy = Math.max(80, 100 - Math.abs(avgArmAngle - thresholds.minAngle) * 1.0);
@@ -2943,6 +2946,8 @@ class PoseDetector {
         this.feedback = '';
         this.currentExercise = null;
         this.isDetecting = false;
+        this.analysisQueue = [];
+        this.lastAdvancedAnalysis = null;
 
         // 重置改进的计数系统
         this.stateBuffer = [];
@@ -2993,21 +2998,8 @@ class PoseDetector {
                 this.exerciseState = stableState;
                 this.lastStateChange = currentTime;
 
+                // 本地状态只用于阶段提示，次数由服务端计数器给出
                 console.log(`状态变化: ${previousState} -> ${stableState}, 角度: ${angle.toFixed(1)}°`);
-
-                // 检测完成一次动作 (从down到up)
-                if (previousState === 'down' && stableState === 'up') {
-                    this.exerciseCounter++;
-                    console.log(`完成一次动作! 总计: ${this.exerciseCounter}, 角度: ${angle.toFixed(1)}°`);
-
-                    this.updateStats();
-                    this.playCountSound();
-                    this.recordRepTime();
-                    this.updateCalories();
-
-                    // 显示反馈
-                    this.showFeedback(`完成 ${this.exerciseCounter} 次${this.getExerciseName(this.currentExercise)}`, 'success');
-                }
             }
         }
     }